@@ -0,0 +1,81 @@
+"""
+Benchmarks for TRamWAy.
+
+The standalone scripts compare alternative implementations of a single step;
+:mod:`benchmarks.suite` times the hot paths at several data sizes and is run with
+:mod:`benchmarks.run`; :mod:`benchmarks.compare` compares two runs.
+"""
+
+import numpy as np
+import pandas as pd
+from tramway.tessellation.base import Voronoi, CellStats
+from tramway.inference.base import distributed
+
+
+def translocations(cell_count, translocation_count_per_cell, dt=.05, sigma=0., drift=0.,
+        duration=None, seed=0):
+    """
+    Simulated translocations in the unit square, with a diffusivity gradient along x,
+    and a Voronoi tessellation with `cell_count` random cell centers.
+
+    Arguments:
+
+        cell_count (int): number of cells.
+
+        translocation_count_per_cell (int): average number of translocations per cell.
+
+        dt (float): time step.
+
+        sigma (float): localization error.
+
+        drift (float): strength of the drift towards the center of the square.
+
+        duration (float): if defined, the translocations start at random times in
+            ``[0, duration)`` and the diffusivity increases by 20% over this duration;
+            otherwise all the translocations start at time 0.
+
+        seed (int): seed for :mod:`numpy.random`.
+
+    Returns:
+
+        tuple: :class:`pandas.DataFrame` with columns *n*, *x*, *y*, *t*, and
+        :class:`~tramway.tessellation.base.Voronoi` tessellation.
+    """
+    np.random.seed(seed)
+    k = cell_count * translocation_count_per_cell
+    x0 = np.random.rand(k, 2)
+    if duration is None:
+        t0 = np.zeros(k)
+        D = .05 + .2 * x0[:,0]
+    else:
+        t0 = np.random.rand(k) * duration
+        D = .05 + .2 * x0[:,0] * (1. + .2 * t0 / duration)
+    x1 = x0 + np.random.randn(k, 2) * np.sqrt(2. * D * dt)[:,np.newaxis]
+    if drift:
+        x1 += drift * (.5 - x0) * dt
+    if sigma:
+        x1 += np.random.randn(k, 2) * sigma
+    points = pd.DataFrame(dict(
+        n=np.repeat(np.arange(1, k+1), 2),
+        x=np.c_[x0[:,0], x1[:,0]].ravel(),
+        y=np.c_[x0[:,1], x1[:,1]].ravel(),
+        t=np.c_[t0, t0 + dt].ravel()))
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, 2), columns=['x', 'y']))
+    return points, tessellation
+
+
+def translocation_cells(*args, **kwargs):
+    """
+    Distributed cells of the translocations generated by :func:`translocations`,
+    that takes the same arguments.
+
+    The translocation arrays are extracted from the dataframes once, so that the first
+    timed run is not penalized.
+    """
+    points, tessellation = translocations(*args, **kwargs)
+    cells = distributed(CellStats(points=points, tessellation=tessellation,
+            cell_index=tessellation.cell_index(points)))
+    for cell in cells.values():
+        cell.dr
+    return cells
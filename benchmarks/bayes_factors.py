@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to calculate the Bayes factors and minimal numbers of jumps of many bins, all at once with
+:func:`~tramway.inference.bayes_factors.calculate_bayes_factors_batch` ('batch') or bin by bin
+with :func:`~tramway.inference.bayes_factors.calculate_bayes_factors` ('per bin').
+
+The bin-by-bin calculation is timed on at most `--max-per-bin-count` bins and extrapolated to
+all the bins.
+
+Example::
+
+    python benchmarks/bayes_factors.py --bin-count 1000 10000
+
+"""
+
+import time
+import argparse
+import logging
+import warnings
+import numpy as np
+from tramway.inference.bayes_factors import calculate_bayes_factors, \
+        calculate_bayes_factors_batch
+
+
+def example(bin_count, seed=0):
+    rng = np.random.RandomState(seed)
+    ns = np.round(np.exp(rng.uniform(np.log(2), np.log(1000), bin_count)))
+    zeta_ts = rng.randn(bin_count, 2) * rng.choice([.05, .3, 1., 3.], (bin_count, 1))
+    zeta_sps = rng.randn(bin_count, 2) * rng.choice([.01, .3, 1.], (bin_count, 1))
+    Vs = rng.uniform(.01, 1., bin_count)
+    Vs_pi = Vs * rng.uniform(.5, 2., bin_count)
+    return zeta_ts, zeta_sps, ns, Vs, Vs_pi
+
+
+def run(f, args, loc_error):
+    t0 = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        lg_Bs, forces, min_ns = f(*args, loc_error=loc_error, verbose=False)
+    return time.time() - t0, np.ravel(lg_Bs), np.ravel(min_ns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bin-count', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--localization-error', type=float, default=.03)
+    parser.add_argument('--max-per-bin-count', type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    loc_error = args.localization_error ** 2
+    print('bins\tbatch (s)\tper bin (s)\tmax lg B difference\tmatching min n (%)')
+    for bin_count in args.bin_count:
+        data = example(bin_count)
+        t_batch, lg_Bs, min_ns = run(calculate_bayes_factors_batch, data, loc_error)
+        k = min(bin_count, args.max_per_bin_count)
+        t_per_bin, lg_Bs_ref, min_ns_ref = run(calculate_bayes_factors,
+                [ x[:k] for x in data ], loc_error)
+        t_per_bin *= bin_count / k
+        # the bin-by-bin calculation may fail on large numbers of jumps
+        ok = np.isfinite(lg_Bs_ref)
+        found = np.isfinite(min_ns_ref)
+        matching = np.isclose(min_ns[:k][found], min_ns_ref[found], rtol=.005, atol=1.)
+        print('{:d}\t{:.2f}\t{:.1f}\t{:.1e}\t{:.1f}'.format(bin_count, t_batch, t_per_bin,
+            np.max(np.abs(lg_Bs[:k][ok] - lg_Bs_ref[ok])), 100. * np.mean(matching)))
+
+
+if __name__ == '__main__':
+    main()
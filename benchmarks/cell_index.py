@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Point-to-cell assignment time of :meth:`~tramway.tessellation.base.Delaunay.cell_index`,
+with the KD-tree index versus the dense distance matrix.
+
+Example::
+
+    python benchmarks/cell_index.py --point-count 100000 1000000 --cell-count 100 10000
+
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from tramway.tessellation.base import Voronoi
+
+
+def example(point_count, cell_count, seed=0):
+    np.random.seed(seed)
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, 2), columns=['x', 'y']))
+    points = pd.DataFrame(np.random.rand(point_count, 2), columns=['x', 'y'])
+    return tessellation, points
+
+
+def run(tessellation, points, index, **kwargs):
+    tessellation._cell_tree = None # include the construction of the tree
+    t0 = time.time()
+    tessellation.cell_index(points, index=index, **kwargs)
+    return time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--knn', type=int, help='minimum number of points per cell')
+    parser.add_argument('--max-dense-size', type=float, default=1e9,
+            help='maximum number of point-center distances for the dense index to be benchmarked')
+    args = parser.parse_args()
+    kwargs = {}
+    if args.knn:
+        kwargs['knn'] = args.knn
+    print('points\tcells\tkdtree (s)\tdense (s)')
+    for point_count in args.point_count:
+        for cell_count in args.cell_count:
+            tessellation, points = example(point_count, cell_count)
+            t_kdtree = run(tessellation, points, 'kdtree', **kwargs)
+            if point_count * cell_count <= args.max_dense_size:
+                t_dense = '{:.3f}'.format(run(tessellation, points, 'dense', **kwargs))
+            else:
+                t_dense = 'skipped'
+            print('{:d}\t{:d}\t{:.3f}\t{}'.format(point_count, cell_count, t_kdtree, t_dense))
+
+
+if __name__ == '__main__':
+    main()
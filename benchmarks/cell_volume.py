@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time :meth:`~tramway.tessellation.base.Voronoi.compute_cell_volume` against the former
+per-cell implementation of :attr:`~tramway.tessellation.base.Voronoi.cell_volume`,
+on random Voronoi meshes.
+
+Example::
+
+    python benchmarks/cell_volume.py --cell-count 100000 --dim 2
+    python benchmarks/cell_volume.py --cell-count 20000 --dim 3 --worker-count 4
+
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import scipy.spatial as spatial
+from tramway.tessellation.base import Voronoi
+
+
+def example(cell_count, dim, seed=0):
+    np.random.seed(seed)
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, dim),
+        columns=['x', 'y', 'z'][:dim]))
+    # build the Voronoi graph out of the timed sections
+    tessellation.vertex_adjacency
+    return tessellation
+
+
+def per_cell_volume(tessellation):
+    adjacency = tessellation.vertex_adjacency.tocsr()
+    vertices, centers = tessellation._vertices, tessellation._cell_centers
+    cell_volume = np.full(len(centers), np.nan)
+    for i, u in enumerate(centers):
+        js = tessellation.cell_vertices[i]
+        if u.size == 2:
+            _js, simplices = set(js.tolist()), []
+            while _js:
+                j = _js.pop()
+                for k in adjacency.indices[adjacency.indptr[j]:adjacency.indptr[j+1]].tolist():
+                    if k in _js:
+                        simplices.append((j, k))
+            if len(simplices) == len(js):
+                cell_volume[i] = sum( .5 * abs((vertices[j,0] - u[0]) * (vertices[k,1] - u[1]) - \
+                        (vertices[k,0] - u[0]) * (vertices[j,1] - u[1])) for j, k in simplices )
+                continue
+            pts = np.r_[vertices[js], u[np.newaxis,:]]
+        else:
+            pts = vertices[js]
+        if pts.shape[1] < pts.shape[0]:
+            try:
+                cell_volume[i] = spatial.ConvexHull(pts).volume
+            except spatial.QhullError:
+                pass
+    return cell_volume
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, default=100000)
+    parser.add_argument('--dim', type=int, choices=[2, 3], default=2)
+    parser.add_argument('--worker-count', type=int)
+    args = parser.parse_args()
+    tessellation = example(args.cell_count, args.dim)
+    t0 = time.time()
+    reference = per_cell_volume(tessellation)
+    t_per_cell = time.time() - t0
+    t0 = time.time()
+    volume = tessellation.compute_cell_volume(args.worker_count)
+    t_vectorized = time.time() - t0
+    assert np.allclose(volume, reference, equal_nan=True)
+    print('cells\tdim\tper cell (s)\tcompute_cell_volume (s)\tspeed-up')
+    print('{:d}\t{:d}\t{:.2f}\t{:.2f}\t{:.1f}'.format(args.cell_count, args.dim,
+        t_per_cell, t_vectorized, t_per_cell / t_vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare two runs of the benchmark suite and flag the slowdowns beyond a threshold.
+
+The minimum wall times are compared. The exit status is 1 if any benchmark is slower
+than `--threshold` times its baseline, 0 otherwise.
+
+Example::
+
+    python -m benchmarks.compare before.json after.json --threshold 1.2
+
+"""
+
+import sys
+import json
+import argparse
+
+
+def compare(baseline, current, threshold=1.2, key='min'):
+    """
+    Returns (*name*, *point count*, *baseline time*, *current time*, *ratio*, *flag*) tuples
+    for the benchmarks found in both `baseline` and `current`, with *flag* ``True``
+    if *ratio* exceeds `threshold`.
+    """
+    rows = []
+    for name in sorted(current):
+        if name not in baseline:
+            continue
+        for point_count in sorted(current[name], key=int):
+            try:
+                t0 = baseline[name][point_count][key]
+            except KeyError:
+                continue
+            t1 = current[name][point_count][key]
+            ratio = t1 / t0 if 0 < t0 else float('inf')
+            rows.append((name, int(point_count), t0, t1, ratio, threshold < ratio))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=1.2,
+            help='maximum ratio of the current time over the baseline time')
+    parser.add_argument('--key', choices=['min', 'median'], default='min')
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline['results'], current['results'], args.threshold, args.key)
+    print('benchmark\tpoints\tbaseline (s)\tcurrent (s)\tratio')
+    for name, point_count, t0, t1, ratio, slower in rows:
+        print('{}\t{:d}\t{:.4f}\t{:.4f}\t{:.2f}{}'.format(name, point_count, t0, t1, ratio,
+            '\tSLOWER' if slower else ''))
+    slowdowns = sum( row[-1] for row in rows )
+    if slowdowns:
+        print('{:d} benchmark(s) slower than {:g} times the baseline'.format(slowdowns,
+            args.threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
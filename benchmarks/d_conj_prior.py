@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to infer the diffusivity MAP and confidence interval with a conjugate prior
+(:func:`~tramway.inference.d_conj_prior.infer_d_conj_prior`) as the number of cells grows.
+
+'arrays' is the array-level :func:`~tramway.inference.d_conj_prior.d_conj_prior_maps` on
+per-cell counts and sums, 'cells' is :func:`~tramway.inference.d_conj_prior.infer_d_conj_prior`
+including the packing of the translocations and *zeta_spurious*, and 'per cell' is the former
+calculation of the confidence intervals with one call to
+:func:`~tramway.inference.bayes_factors.get_D_posterior.get_D_confidence_interval` per cell.
+
+Example::
+
+    python -m benchmarks.d_conj_prior --cell-count 1000 10000 100000
+
+"""
+
+import time
+import argparse
+import warnings
+import numpy as np
+from tramway.inference.d_conj_prior import infer_d_conj_prior, d_conj_prior_maps
+from tramway.inference.bayes_factors.get_D_posterior import get_D_confidence_interval
+from benchmarks import translocation_cells
+
+
+def example(cell_count, translocation_count_per_cell=20, sigma=.03, seed=0):
+    return translocation_cells(cell_count, translocation_count_per_cell, sigma=sigma, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--localization-error', type=float, default=.03)
+    parser.add_argument('--max-per-cell-count', type=int, default=1000000,
+            help='maximum number of cells for the per-cell confidence intervals to be benchmarked')
+    args = parser.parse_args()
+    sigma2 = args.localization_error ** 2
+    print('cells\tarrays (s)\tcells (s)\tper cell (s)\tmax relative difference')
+    for cell_count in args.cell_count:
+        cells = example(cell_count)
+        dt = cells.any_cell().dt[0]
+        index = np.array(list(cells.keys()))
+        packed = cells.pack(index)
+        n, sum_dr, sum_dr2 = packed.count, packed.sum(packed.dr), packed.sum(packed.dr * packed.dr)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            t0 = time.time()
+            maps = d_conj_prior_maps(n, sum_dr, sum_dr2, dt, sigma2, index=index).maps
+            t_arrays = time.time() - t0
+            t0 = time.time()
+            infer_d_conj_prior(cells, localization_error=args.localization_error)
+            t_cells = time.time() - t0
+            if cell_count <= args.max_per_cell_count:
+                defined = maps['diffusivity'].dropna().index
+                zeta_t = maps[['zeta_total x', 'zeta_total y']].loc[defined].values
+                n, V, V_pi = [ maps[col].loc[defined].values for col in ('n', 'V', 'V_prior') ]
+                t0 = time.time()
+                ci = np.array([ get_D_confidence_interval(.95, n[j], zeta_t[j], V[j], V_pi[j],
+                        dt, sigma2, 2)[1] for j in range(len(defined)) ])
+                t_per_cell = '{:.2f}'.format(time.time() - t0)
+                ci_ref = maps.loc[defined, ['ci low', 'ci high']].values
+                diff = '{:.1e}'.format(np.max(np.abs(ci - ci_ref) / ci_ref))
+            else:
+                t_per_cell = diff = 'skipped'
+        print('{:d}\t{:.3f}\t{:.2f}\t{}\t{}'.format(cell_count, t_arrays, t_cells, t_per_cell, diff))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to infer diffusivity with :func:`~tramway.inference.degraded_d.infer_D`,
+with all the cells optimized at once ('packed') or one call to
+:func:`scipy.optimize.minimize` per cell ('minimize'), as the number of cells grows.
+
+Example::
+
+    python -m benchmarks.degraded_d --cell-count 100 1000 10000
+
+"""
+
+import time
+import argparse
+import warnings
+import numpy as np
+from tramway.inference.degraded_d import infer_D
+from benchmarks import translocation_cells
+
+
+def example(cell_count, translocation_count_per_cell=50, sigma=.03, seed=0):
+    return translocation_cells(cell_count, translocation_count_per_cell, sigma=sigma, seed=seed)
+
+
+def run(cells, **kwargs):
+    t0 = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        maps = infer_D(cells, **kwargs)
+    return time.time() - t0, maps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--translocation-count', type=int, default=50,
+            help='average number of translocations per cell')
+    args = parser.parse_args()
+    print('cells\tpacked (s)\tminimize (s)\tmax relative difference')
+    for cell_count in args.cell_count:
+        cells = example(cell_count, args.translocation_count)
+        t_packed, packed = run(cells)
+        # any argument for scipy.optimize.minimize disables the packed solver
+        t_minimize, reference = run(cells, method='L-BFGS-B')
+        D, D_ref = packed['diffusivity'], reference['diffusivity'].loc[packed.index]
+        print('{:d}\t{:.3f}\t{:.3f}\t{:.1e}'.format(cell_count, t_packed, t_minimize,
+            np.max(np.abs(D - D_ref) / np.abs(D_ref))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to distribute translocations into cells with :func:`~tramway.inference.base.distributed`,
+grouping by sort versus masking the dataset once per cell.
+
+Example::
+
+    python benchmarks/distributed.py --translocation-count 100000 1000000 --cell-count 100 1000
+
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from tramway.tessellation.base import Voronoi, CellStats
+from tramway.inference.base import distributed
+
+
+def example(translocation_count, cell_count, trajectory_length=10, seed=0):
+    np.random.seed(seed)
+    trajectory_count = max(1, translocation_count // (trajectory_length - 1))
+    point_count = trajectory_count * trajectory_length
+    n = np.repeat(np.arange(1, trajectory_count + 1), trajectory_length)
+    xy = np.random.rand(point_count, 2)
+    t = np.tile(.05 * np.arange(trajectory_length), trajectory_count)
+    points = pd.DataFrame(dict(n=n, x=xy[:,0], y=xy[:,1], t=t))[['n', 'x', 'y', 't']]
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, 2), columns=['x', 'y']))
+    return CellStats(points=points, tessellation=tessellation,
+            cell_index=tessellation.cell_index(points))
+
+
+def initial_cell(tessellation, cell, translocations, translocation_cell, get_point):
+    # same as the default assignment; passing it explicitly disables the grouping by sort
+    return translocation_cell[0] == cell
+
+
+def run(cells, **kwargs):
+    t0 = time.time()
+    distributed(cells, **kwargs)
+    return time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--translocation-count', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--max-mask-size', type=float, default=1e10,
+            help='maximum number of translocations times cells for the per-cell masks to be benchmarked')
+    args = parser.parse_args()
+    print('translocations\tcells\tsort (s)\tmasks (s)')
+    for translocation_count in args.translocation_count:
+        for cell_count in args.cell_count:
+            cells = example(translocation_count, cell_count)
+            t_sort = run(cells)
+            if translocation_count * cell_count <= args.max_mask_size:
+                t_mask = '{:.3f}'.format(run(cells, fuzzy=initial_cell))
+            else:
+                t_mask = 'skipped'
+            print('{:d}\t{:d}\t{:.3f}\t{}'.format(translocation_count, cell_count, t_sort, t_mask))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to run a cheap estimator on groups of cells with
+:meth:`~tramway.inference.base.Distributed.run` and the 'pickle' or 'fork' backend,
+and size of the pickled task payloads sent to the worker processes.
+
+Example::
+
+    python benchmarks/distributed_run.py --cell-count 10000 --group-count 16 --workers 0 2 4
+
+"""
+
+import time
+import pickle
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from functools import partial
+from tramway.tessellation.base import Voronoi, CellStats
+from tramway.inference.base import distributed, __run__, __fork_run__
+from tramway.inference.degraded_d import infer_D
+
+
+def example(cell_count, translocation_count_per_cell=20, dt=.05, seed=0):
+    np.random.seed(seed)
+    k = cell_count * translocation_count_per_cell
+    x0 = np.random.rand(k, 2)
+    x1 = x0 + np.random.randn(k, 2) * np.sqrt(2. * .1 * dt)
+    points = pd.DataFrame(dict(
+        n=np.repeat(np.arange(1, k+1), 2),
+        x=np.c_[x0[:,0], x1[:,0]].ravel(),
+        y=np.c_[x0[:,1], x1[:,1]].ravel(),
+        t=np.tile([0., dt], k)))
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, 2), columns=['x', 'y']))
+    return distributed(CellStats(points=points, tessellation=tessellation,
+            cell_index=tessellation.cell_index(points)))
+
+
+def payload_size(groups, backend, fargs):
+    """
+    Number of bytes pickled to send all the tasks to the worker processes.
+    """
+    if backend == 'pickle':
+        tasks = [ (partial(__run__, fargs), groups.cells[i]) for i in groups.cells ]
+    else:
+        tasks = [ (partial(__fork_run__, 0), j) for j in range(len(groups.cells)) ]
+    return sum( len(pickle.dumps(task)) for task in tasks )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, default=10000)
+    parser.add_argument('--group-count', type=int, default=16)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--localization-error', type=float, default=.03)
+    args = parser.parse_args()
+    cells = example(args.cell_count)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        groups = cells.group(ngroups=args.group_count)
+    kwargs = dict(localization_error=args.localization_error)
+    fargs = (infer_D, (), kwargs)
+    print('cells\tgroups\tworkers\tbackend\tpickled (kB)\ttime (s)')
+    for worker_count in args.workers:
+        for backend in ('pickle', 'fork'):
+            size = 0 if worker_count == 0 else payload_size(groups, backend, fargs)
+            t0 = time.time()
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                groups.run(infer_D, worker_count=worker_count, backend=backend, **kwargs)
+            t = time.time() - t0
+            print('{:d}\t{:d}\t{:d}\t{}\t{:.0f}\t{:.2f}'.format(args.cell_count,
+                len(groups.cells), worker_count, backend, size * 1e-3, t))
+
+
+if __name__ == '__main__':
+    main()
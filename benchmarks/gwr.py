@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Training time of the GWR tessellation with the nearest nodes searched for by scanning all the
+nodes ('dense') or in a KD-tree ('kdtree'), together with a few statistics of the resulting mesh.
+
+Both searches are exact and the same random seed is used, so the mesh statistics should not
+depend on the search.
+
+With `--crossover`, the training time of a grown gas is measured instead against the number of
+nodes of the gas, for each search; see also
+:const:`~tramway.tessellation.gwr.gas.KDTREE_MIN_NODE_COUNT`.
+
+Example::
+
+    python -m benchmarks.gwr --point-count 100000 1000000 --avg-distance .1 .02
+    python -m benchmarks.gwr --crossover --insertion-threshold .2 .1 .05 .02
+
+"""
+
+import time
+import copy
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from tramway.tessellation.gwr import GasMesh
+from tramway.tessellation.gwr.gas import Gas
+from tramway.core.scaler import whiten
+
+
+def example(point_count, seed=0):
+    np.random.seed(seed)
+    # two populations of molecules with different densities
+    dense = np.random.randn(point_count // 2, 2) * .5
+    sparse = np.random.rand(point_count - point_count // 2, 2) * 10. - 5.
+    return pd.DataFrame(np.r_[dense, sparse], columns=['x', 'y'])
+
+
+def run(points, avg_distance, nearest_node_search, query_batch_size, seed=1):
+    np.random.seed(seed)
+    mesh = GasMesh(whiten(), min_distance=.25 * avg_distance, avg_distance=avg_distance,
+            min_probability=20. / points.shape[0])
+    t0 = time.time()
+    mesh.tessellate(points.copy(), nearest_node_search=nearest_node_search,
+            query_batch_size=query_batch_size)
+    t = time.time() - t0
+    centers = mesh.cell_centers
+    adjacency = mesh.simplified_adjacency(format='coo')
+    edge_length = np.sqrt(np.sum((centers[adjacency.row] - centers[adjacency.col]) ** 2, axis=1))
+    return t, centers.shape[0], np.median(edge_length)
+
+
+def grown_gas(insertion_threshold, sample_count=100000, batch_size=20000, seed=0):
+    np.random.seed(seed)
+    sample = np.random.rand(sample_count, 2) * 10.
+    gas = Gas(sample[:10])
+    gas.insertion_threshold = insertion_threshold
+    gas.trust = 1.
+    gas.edge_lifetime = 50
+    gas.nearest_node_search = 'kdtree'
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for k in range(0, sample_count, batch_size):
+            gas.batch_train(sample[k:k+batch_size])
+    return gas
+
+
+def run_batch(gas, nearest_node_search, query_batch_size, sample_count=3000, seed=1):
+    np.random.seed(seed)
+    sample = np.random.rand(sample_count, 2) * 10.
+    gas = copy.deepcopy(gas)
+    gas.nearest_node_search = nearest_node_search
+    gas.query_batch_size = query_batch_size
+    t0 = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        gas.batch_train(sample)
+    return time.time() - t0
+
+
+def crossover(args):
+    print('nodes\tsearch\ttime (s)')
+    for insertion_threshold in args.insertion_threshold:
+        gas = grown_gas(insertion_threshold)
+        for search in args.search:
+            t = run_batch(gas, search, args.query_batch_size)
+            print('{:d}\t{}\t{:.3f}'.format(gas.size, search, t))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, nargs='+', default=[100000])
+    parser.add_argument('--avg-distance', type=float, nargs='+', default=[.1, .02])
+    parser.add_argument('--search', nargs='+', default=['dense', 'kdtree'])
+    parser.add_argument('--query-batch-size', type=int, default=20)
+    parser.add_argument('--crossover', action='store_true')
+    parser.add_argument('--insertion-threshold', type=float, nargs='+',
+            default=[.5, .2, .13, .1, .05, .02])
+    args = parser.parse_args()
+    if args.crossover:
+        crossover(args)
+        return
+    print('points\tavg distance\tsearch\ttime (s)\tcells\tmedian edge length')
+    for point_count in args.point_count:
+        points = example(point_count)
+        for avg_distance in args.avg_distance:
+            for search in args.search:
+                t, cell_count, edge_length = run(points, avg_distance, search,
+                        args.query_batch_size)
+                print('{:d}\t{:g}\t{}\t{:.1f}\t{:d}\t{:.4f}'.format(point_count, avg_distance,
+                    search, t, cell_count, edge_length))
+
+
+if __name__ == '__main__':
+    main()
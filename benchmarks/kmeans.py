@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the quality (inertia) and the wall time of the mini-batch k-means mode of
+:meth:`~tramway.tessellation.kmeans.KMeansMesh.tessellate` against the full-batch mode.
+
+The points are drawn from an anisotropic normal distribution. The inertia is the mean square
+distance between the points and their nearest cell centers.
+Full-batch k-means is skipped beyond `--max-batch-point-count` points.
+
+Example::
+
+    python benchmarks/kmeans.py --point-count 1000000 10000000 --cell-count 200
+
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import scipy.spatial as spatial
+from tramway.core.scaler import whiten
+from tramway.tessellation.kmeans import KMeansMesh
+
+
+def example(point_count, seed=0):
+    np.random.seed(seed)
+    return pd.DataFrame(np.random.randn(point_count, 2) * [1., 2.], columns=['x', 'y'])
+
+
+def inertia(tessellation, points, chunk_size=1000000):
+    tree = spatial.cKDTree(tessellation.cell_centers)
+    total = 0.
+    for start in range(0, len(points), chunk_size):
+        dist, _ = tree.query(points.values[start:start+chunk_size])
+        total += np.dot(dist, dist)
+    return total / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--cell-count', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--pass-count', type=float)
+    parser.add_argument('--chunk-size', type=int, default=1000000,
+            help='chunk size for the streaming variant')
+    parser.add_argument('--max-batch-point-count', type=int, default=1000000)
+    args = parser.parse_args()
+    print('points\tmode\ttime (s)\tinertia\tcells')
+    for point_count in args.point_count:
+        points = example(point_count)
+        modes = [('mini-batch', {}), ('streaming', {})]
+        if point_count <= args.max_batch_point_count:
+            modes.insert(0, ('batch', None))
+        for mode, kwargs in modes:
+            tessellation = KMeansMesh(whiten(), avg_probability=1. / args.cell_count)
+            if kwargs is None:
+                data = points.copy()
+            else:
+                kwargs = dict(minibatch=True, batch_size=args.batch_size, seed=1)
+                if mode == 'streaming':
+                    data = ( points.iloc[start:start+args.chunk_size] \
+                        for start in range(0, point_count, args.chunk_size) )
+                else:
+                    data = points.copy()
+                    kwargs['pass_count'] = args.pass_count
+            t0 = time.time()
+            tessellation.tessellate(data, **(kwargs or {}))
+            t = time.time() - t0
+            print('{:d}\t{}\t{:.1f}\t{:.5f}\t{:d}'.format(point_count, mode, t,
+                inertia(tessellation, points), tessellation.number_of_cells))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
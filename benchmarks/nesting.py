@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time a two-level grid-kmeans nesting with :class:`~tramway.tessellation.nesting.NestedTessellations`,
+against the former implementation that masks all the points for each parent cell.
+
+Example::
+
+    python benchmarks/nesting.py --point-count 1000000 --parent-cell-count 400 --worker-count 4
+
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from tramway.tessellation.grid import RegularMesh
+from tramway.tessellation.kmeans import KMeansMesh
+from tramway.tessellation.nesting import NestedTessellations
+
+
+def example(point_count, parent_cell_count, seed=0):
+    np.random.seed(seed)
+    points = pd.DataFrame(np.random.rand(point_count, 2) ** 2, columns=['x', 'y'])
+    parent = RegularMesh(avg_probability=1. / parent_cell_count)
+    parent.tessellate(points)
+    return points, parent
+
+
+def masked_tessellate(nested, points):
+    any_child = nested.child_factory(scaler=nested.scaler, **nested.child_factory_arguments)
+    any_child._preprocess(points)
+    pt_ids, cell_ids, rows = nested._parent_index(points)
+    nested.children = {}
+    for u in np.unique(cell_ids):
+        child = nested.child_factory(scaler=nested.scaler, **nested.child_factory_arguments)
+        child_pts = rows(points, pt_ids[cell_ids==u])
+        if child_pts.size:
+            child.tessellate(child_pts)
+            nested.children[u] = child
+
+
+def masked_cell_index(nested, points):
+    # array case only
+    pt_ids, cell_ids, rows = nested._parent_index(points)
+    cell_index = np.full(points.shape[0], -1)
+    cell_count = 0
+    for u in nested.children:
+        child = nested.children[u]
+        child_pt_ids = pt_ids[cell_ids==u]
+        if child_pt_ids.size:
+            child_cell_index = child.cell_index(rows(points, child_pt_ids))
+            child_cell_index[0<=child_cell_index] += cell_count
+            cell_index[child_pt_ids] = child_cell_index
+        cell_count += child.cell_adjacency.shape[0]
+    return cell_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, default=1000000)
+    parser.add_argument('--parent-cell-count', type=int, default=400)
+    parser.add_argument('--child-location-count', type=int, default=200,
+            help='average number of points per nested cell')
+    parser.add_argument('--worker-count', type=int, default=4)
+    args = parser.parse_args()
+
+    points, parent = example(args.point_count, args.parent_cell_count)
+    def nested():
+        return NestedTessellations(parent=parent, factory=KMeansMesh,
+                avg_probability=args.child_location_count * args.parent_cell_count \
+                        / float(args.point_count))
+
+    print('step\tmasked (s)\tgrouped (s)\tgrouped, {:d} workers (s)'.format(args.worker_count))
+
+    reference = nested()
+    t0 = time.time()
+    masked_tessellate(reference, points)
+    t_masked = time.time() - t0
+    tessellations = []
+    t = []
+    for worker_count in (None, args.worker_count):
+        tessellation = nested()
+        t0 = time.time()
+        tessellation.tessellate(points, worker_count=worker_count)
+        t.append(time.time() - t0)
+        tessellations.append(tessellation)
+    print('tessellate\t{:.2f}\t{:.2f}\t{:.2f}'.format(t_masked, *t))
+
+    t0 = time.time()
+    cell_index = masked_cell_index(reference, points)
+    t_masked = time.time() - t0
+    for tessellation in tessellations:
+        assert np.array_equal(tessellation.cell_index(points), cell_index)
+    t0 = time.time()
+    tessellations[0].cell_index(points)
+    t_grouped = time.time() - t0
+    print('cell_index\t{:.2f}\t{:.2f}\t'.format(t_masked, t_grouped))
+    print('{:d} parent cells, {:d} nested cells'.format(len(reference.children),
+        reference.cell_adjacency.shape[0]))
+
+
+if __name__ == '__main__':
+    main()
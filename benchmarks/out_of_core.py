@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measure the peak memory of :func:`~tramway.helper.tessellation.tessellate_out_of_core`
+for increasing numbers of points, read from trajectory files by chunks.
+
+Each run takes place in a separate process, and the maximum resident set size of
+the process is reported.
+
+Example::
+
+    python benchmarks/out_of_core.py --point-count 1000000 10000000 --method kmeans
+
+"""
+
+import os
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import argparse
+import subprocess
+import numpy as np
+import pandas as pd
+
+
+def write_example(path, point_count, chunk_size=1000000, seed=0):
+    # random walks in the unit square, 20 locations per trajectory
+    np.random.seed(seed)
+    with open(path, 'w') as f:
+        for start in range(0, point_count, chunk_size):
+            n = min(chunk_size, point_count - start) // 20
+            xy = np.cumsum(.01 * np.random.randn(n, 20, 2), axis=1) + np.random.rand(n, 1, 2)
+            chunk = pd.DataFrame(dict(
+                n=np.repeat(start // 20 + np.arange(n), 20),
+                x=xy[:,:,0].ravel(), y=xy[:,:,1].ravel(),
+                t=np.tile(.05 * np.arange(20), n)), columns=['n', 'x', 'y', 't'])
+            chunk.to_csv(f, sep='\t', header=False, index=False)
+
+
+def run(args):
+    from tramway.helper.tessellation import tessellate_out_of_core
+    t0 = time.time()
+    tessellation, cell_count = tessellate_out_of_core(args.input_file, args.method,
+            args.output_file, chunk_size=args.chunk_size, sample_size=args.sample_size,
+            seed=0, overwrite=True)
+    t = time.time() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024. # in MB (Linux)
+    print('{:d}\t{:.1f}\t{:.0f}'.format(int(cell_count.sum()), t, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--method', default='grid')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--sample-size', type=int, default=100000)
+    parser.add_argument('--input-file', help=argparse.SUPPRESS)
+    parser.add_argument('--output-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.input_file:
+        run(args)
+        return
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('points\tassigned\ttime (s)\tpeak memory (MB)')
+        for point_count in args.point_count:
+            input_file = os.path.join(tmpdir, 'points.txt')
+            write_example(input_file, point_count)
+            output = subprocess.check_output([sys.executable, __file__,
+                '--method', args.method, '--chunk-size', str(args.chunk_size),
+                '--sample-size', str(args.sample_size), '--input-file', input_file,
+                '--output-file', os.path.join(tmpdir, 'partition.h5')])
+            print('{:d}\t{}'.format(point_count, output.decode().strip().splitlines()[-1]))
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
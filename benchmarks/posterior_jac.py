@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+Wall time and number of posterior evaluations of the smooth *d*, *df*, *dd* and *dv*
+inference modes, with the analytic gradient of the posterior versus finite differences.
+
+Example::
+
+    python benchmarks/posterior_jac.py --cell-count 50 200 --modes d dv
+
+"""
+
+import time
+import argparse
+import warnings
+import numpy as np
+from tramway.helper.simulation import random_walk
+from tramway.helper import tessellate
+from tramway.inference import distributed
+from tramway.inference import standard_d, standard_df, standard_ddrift, dv
+
+
+modes = dict(
+    d=(standard_d, 'infer_smooth_D', dict(diffusivity_prior=1.)),
+    df=(standard_df, 'infer_smooth_DF', dict(diffusivity_prior=1., force_prior=.1)),
+    dd=(standard_ddrift, 'infer_smooth_DD', dict(diffusivity_prior=1., drift_prior=.1)),
+    dv=(dv, 'inferDV', dict(diffusivity_prior=1., potential_prior=1., verbose=False)),
+    )
+
+
+def simulate(cell_count, locations_per_cell=40, seed=0):
+    np.random.seed(seed)
+    trajectory_count = int(cell_count * locations_per_cell / 10)
+    trajectories = random_walk(diffusivity=.1, trajectory_mean_count=trajectory_count / 20.,
+            lifetime_tau=.5, duration=20., minor_step_count=0)
+    partition = tessellate(trajectories, 'grid', avg_location_count=locations_per_cell)
+    return distributed(partition)
+
+
+class CountingMinimize(object):
+    """Wraps :func:`scipy.optimize.minimize` to collect the number of function evaluations."""
+    def __init__(self, module):
+        self.module = module
+        self.minimize = module.minimize
+        self.nfev = self.nit = 0
+    def __call__(self, *args, **kwargs):
+        result = self.minimize(*args, **kwargs)
+        self.nfev += result.nfev
+        self.nit += result.nit
+        return result
+    def __enter__(self):
+        self.module.minimize = self
+        return self
+    def __exit__(self, *args):
+        self.module.minimize = self.minimize
+
+
+def run(mode, cells, jac):
+    module, infer, kwargs = modes[mode]
+    cells.clear_caches()
+    with CountingMinimize(module) as counter:
+        t0 = time.time()
+        getattr(module, infer)(cells, jac=jac, **kwargs)
+        t1 = time.time()
+    return t1 - t0, counter.nit, counter.nfev
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--modes', nargs='+', default=list(modes), choices=list(modes))
+    parser.add_argument('--skip-finite-differences', action='store_true')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    print('mode\tcells\tjac\ttime (s)\tniter\tnfev')
+    for cell_count in args.cell_count:
+        cells = simulate(cell_count)
+        for mode in args.modes:
+            jacs = ['analytic']
+            if not args.skip_finite_differences:
+                jacs.append('2-point')
+            for jac in jacs:
+                t, nit, nfev = run(mode, cells, jac)
+                print('{}\t{:d}\t{}\t{:.2f}\t{:d}\t{:d}'.format(mode, len(cells.cells), jac, t, nit, nfev))
+
+
+if __name__ == '__main__':
+    main()
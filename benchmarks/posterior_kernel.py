@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+Evaluation time of the negative log-likelihood of the smooth *d*, *df*, *dd* and *dv*
+inference modes, with the per-cell reference implementation versus the packed
+whole-mesh kernel (which also returns the gradient).
+
+Example::
+
+    python benchmarks/posterior_kernel.py --cell-count 100 1000 --locations-per-cell 20 200
+
+"""
+
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+import scipy.sparse as sparse
+from tramway.core import ChainArray
+from tramway.helper import tessellate
+from tramway.inference import distributed, smooth_infer_init
+from tramway.inference import standard_d, standard_df, standard_ddrift, dv
+
+
+def simulate(cell_count, locations_per_cell, trajectory_length=10, seed=0):
+    np.random.seed(seed)
+    trajectory_count = int(cell_count * locations_per_cell / trajectory_length)
+    dr = np.sqrt(2. * .1 * .05) * np.random.randn(trajectory_count, trajectory_length, 2)
+    dr[:,0] = np.random.rand(trajectory_count, 2) * 10.
+    xy = np.cumsum(dr, axis=1).reshape((-1, 2))
+    n = np.repeat(np.arange(1, trajectory_count + 1), trajectory_length)
+    t = np.tile(np.arange(trajectory_length) * .05, trajectory_count)
+    trajectories = pd.DataFrame(dict(n=n, x=xy[:,0], y=xy[:,1], t=t))
+    partition = tessellate(trajectories, 'grid', avg_location_count=locations_per_cell)
+    return distributed(partition)
+
+
+def likelihoods(cells, sigma2=.03 ** 2):
+    index, reverse_index, _, dt_mean, D, _, _, _ = smooth_infer_init(cells, sigma2=sigma2)
+    packed = cells.pack(index)
+    F = np.zeros((D.size, cells.dim))
+    V = np.zeros_like(D)
+    grad_operators = [ sparse.csr_matrix((D.size, D.size)) for _ in range(cells.dim) ]
+    args = (sigma2, None, False, dt_mean, None)
+    def x(name, y):
+        return ChainArray('D', D, name, y)
+    return dict(
+        d=(lambda: standard_d.smooth_d_neg_posterior(D, cells, *(args + (index, reverse_index, {}))),
+            lambda: standard_d.d_neg_posterior_and_jac(D, packed, *(args + (None, None)))),
+        df=(lambda: standard_df.smooth_df_neg_posterior(x('F', F).combined, x('F', F), cells,
+                *(args[:2] + (None,) + args[2:] + (index, reverse_index, {}))),
+            lambda: standard_df.df_neg_posterior_and_jac(x('F', F).combined, x('F', F), packed,
+                *(args[:2] + (None,) + args[2:] + (None, None)))),
+        dd=(lambda: standard_ddrift.smooth_dd_neg_posterior(x('drift', F).combined, x('drift', F), cells,
+                *(args[:2] + (None,) + args[2:] + (index, reverse_index, {}))),
+            lambda: standard_ddrift.dd_neg_posterior_and_jac(x('drift', F).combined, x('drift', F), packed,
+                *(args[:2] + (None,) + args[2:] + (None, None)))),
+        dv=(lambda: dv.dv_neg_posterior(dv.DV(D, V).combined, dv.DV(D, V), cells,
+                sigma2, False, dt_mean, index, reverse_index, {}, 0., False, []),
+            lambda: dv.dv_neg_posterior_and_jac(dv.DV(D, V).combined, dv.DV(D, V), packed,
+                sigma2, False, dt_mean, grad_operators, grad_operators, np.zeros(D.size), 0., False, None)),
+        )
+
+
+def timeit(f, repeat):
+    f() # warm the caches up
+    t0 = time.time()
+    for _ in range(repeat):
+        f()
+    return (time.time() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--locations-per-cell', type=int, nargs='+', default=[20, 200])
+    parser.add_argument('--modes', nargs='+', default=['d', 'df', 'dd', 'dv'])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    print('mode\tcells\ttranslocations\tper-cell (ms)\tpacked (ms)\tspeedup')
+    for cell_count in args.cell_count:
+        for locations_per_cell in args.locations_per_cell:
+            cells = simulate(cell_count, locations_per_cell)
+            kernels = likelihoods(cells)
+            for mode in args.modes:
+                reference, packed = kernels[mode]
+                t_ref, t_packed = timeit(reference, args.repeat), timeit(packed, args.repeat)
+                print('{}\t{:d}\t{:d}\t{:.2f}\t{:.2f}\t{:.1f}'.format(mode, len(cells.cells),
+                    cells.tcount, t_ref * 1e3, t_packed * 1e3, t_ref / t_packed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to simulate random walks with :func:`~tramway.helper.simulation.functional.random_walk`,
+with the trajectories simulated one after the other ('loop') or all the active trajectories
+moved at once ('vectorized'), with scalar callables wrapped or with vectorized callables.
+
+Example::
+
+    python benchmarks/random_walk.py --trajectory-count 100 1000 --minor-step-count 9
+
+"""
+
+import time
+import argparse
+import numpy as np
+from tramway.helper.simulation import random_walk
+
+
+def fields(vectorized):
+    # diffusivity gradient and harmonic force along y
+    if vectorized:
+        diffusivity = lambda x, t: .1 + .1 * x[:,0]
+        force = lambda x, t: np.c_[np.ones(x.shape[0]), -x[:,1]]
+    else:
+        diffusivity = lambda x, t: .1 + .1 * x[0]
+        force = lambda x, t: np.array([1., -x[1]])
+    return dict(diffusivity=diffusivity, force=force)
+
+
+def run(engine, vectorized_callables, **kwargs):
+    t0 = time.time()
+    points = random_walk(engine=engine, vectorized_callables=vectorized_callables,
+            **dict(kwargs, **fields(vectorized_callables)))
+    return time.time() - t0, points.shape[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trajectory-count', type=int, nargs='+', default=[100, 1000],
+            help='average number of active trajectories')
+    parser.add_argument('--duration', type=float, default=10.)
+    parser.add_argument('--minor-step-count', type=int, default=9)
+    parser.add_argument('--skip-loop', action='store_true')
+    args = parser.parse_args()
+    engines = [('vectorized', False), ('vectorized', True)]
+    if not args.skip_loop:
+        engines.insert(0, ('loop', False))
+    print('trajectories\tengine\tvectorized callables\ttime (s)\tlocations')
+    for trajectory_count in args.trajectory_count:
+        for engine, vectorized_callables in engines:
+            t, location_count = run(engine, vectorized_callables,
+                    trajectory_mean_count=trajectory_count, duration=args.duration,
+                    minor_step_count=args.minor_step_count, seed=0)
+            print('{:d}\t{}\t{}\t{:.2f}\t{:d}'.format(trajectory_count, engine,
+                vectorized_callables, t, location_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time the deletion of the low-count cells and the update of the cell centers (Lloyd's algorithm)
+with incremental reassignment, against a full call to `cell_index` and per-cell masks.
+
+The points are non-uniformly distributed so that several cells have too few points.
+
+Example::
+
+    python benchmarks/reassignment.py --point-count 1000000 --cell-count 20000
+
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from tramway.tessellation.base import Voronoi, Partition
+from tramway.helper.tessellation import delete_low_count_cells, update_cell_centers
+
+
+def example(point_count, cell_count, seed=0):
+    np.random.seed(seed)
+    points = pd.DataFrame(np.random.rand(point_count, 2) ** 2, columns=['x', 'y'])
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, 2), columns=['x', 'y']))
+    return Partition(points, tessellation, tessellation.cell_index(points))
+
+
+def delete_all_low_count_cells(partition, count_threshold, full):
+    # an explicit `index` argument makes `delete_low_count_cells` index all the points again,
+    # as in the former implementation
+    partition_kwargs = dict(index='kdtree') if full else {}
+    label = True
+    while True:
+        partition, deleted_cells, label = delete_low_count_cells(partition, count_threshold,
+                'count', label, partition_kwargs)
+        if deleted_cells.size == 0:
+            return partition
+
+
+def masked_lloyd(partition, max_iter):
+    tessellation, points = partition.tessellation, partition.points
+    X = points[['x', 'y']].values
+    cell_index = partition.cell_index
+    for _ in range(max_iter):
+        centers = np.array(tessellation.cell_centers)
+        for i in range(tessellation.number_of_cells):
+            cell = cell_index == i
+            if np.any(cell):
+                centers[i] = np.mean(X[cell], axis=0)
+        tessellation.cell_centers = centers
+        prev_cell_index, cell_index = cell_index, tessellation.cell_index(points)
+        if np.array_equal(cell_index, prev_cell_index):
+            break
+    return Partition(points, tessellation, cell_index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, default=1000000)
+    parser.add_argument('--cell-count', type=int, default=10000)
+    parser.add_argument('--count-threshold', type=int, default=20)
+    parser.add_argument('--lloyd-iter', type=int, default=2)
+    args = parser.parse_args()
+
+    print('step\tfull/masked (s)\tincremental (s)\tspeed-up')
+
+    t = []
+    for full in (True, False):
+        partition = example(args.point_count, args.cell_count)
+        t0 = time.time()
+        partition = delete_all_low_count_cells(partition, args.count_threshold, full)
+        t.append(time.time() - t0)
+        cell_index = partition.cell_index
+    assert np.array_equal(cell_index, partition.tessellation.cell_index(partition.points))
+    print('delete_low_count_cells\t{:.2f}\t{:.2f}\t{:.1f}'.format(t[0], t[1], t[0] / t[1]))
+
+    t = []
+    for update in (masked_lloyd, update_cell_centers):
+        partition = example(args.point_count, args.cell_count)
+        t0 = time.time()
+        partition = update(partition, args.lloyd_iter)
+        t.append(time.time() - t0)
+        if update is masked_lloyd:
+            cell_centers = partition.tessellation.cell_centers
+    assert np.allclose(cell_centers, partition.tessellation.cell_centers)
+    print('update_cell_centers\t{:.2f}\t{:.2f}\t{:.1f}'.format(t[0], t[1], t[0] / t[1]))
+
+
+if __name__ == '__main__':
+    main()
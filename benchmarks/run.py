@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Run the benchmark suite and store the timings as JSON.
+
+Each benchmark is run `--repeat` times per number of points after one warm-up call,
+and the minimum and median wall times are stored, together with the versions of
+the main dependencies and the current git commit, if any.
+
+Example::
+
+    python -m benchmarks.run --point-count 10000 100000 1000000 --output before.json
+    python -m benchmarks.run --point-count 10000 100000 1000000 --output after.json
+    python -m benchmarks.compare before.json after.json
+
+"""
+
+import sys
+import time
+import json
+import inspect
+import argparse
+import platform
+import subprocess
+import numpy as np
+import scipy
+import pandas as pd
+from . import suite
+
+
+def benchmarks(select=None):
+    """
+    Generates (*name*, *class*, *method name*) triplets for the `time_*` methods
+    of the classes in :mod:`benchmarks.suite`, with *name* as in asv.
+    """
+    for cls_name, cls in inspect.getmembers(suite, inspect.isclass):
+        if cls.__module__ != suite.__name__ or not cls_name.startswith('Time'):
+            continue
+        for attr in sorted(dir(cls)):
+            if attr.startswith('time_'):
+                name = '{}.{}'.format(cls_name, attr)
+                if select is None or any( s in name for s in select ):
+                    yield name, cls, attr
+
+
+def timeit(cls, attr, point_count, repeat):
+    """
+    Returns the wall times of `repeat` calls, or ``None`` if the benchmark is skipped.
+    """
+    bench = cls()
+    try:
+        bench.setup(point_count)
+    except NotImplementedError:
+        return None
+    try:
+        method = getattr(bench, attr)
+        method(point_count) # warm-up
+        times = []
+        for _ in range(repeat):
+            t0 = time.time()
+            method(point_count)
+            times.append(time.time() - t0)
+    finally:
+        teardown = getattr(bench, 'teardown', None)
+        if teardown is not None:
+            teardown(point_count)
+    return times
+
+
+def metadata():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(commit=commit, date=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            python=platform.python_version(), machine=platform.machine(),
+            numpy=np.__version__, scipy=scipy.__version__, pandas=pd.__version__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--point-count', type=int, nargs='+', default=suite.point_counts)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--select', nargs='+', help='run the benchmarks whose name contains any of these strings')
+    parser.add_argument('--output', default='benchmarks.json')
+    args = parser.parse_args()
+    results = {}
+    for name, cls, attr in benchmarks(args.select):
+        results[name] = {}
+        for point_count in args.point_count:
+            times = timeit(cls, attr, point_count, args.repeat)
+            if times is None:
+                continue
+            results[name][str(point_count)] = dict(min=min(times), median=float(np.median(times)))
+            print('{}\t{:d}\t{:.4f}'.format(name, point_count, min(times)))
+            sys.stdout.flush()
+    with open(args.output, 'w') as f:
+        json.dump(dict(metadata=metadata(), results=results), f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
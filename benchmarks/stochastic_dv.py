@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Throughput of :func:`~tramway.inference.stochastic_dv.infer_stochastic_DV` in iterations per
+second against the number of workers, with the parameter vector and the components passed to the
+workers through the queues ('queue') or kept in shared memory ('shared_memory').
+
+The number of iterations is fixed with `--iter-count`; the tolerance on the objective is set
+small enough for the optimization not to stop earlier.
+
+Example::
+
+    python -m benchmarks.stochastic_dv --cell-count 100 400 --worker-count 0 1 2 4
+
+"""
+
+import time
+import argparse
+import warnings
+import numpy as np
+from tramway.inference.stochastic_dv import infer_stochastic_DV
+from benchmarks import translocation_cells
+
+
+def example(cell_count, translocation_count_per_cell=20, sigma=.03, seed=0):
+    # drift towards the center
+    return translocation_cells(cell_count, translocation_count_per_cell, sigma=sigma, drift=1.,
+            seed=seed)
+
+
+def run(cells, iter_count, worker_count, backend, seed=1):
+    np.random.seed(seed)
+    t0 = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        infer_stochastic_DV(cells, diffusivity_prior=1., potential_prior=1.,
+                localization_error=.03, max_iter=iter_count, ftol=1e-20,
+                worker_count=worker_count, backend=backend, verbose=False)
+    return time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, nargs='+', default=[100, 400])
+    parser.add_argument('--iter-count', type=int, default=200)
+    parser.add_argument('--worker-count', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--backend', nargs='+', default=['queue', 'shared_memory'])
+    args = parser.parse_args()
+    print('cells\tworkers\tbackend\ttime (s)\titerations/s')
+    for cell_count in args.cell_count:
+        cells = example(cell_count)
+        for worker_count in args.worker_count:
+            for backend in args.backend:
+                t = run(cells, args.iter_count, worker_count, backend)
+                print('{:d}\t{:d}\t{}\t{:.1f}\t{:.0f}'.format(cell_count, worker_count, backend,
+                    t, args.iter_count / t))
+
+
+if __name__ == '__main__':
+    main()
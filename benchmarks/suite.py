@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite for the hot paths of tessellation, inference and I/O.
+
+The benchmarks follow the layout of `asv <https://asv.readthedocs.io>`_:
+each class has a `params` attribute with the numbers of simulated points,
+a `setup` method that prepares the data out of the timed section,
+and `time_*` methods that are timed.
+:mod:`benchmarks.run` runs them without asv and stores the timings as JSON.
+
+The SPT data are generated with :func:`~tramway.helper.simulation.functional.random_walk`,
+once per number of points and process.
+"""
+
+import os
+import shutil
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from tramway.helper.simulation import random_walk
+from tramway.core.xyt import load_xyt
+from tramway.core.analyses import Analyses
+from tramway.core.hdf5 import save_rwa, load_rwa
+from tramway.tessellation.base import Voronoi, CellStats
+from tramway.tessellation.gwr import GasMesh
+from tramway.core.scaler import whiten
+from tramway.inference.base import distributed, smooth_infer_init
+from tramway.inference.gradient import get_grad_kwargs, local_operator_weights
+import tramway.inference.standard_d as standard_d
+import tramway.inference.dv as dv
+
+
+point_counts = [10000, 100000, 1000000]
+
+_data = {}
+
+def spt_data(point_count, seed=0):
+    """
+    Simulated trajectories with about `point_count` locations in the unit square.
+    """
+    try:
+        return _data[point_count]
+    except KeyError:
+        pass
+    # about 200 locations per trajectory slot over 10 s with 50-ms time steps
+    points = random_walk(diffusivity=lambda x, t: .05 * (1. + x[:,0] * x[:,0]),
+            trajectory_mean_count=point_count / 200., lifetime_tau=.5,
+            duration=10., time_step=.05, minor_step_count=4, full=True,
+            engine='vectorized', vectorized_callables=True, seed=seed)
+    _data[point_count] = points
+    return points
+
+def voronoi(cell_count, seed=0):
+    np.random.seed(seed)
+    tessellation = Voronoi()
+    tessellation.tessellate(pd.DataFrame(np.random.rand(cell_count, 2), columns=['x', 'y']))
+    return tessellation
+
+def cell_count(point_count):
+    # about 50 locations per cell
+    return max(10, point_count // 50)
+
+
+class TimeCellIndex(object):
+    """ :meth:`~tramway.tessellation.base.Delaunay.cell_index` """
+    params = point_counts
+    param_names = ['points']
+
+    def setup(self, point_count):
+        self.points = spt_data(point_count)
+        self.tessellation = voronoi(cell_count(point_count))
+
+    def time_cell_index(self, point_count):
+        self.tessellation._cell_tree = None # include the construction of the tree
+        self.tessellation.cell_index(self.points)
+
+
+class TimeCellVolume(object):
+    """ :meth:`~tramway.tessellation.base.Voronoi.compute_cell_volume` (2D) """
+    params = point_counts
+    param_names = ['points']
+
+    def setup(self, point_count):
+        self.tessellation = voronoi(cell_count(point_count))
+        self.tessellation.vertex_adjacency # build the Voronoi graph
+
+    def time_cell_volume(self, point_count):
+        self.tessellation.compute_cell_volume()
+
+
+class TimeDistributed(object):
+    """ :func:`~tramway.inference.base.distributed` """
+    params = point_counts
+    param_names = ['points']
+
+    def setup(self, point_count):
+        points = spt_data(point_count)
+        tessellation = voronoi(cell_count(point_count))
+        self.stats = CellStats(points=points, tessellation=tessellation,
+                cell_index=tessellation.cell_index(points))
+
+    def time_distributed(self, point_count):
+        distributed(self.stats)
+
+
+class TimeGWR(object):
+    """ :meth:`~tramway.tessellation.gwr.GasMesh.tessellate` (batch training) """
+    params = point_counts
+    param_names = ['points']
+    # training is the slowest step; larger inputs are skipped
+    max_point_count = 100000
+
+    def setup(self, point_count):
+        if self.max_point_count < point_count:
+            raise NotImplementedError
+        self.points = spt_data(point_count)[['x', 'y']]
+
+    def time_batch_train(self, point_count):
+        np.random.seed(1)
+        mesh = GasMesh(whiten(), min_distance=.025, avg_distance=.1,
+                min_probability=20. / point_count)
+        mesh.tessellate(self.points.copy())
+
+
+class TimeIO(object):
+    """ :func:`~tramway.core.xyt.load_xyt`, :func:`~tramway.core.hdf5.store.save_rwa`
+    and :func:`~tramway.core.hdf5.store.load_rwa` """
+    params = point_counts
+    param_names = ['points']
+
+    def setup(self, point_count):
+        self.tmpdir = tempfile.mkdtemp()
+        points = spt_data(point_count)
+        self.analyses = Analyses(points[['n', 'x', 'y', 't']])
+        self.xyt_file = os.path.join(self.tmpdir, 'points.txt')
+        points[['n', 'x', 'y', 't']].to_csv(self.xyt_file, sep='\t', header=False, index=False)
+        self.rwa_file = os.path.join(self.tmpdir, 'points.rwa')
+        save_rwa(self.rwa_file, self.analyses, force=True)
+
+    def teardown(self, point_count):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def time_load_xyt(self, point_count):
+        load_xyt(self.xyt_file)
+
+    def time_save_rwa(self, point_count):
+        save_rwa(os.path.join(self.tmpdir, 'saved.rwa'), self.analyses, force=True)
+
+    def time_load_rwa(self, point_count):
+        load_rwa(self.rwa_file)
+
+
+class TimePosteriors(object):
+    """ posteriors and gradients of the standard.d and dv modes, at the initial values """
+    params = point_counts
+    param_names = ['points']
+
+    def setup(self, point_count):
+        points = spt_data(point_count)
+        tessellation = voronoi(cell_count(point_count))
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            cells = distributed(CellStats(points=points, tessellation=tessellation,
+                    cell_index=tessellation.cell_index(points)))
+        sigma2 = .03 * .03
+        index, reverse_index, n, dt_mean, D, _, _, _ = smooth_infer_init(cells, sigma2=sigma2)
+        grad_kwargs = get_grad_kwargs()
+        packed = cells.pack(index)
+        weights = local_operator_weights(cells, index, reverse_index)
+        operators = cells.gradient_operator(index, reverse_index, 'grad', **grad_kwargs)
+        self.d_args = (D, packed, sigma2, 1., False, dt_mean, None, operators, weights)
+        V = np.zeros_like(D)
+        x = dv.DV(D, V, 1., 1.)
+        self.dv_args = (x.combined, x, packed, sigma2, False, dt_mean,
+                operators, operators, weights, 0., False, [])
+
+    def time_d_posterior_and_jac(self, point_count):
+        standard_d.d_neg_posterior_and_jac(*self.d_args)
+
+    def time_dv_posterior_and_jac(self, point_count):
+        dv.dv_neg_posterior_and_jac(*self.dv_args)
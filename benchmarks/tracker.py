@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to track long movies with the non-tracking tracker, with the frame-to-frame assignments
+computed in a varying number of processes, with the sparse solver (see ``--dense``).
+
+The resulting trajectories do not depend on the number of processes.
+
+Example::
+
+    python benchmarks/tracker.py --frame-count 1000 --density 1000 --worker-count 1 2 4 8
+
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from tramway.analyzer import RWAnalyzer
+
+
+def example(frame_count, density, D=.1, dt=.04, side=10., seed=0):
+    np.random.seed(seed)
+    xy = np.random.rand(density, 2) * side
+    frames = []
+    for f in range(frame_count):
+        xy = xy + np.random.randn(*xy.shape) * np.sqrt(2. * D * dt)
+        # blinking molecules are replaced by new ones
+        visible = .1 < np.random.rand(len(xy))
+        frames.append(np.c_[xy[visible], np.full(np.sum(visible), (f + 1) * dt)])
+        xy = np.r_[xy[visible], np.random.rand(density - np.sum(visible), 2) * side]
+    return pd.DataFrame(np.vstack(frames), columns=list('xyt'))
+
+
+def run(locations, worker_count, sparse=True, dt=.04):
+    a = RWAnalyzer()
+    a.tracker.from_non_tracking()
+    a.tracker.frame_interval = dt
+    a.tracker.localization_precision = .02
+    a.tracker.estimated_high_diffusivity = .3
+    a.tracker.worker_count = worker_count
+    a.tracker.sparse = sparse
+    t0 = time.time()
+    trajectories = a.tracker.track(locations)
+    return time.time() - t0, trajectories['n'].max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frame-count', type=int, nargs='+', default=[1000])
+    parser.add_argument('--density', type=int, nargs='+', default=[200, 2000],
+            help='number of localizations per frame')
+    parser.add_argument('--worker-count', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--dense', action='store_true',
+            help='default dense solver; very slow with more than a few hundred localizations per frame')
+    args = parser.parse_args()
+    print('frames\tdensity\tworkers\ttime (s)\ttrajectories')
+    for frame_count in args.frame_count:
+        for density in args.density:
+            locations = example(frame_count, density)
+            for worker_count in args.worker_count:
+                t, trajectory_count = run(locations, worker_count, not args.dense)
+                print('{:d}\t{:d}\t{:d}\t{:.2f}\t{:d}'.format(frame_count, density, worker_count,
+                    t, trajectory_count))
+
+
+if __name__ == '__main__':
+    main()
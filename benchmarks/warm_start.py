@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Number of optimizer iterations to infer the diffusivity in consecutive sliding time windows,
+with each window initialized from scratch ('cold') or with the maps of the previous window ('warm').
+
+The diffusivity drifts slowly in time, so that consecutive windows share most of their
+translocations and have similar maps.
+
+Example::
+
+    python -m benchmarks.warm_start --cell-count 200 --window-count 10 --mode standard.d
+
+"""
+
+import time
+import argparse
+import warnings
+from tramway.tessellation.base import CellStats
+from tramway.inference.base import distributed, map_onto_cells
+import tramway.inference.standard_d as standard_d
+import tramway.inference.standard_df as standard_df
+import tramway.inference.standard_ddrift as standard_ddrift
+from benchmarks import translocations
+
+infer = {'standard.d': standard_d.infer_smooth_D,
+        'standard.df': standard_df.infer_smooth_DF,
+        'standard.dd': standard_ddrift.infer_smooth_DD}
+
+
+def example(cell_count, translocation_count_per_cell=100, duration=10., seed=0):
+    return translocations(cell_count, translocation_count_per_cell, duration=duration, seed=seed)
+
+
+def windows(points, tessellation, window_count, duration=10., shift=.25):
+    window = duration / (1. + (window_count - 1) * shift)
+    for w in range(window_count):
+        t0 = w * shift * window
+        trajectories = points['n'][(t0 <= points['t']) & (points['t'] < t0 + window)].unique()
+        segment = points[points['n'].isin(trajectories)]
+        yield distributed(CellStats(points=segment, tessellation=tessellation,
+                cell_index=tessellation.cell_index(segment)))
+
+
+def run(infer, cells, warm_start, **kwargs):
+    cells.clear_caches()
+    iterations = []
+    t0 = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        maps = infer(cells, warm_start=warm_start, callback=iterations.append, **kwargs)
+    return maps, len(iterations), time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cell-count', type=int, default=200)
+    parser.add_argument('--window-count', type=int, default=10)
+    parser.add_argument('--mode', choices=list(infer), default='standard.d')
+    parser.add_argument('--diffusivity-prior', type=float, default=10.)
+    args = parser.parse_args()
+    points, tessellation = example(args.cell_count)
+    kwargs = dict(diffusivity_prior=args.diffusivity_prior, localization_error=.03)
+    previous = None
+    total = dict(cold=[0, 0.], warm=[0, 0.])
+    print('window\tcold (iter)\twarm (iter)\tcold (s)\twarm (s)')
+    for w, cells in enumerate(windows(points, tessellation, args.window_count)):
+        maps, cold_iter, cold_time = run(infer[args.mode], cells, None, **kwargs)
+        if previous is None:
+            warm_iter, warm_time = cold_iter, cold_time
+        else:
+            maps, warm_iter, warm_time = run(infer[args.mode], cells,
+                    map_onto_cells(previous, cells), **kwargs)
+        previous = maps
+        total['cold'][0] += cold_iter; total['cold'][1] += cold_time
+        total['warm'][0] += warm_iter; total['warm'][1] += warm_time
+        print('{:d}\t{:d}\t{:d}\t{:.2f}\t{:.2f}'.format(w, cold_iter, warm_iter, cold_time, warm_time))
+    print('total\t{:d}\t{:d}\t{:.2f}\t{:.2f}'.format(total['cold'][0], total['warm'][0],
+        total['cold'][1], total['warm'][1]))
+
+
+if __name__ == '__main__':
+    main()
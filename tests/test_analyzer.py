@@ -591,6 +591,95 @@ class TestSideEffects(object):
         warnings.simplefilter('error', SideEffectWarning)
 
 
+class TestNonTracking(object):
+
+    def movie(self, n_frames=20, density=50, seed=0):
+        rng = np.random.RandomState(seed)
+        pos = rng.rand(density, 2) * 5.
+        frames = []
+        for f in range(n_frames):
+            pos = pos + rng.randn(*pos.shape) * np.sqrt(2*.1*.04)
+            keep = .1 < rng.rand(len(pos))
+            frames.append(np.c_[pos[keep], np.full(keep.sum(), (f+1)*.04)])
+            pos = np.r_[pos[keep], rng.rand(5, 2) * 5.]
+        return np.vstack(frames)
+
+    def test_sparse_assignment(self):
+        import tramway.tracking.track_non_track.file_processing_loc as nt
+        xyt = self.movie()
+        movie_per_frame, n_unique = nt.convert_to_list(xyt[::-1])
+        assert n_unique == 20
+        assert np.all(np.vstack(movie_per_frame)[:,2] == np.sort(xyt[:,2]))
+        length_high = 2.*np.sqrt(2.*.3*.04)
+        for frame_index in range(n_unique-1):
+            C = nt.get_cost_function(frame_index, movie_per_frame)
+            C_eff,_,_,_,row_eff,col_eff,M,N,n_row_eff,n_col_eff,anomaly = \
+                nt.correct_cost_function(C.copy(), length_high)
+            _, row, col = nt.get_assigment_matrix_from_reduced_cost(C_eff, row_eff, col_eff,
+                M, N, n_col_eff, n_row_eff, anomaly)
+            row_, col_ = nt.get_sparse_assigment(
+                *nt.get_sparse_cost_function(frame_index, movie_per_frame, length_high))
+            assert np.all(C[row_, col_] <= length_high**2)
+            assert len(np.unique(row_)) == len(row_) and len(np.unique(col_)) == len(col_)
+            # at least as many links, and not more expensive for as many links
+            assert len(row) <= len(row_)
+            if len(row) == len(row_):
+                assert np.sum(C[row_, col_]) <= np.sum(C[row, col]) + 1e-12
+
+    def test_track(self):
+        a = RWAnalyzer()
+        a.tracker.from_non_tracking()
+        a.tracker.frame_interval = .04
+        a.tracker.localization_precision = .02
+        a.tracker.estimated_high_diffusivity = .3
+        # well-separated particles
+        n_frames, side = 10, 4
+        x, y = np.meshgrid(np.arange(side), np.arange(side))
+        pos = np.c_[x.ravel(), y.ravel()].astype(float)
+        xyt = np.vstack([ np.c_[pos + .01 * f, np.full(len(pos), (f+1)*.04)] for f in range(n_frames) ])
+        trajectories = a.tracker.track(pd.DataFrame(xyt, columns=list('xyt')))
+        assert trajectories['n'].max() == side**2
+        assert np.all(trajectories.groupby('n').size() == n_frames)
+        assert np.allclose(np.sort(trajectories[list('xyt')].values, axis=0), np.sort(xyt, axis=0))
+
+    @pytest.mark.parametrize('sparse', [False, True])
+    def test_worker_count(self, sparse):
+        a = RWAnalyzer()
+        a.tracker.from_non_tracking()
+        a.tracker.frame_interval = .04
+        a.tracker.localization_precision = .02
+        a.tracker.estimated_high_diffusivity = .3
+        a.tracker.sparse = sparse
+        locations = pd.DataFrame(self.movie(), columns=list('xyt'))
+        serial = a.tracker.track(locations)
+        assert 0 < serial['n'].max()
+        a.tracker.worker_count = 2
+        parallel = a.tracker.track(locations)
+        assert serial.equals(parallel)
+
+    def test_sparse(self):
+        a = RWAnalyzer()
+        a.tracker.from_non_tracking()
+        a.tracker.frame_interval = .04
+        a.tracker.localization_precision = .02
+        a.tracker.estimated_high_diffusivity = .3
+        # the padding heuristic of the dense solver misses a link between the third and fourth frames
+        locations = pd.DataFrame(self.movie(seed=1), columns=list('xyt'))
+        assert not a.tracker.sparse
+        dense = a.tracker.track(locations)
+        a.tracker.sparse = True
+        sparse = a.tracker.track(locations)
+        def link_count(trajectories):
+            return len(trajectories) - trajectories['n'].nunique()
+        assert link_count(dense) < link_count(sparse)
+        length_high = a.tracker.estimated_large_length
+        for trajectories in (dense, sparse):
+            for _, trajectory in trajectories.groupby('n'):
+                xyt = trajectory[list('xyt')].values
+                assert np.all(np.isclose(np.diff(xyt[:,2]), .04))
+                assert np.all(np.sum(np.diff(xyt[:,:2], axis=0) ** 2, axis=1) <= length_high ** 2)
+
+
 class TestMisc(object):
 
     def test_analysis_save(self, tmp_path):
@@ -1,6 +1,7 @@
 
 import numpy
 import pandas
+from tramway.helper.simulation import random_walk
 
 seed = 123456789
 
@@ -228,3 +229,45 @@ class TestAnalyses(object):
         print(a) # shows if test fails
         assert set(a.labels) == set(('a list', 'another list'))
 
+
+
+class TestRandomWalk(object):
+
+    def fields(self, vectorized):
+        if vectorized:
+            return dict(diffusivity=lambda x, t: .1 + .1 * x[:,0],
+                    force=lambda x, t: numpy.c_[numpy.ones(len(x)), -x[:,1]])
+        else:
+            return dict(diffusivity=lambda x, t: .1 + .1 * x[0],
+                    force=lambda x, t: numpy.array([1., -x[1]]))
+
+    def test_vectorized_engine(self):
+        kwargs = dict(trajectory_mean_count=20, duration=2., minor_step_count=4,
+                full=True, seed=1)
+        loop = random_walk(engine='loop', **dict(kwargs, **self.fields(False)))
+        wrapped = random_walk(engine='vectorized', **dict(kwargs, **self.fields(False)))
+        vectorized = random_walk(engine='vectorized', vectorized_callables=True,
+                **dict(kwargs, **self.fields(True)))
+        # same births and deaths
+        assert numpy.array_equal(loop['n'].values, vectorized['n'].values)
+        assert numpy.array_equal(loop['t'].values, vectorized['t'].values)
+        # scalar callables are wrapped
+        assert numpy.allclose(wrapped.values, vectorized.values)
+        # reproducible
+        assert vectorized.equals(random_walk(engine='vectorized', vectorized_callables=True,
+                **dict(kwargs, **self.fields(True))))
+        # E[|dr|^2] = 4 D dt in 2D, for both engines; about 8000 steps each
+        D = .1
+        for engine in ('loop', 'vectorized'):
+            points = random_walk(diffusivity=D, trajectory_mean_count=100, duration=5.,
+                    full=True, engine=engine, seed=1)
+            same_trajectory = points['n'].values[1:] == points['n'].values[:-1]
+            dr = numpy.diff(points[['x','y']].values, axis=0)[same_trajectory]
+            dt = numpy.diff(points['t'].values)[same_trajectory]
+            msd = numpy.mean(numpy.sum(dr * dr, axis=1))
+            assert abs(msd / (4. * D * numpy.mean(dt)) - 1.) < .1
+
+    def test_reflect(self):
+        points = random_walk(diffusivity=1., trajectory_mean_count=20, duration=2.,
+                reflect=True, engine='vectorized', seed=1)
+        assert numpy.all((0 <= points[['x','y']].values) & (points[['x','y']].values <= 1))
@@ -0,0 +1,445 @@
+
+import numpy
+import numpy as np
+import pandas as pd
+import pytest
+import warnings
+from tramway.helper import tessellate, infer
+from tramway.inference import *
+from tramway.inference.optimization import check_jac, minimize_sparse_bfgs, sparse_bfgs_diagnostics
+from tramway.core import ChainArray
+import tramway.inference.standard_d as standard_d
+import tramway.inference.standard_df as standard_df
+import tramway.inference.standard_ddrift as standard_ddrift
+import tramway.inference.dv as dv
+import tramway.inference.stochastic_dv as stochastic_dv
+import tramway.inference.degraded_d as degraded_d
+import tramway.inference.d_conj_prior as d_conj_prior
+from tramway.inference.bayes_factors.get_D_posterior import get_D_confidence_interval
+
+seed = 4294947105
+
+
+def brownian_trajectories(n_trajs=300, length=10, D=.1, dt=.05, drift=(.02, 0.)):
+    numpy.random.seed(seed)
+    n, xy, t = [], [], []
+    for k in range(n_trajs):
+        x0 = numpy.random.rand(2)
+        dx = numpy.sqrt(2. * D * dt) * numpy.random.randn(length-1, 2) + numpy.asarray(drift)
+        n.append(numpy.full(length, k+1))
+        xy.append(x0 + numpy.r_[numpy.zeros((1, 2)), numpy.cumsum(dx, axis=0)])
+        t.append(numpy.random.rand() * 10. + dt * numpy.arange(length))
+    df = pd.DataFrame(numpy.vstack(xy), columns=['x', 'y'])
+    df['n'] = numpy.concatenate(n)
+    df['t'] = numpy.concatenate(t)
+    return df[['n', 'x', 'y', 't']]
+
+@pytest.fixture
+def cells():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        partition = tessellate(brownian_trajectories(), 'grid', avg_location_count=40)
+        return distributed(partition)
+
+
+class TestDistributed(object):
+
+    @pytest.mark.parametrize('thinned', [False, True])
+    @pytest.mark.parametrize('include_empty_cells', [False, True])
+    def test_grouping(self, thinned, include_empty_cells):
+        points = brownian_trajectories()
+        if thinned:
+            # translocations are no longer found between consecutive row labels
+            points = points.iloc[numpy.arange(len(points)) % 7 != 3]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            partition = tessellate(points, 'grid', avg_location_count=40)
+        # a custom assignment function disables the grouping by sort
+        def initial_cell(tessellation, cell, translocations, translocation_cell, get_point):
+            return translocation_cell[0] == cell
+        expected = distributed(partition, fuzzy=initial_cell,
+                include_empty_cells=include_empty_cells)
+        actual = distributed(partition, include_empty_cells=include_empty_cells)
+        assert list(actual.keys()) == list(expected.keys())
+        for i in expected:
+            assert actual[i].origins.equals(expected[i].origins)
+            assert actual[i].destinations.equals(expected[i].destinations)
+            assert numpy.array_equal(actual[i].dr, expected[i].dr)
+            assert numpy.array_equal(actual[i].dt, expected[i].dt)
+            assert numpy.array_equal(actual[i].n, expected[i].n)
+            assert numpy.array_equal(actual[i].center, expected[i].center)
+            assert numpy.array_equal(actual[i].span, expected[i].span)
+        assert (actual.adjacency != expected.adjacency).nnz == 0
+
+    @pytest.mark.parametrize('worker_count', [0, 2])
+    @pytest.mark.parametrize('backend', ['pickle', 'fork'])
+    def test_run_backend(self, cells, worker_count, backend):
+        expected = degraded_d.infer_D(cells, localization_error=.03)
+        groups = cells.group(ngroups=4)
+        actual = groups.run(degraded_d.infer_D, localization_error=.03,
+                worker_count=worker_count, backend=backend)
+        assert list(actual.index) == list(expected.index)
+        assert numpy.allclose(actual.values, expected.values)
+
+
+class TestGradientOperator(object):
+
+    @pytest.mark.parametrize('operator', ['grad', 'local_variation'])
+    def test_spatial(self, cells, operator):
+        cells.clear_caches()
+        index, reverse_index, _, _, _, _, _, _ = smooth_infer_init(cells, sigma2=.03 ** 2)
+        index = numpy.asarray(index)
+        grad_kwargs = get_grad_kwargs()
+        G = cells.gradient_operator(index, reverse_index, operator, **grad_kwargs)
+        assert cells.gradient_operator(index, reverse_index, operator, **grad_kwargs) is G
+        numpy.random.seed(seed)
+        X = numpy.random.rand(index.size)
+        GX = numpy.stack([ _G.dot(X) for _G in G ], axis=1)
+        for j, i in enumerate(index):
+            reference = getattr(cells, operator)(i, X, reverse_index, **grad_kwargs)
+            if reference is None:
+                assert numpy.all(GX[j] == 0)
+            else:
+                reference = numpy.ravel(reference)
+                assert numpy.allclose(GX[j,:reference.size], reference, equal_nan=True)
+                assert numpy.all(GX[j,reference.size:] == 0)
+        cells.clear_caches()
+        assert cells.gradient_operator(index, reverse_index, operator, **grad_kwargs) is not G
+
+    def test_time_derivative(self):
+        from tramway.inference.time import DynamicCells, DynamicTranslocations
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            partition = tessellate(brownian_trajectories(), 'grid', avg_location_count=80,
+                    time_window_duration=2., enable_time_regularization=True)
+            cells = distributed(partition, new_cell=DynamicTranslocations, new_group=DynamicCells)
+        index = numpy.array(list(cells.keys()))
+        T = cells.time_derivative_operator()
+        assert T.shape == (index.size, index.size)
+        reverse_index = numpy.full(cells.adjacency.shape[0], -1, dtype=int)
+        reverse_index[index] = numpy.arange(index.size)
+        X = numpy.random.rand(index.size)
+        TX = T.dot(X)
+        for j, i in enumerate(index):
+            reference = cells.time_derivative(i, X, reverse_index)
+            if reference is None:
+                assert TX[j] == 0
+            else:
+                assert numpy.isclose(TX[j], reference)
+
+
+class TestAnalyticJacobian(object):
+
+    sigma2 = .03 ** 2
+
+    def prepare(self, cells, operator):
+        cells.clear_caches()
+        index, reverse_index, _, dt_mean, D, _, _, _ = smooth_infer_init(cells, sigma2=self.sigma2)
+        grad_kwargs = get_grad_kwargs()
+        operators = cells.gradient_operator(index, reverse_index, operator, **grad_kwargs)
+        numpy.random.seed(seed)
+        D = D * (1. + .3 * numpy.random.rand(D.size))
+        return index, reverse_index, dt_mean, D, grad_kwargs, operators
+
+    @pytest.mark.parametrize('operator', ['grad', 'local_variation'])
+    def test_d(self, cells, operator):
+        index, reverse_index, dt_mean, D, grad_kwargs, operators = self.prepare(cells, operator)
+        weights = local_operator_weights(cells, index, reverse_index)
+        args = (self.sigma2, 1., True, dt_mean, None)
+        reference = standard_d.smooth_d_neg_posterior if operator == 'grad' else standard_d.d_neg_posterior1
+        packed_args = (cells.pack(index),) + args + (operators, weights)
+        f, _ = standard_d.d_neg_posterior_and_jac(D, *packed_args)
+        cells.clear_caches()
+        assert numpy.isclose(f, reference(D, cells, *(args + (index, reverse_index, grad_kwargs))))
+        err, _, _ = check_jac(standard_d.d_neg_posterior_and_jac, D, packed_args)
+        assert err < 1e-6
+
+    @pytest.mark.parametrize('operator', ['grad', 'local_variation'])
+    def test_df_dd(self, cells, operator):
+        index, reverse_index, dt_mean, D, grad_kwargs, operators = self.prepare(cells, operator)
+        weights = local_operator_weights(cells, index, reverse_index)
+        F = .1 * numpy.random.randn(D.size, 2)
+        for module, name, reference in (
+                (standard_df, 'F', (standard_df.smooth_df_neg_posterior, standard_df.df_neg_posterior1)),
+                (standard_ddrift, 'drift', (standard_ddrift.smooth_dd_neg_posterior, standard_ddrift.dd_neg_posterior1)),
+                ):
+            reference = reference[0] if operator == 'grad' else reference[1]
+            fun = getattr(module, module.__name__.split('_')[-1][:2] + '_neg_posterior_and_jac')
+            x = ChainArray('D', D, name, F)
+            args = (self.sigma2, 1., .5, True, dt_mean, None)
+            packed_args = (x, cells.pack(index)) + args + (operators, weights)
+            f, _ = fun(numpy.array(x.combined), *packed_args)
+            y = ChainArray('D', D, name, F)
+            assert numpy.isclose(f, reference(numpy.array(y.combined), y, cells, *(args + (index, reverse_index, grad_kwargs))))
+            err, _, _ = check_jac(fun, x.combined, packed_args)
+            assert err < 1e-6
+
+    @pytest.mark.parametrize('operator', ['grad', 'local_variation'])
+    def test_dv(self, cells, operator):
+        index, reverse_index, dt_mean, D, grad_kwargs, prior_operators = self.prepare(cells, operator)
+        grad_operators = cells.gradient_operator(index, reverse_index, **grad_kwargs)
+        weights = local_operator_weights(cells, index, reverse_index)
+        V = numpy.random.rand(D.size)
+        x = dv.DV(D, V, 1., 2.)
+        args = (self.sigma2, True, dt_mean)
+        packed_args = (x, cells.pack(index)) + args + \
+                (grad_operators, prior_operators, weights, 0., False, None)
+        f, _ = dv.dv_neg_posterior_and_jac(numpy.array(x.combined), *packed_args)
+        reference = dv.dv_neg_posterior if operator == 'grad' else dv.dv_neg_posterior1
+        y = dv.DV(D, V, 1., 2.)
+        assert numpy.isclose(f, reference(numpy.array(y.combined), y, cells,
+                *(args + (index, reverse_index, grad_kwargs, 0., False, []))))
+        err, _, _ = check_jac(dv.dv_neg_posterior_and_jac, x.combined, packed_args)
+        assert err < 1e-6
+
+    def test_smooth_d(self, cells):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            cells.clear_caches()
+            analytic = standard_d.infer_smooth_D(cells, diffusivity_prior=1., jac='analytic')
+            cells.clear_caches()
+            finite_differences = standard_d.infer_smooth_D(cells, diffusivity_prior=1., jac=None)
+        assert numpy.allclose(analytic.values, finite_differences.values, rtol=1e-3, atol=1e-4)
+
+    def test_pack(self, cells):
+        index = numpy.array(list(cells.keys()))[::-2]
+        packed = cells.pack(index)
+        assert len(packed) == index.size
+        x = numpy.random.rand(index.size)
+        expanded = packed.expand(x)
+        for j, i in enumerate(index):
+            cell = cells[i]
+            segment = slice(packed.offsets[j], packed.offsets[j+1])
+            assert numpy.array_equal(packed.dt[segment], cell.dt)
+            assert numpy.allclose(packed.dr2[segment], numpy.sum(cell.dr * cell.dr, axis=1))
+            assert numpy.all(expanded[segment] == x[j])
+        assert numpy.allclose(packed.sum(packed.dt), [ numpy.sum(cells[i].dt) for i in index ])
+
+
+
+class TestDegradedD(object):
+
+    @pytest.mark.parametrize('jeffreys_prior', [False, True])
+    @pytest.mark.parametrize('min_diffusivity', [None, 0.])
+    @pytest.mark.parametrize('localization_error', [.03, .3])
+    def test_packed(self, cells, jeffreys_prior, min_diffusivity, localization_error):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            # any argument for `scipy.optimize.minimize` disables the packed solver
+            expected = degraded_d.infer_D(cells, localization_error, jeffreys_prior,
+                    min_diffusivity, method='L-BFGS-B')
+            actual = degraded_d.infer_D(cells, localization_error, jeffreys_prior,
+                    min_diffusivity)
+        assert list(actual.index) == list(expected.index)
+        assert numpy.allclose(actual['diffusivity'], expected['diffusivity'],
+                rtol=1e-4, atol=1e-6)
+        sigma2 = localization_error * localization_error
+        for i in actual.index:
+            cell = cells[i]
+            args = (cell, sigma2, jeffreys_prior, numpy.mean(cell.dt), -numpy.inf)
+            assert degraded_d.d_neg_posterior(actual['diffusivity'][i], *args) <= \
+                    degraded_d.d_neg_posterior(expected['diffusivity'][i], *args) + 1e-8
+
+
+    @pytest.mark.parametrize('mode', ['degraded.d', None])
+    def test_plugin(self, mode):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            partition = tessellate(brownian_trajectories(), 'grid', avg_location_count=40,
+                    cache=False)
+            maps = infer(partition) if mode is None else infer(partition, mode)
+        assert maps.mode == 'degraded.d'
+        assert numpy.all(numpy.isfinite(maps['diffusivity'].values))
+
+    def test_diagnostics(self, cells):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            maps, info = degraded_d.infer_D(cells, diagnostics=True)
+        assert list(maps.index) == list(cells.keys())
+        assert 0 < info['diagnostics']['ncalls']
+
+
+class TestDConjPrior(object):
+
+    @pytest.mark.parametrize('localization_error', [0., .03])
+    def test_confidence_intervals(self, cells, localization_error):
+        index = numpy.array(list(cells.keys()))
+        packed = cells.pack(index)
+        dt = cells.any_cell().dt[0]
+        sigma2 = localization_error * localization_error
+        maps = d_conj_prior.d_conj_prior_maps(packed.count, packed.sum(packed.dr),
+                packed.sum(packed.dr * packed.dr), dt, sigma2, index=index).maps
+        assert list(maps.index) == list(index)
+        zeta_t = maps[['zeta_total x', 'zeta_total y']]
+        for i in maps['diffusivity'].dropna().index:
+            D_map, D_ci = get_D_confidence_interval(.95, maps['n'][i], zeta_t.loc[i].values,
+                    maps['V'][i], maps['V_prior'][i], dt, sigma2, 2)
+            assert numpy.isclose(maps['diffusivity'][i], D_map)
+            assert numpy.allclose(maps.loc[i, ['ci low', 'ci high']].values, D_ci, rtol=1e-8)
+
+
+class TestSparseBFGS(object):
+
+    m = 20
+
+    def minimize(self, worker_count, backend, max_iter=None, memory=None, **kwargs):
+        m = self.m
+        target = numpy.arange(m, dtype=float)
+        def fun(j, x):
+            f = (x[j] - target[j]) ** 2
+            if j + 1 < m:
+                f += .1 * (x[j] - x[j+1]) ** 2
+            return f
+        covariate = lambda i: [ j for j in (i-1, i) if 0 <= j ]
+        gradient_subspace = lambda i: numpy.array([i])
+        x0 = numpy.zeros(m)
+        numpy.random.seed(0)
+        return minimize_sparse_bfgs(fun, x0, m, covariate, gradient_subspace, None,
+                max_iter=max_iter or 40*m, worker_count=worker_count, backend=backend, ftol=1e-12,
+                eps=1., ls_step_max=2., ls_wolfe=(.5, None), ls_armijo_max=5,
+                independent_components=True, memory=memory, **kwargs)
+
+    def solution(self):
+        m = self.m
+        # normal equations of the quadratic objective
+        A = numpy.eye(m)
+        A[:-1,:-1] += .1 * numpy.eye(m-1)
+        A[1:,1:] += .1 * numpy.eye(m-1)
+        A[numpy.arange(m-1), numpy.arange(1, m)] = A[numpy.arange(1, m), numpy.arange(m-1)] = -.1
+        return numpy.linalg.solve(A, numpy.arange(m, dtype=float))
+
+    @pytest.mark.parametrize('worker_count', [0, 2])
+    @pytest.mark.parametrize('backend', ['queue', 'shared_memory'])
+    @pytest.mark.parametrize('memory', [None, 3])
+    def test_backend(self, worker_count, backend, memory):
+        # with workers, the order of the component updates is not deterministic
+        result = self.minimize(worker_count, backend, memory=memory)
+        assert numpy.allclose(result.x, self.solution(), atol=.05)
+
+    def test_max_iter(self):
+        # the serial pseudo-worker stops on running out of iterations
+        result = self.minimize(0, 'queue', self.m // 2)
+        assert result.resolution == 'MAXIMUM ITERATION REACHED'
+        assert result.niter == self.m // 2
+
+    @pytest.mark.parametrize('memory', [None, 3])
+    def test_checkpoint(self, tmpdir, memory):
+        m = self.m
+        checkpoint = str(tmpdir.join('checkpoint.npz'))
+        returns = {'f', 'df', 'ncalls'}
+        uninterrupted = self.minimize(0, 'queue', 4*m, memory, returns=returns)
+        # interrupt after the periodic checkpoint at iteration 2*m
+        def diagnosis(k, *args):
+            if 2*m + 5 <= k:
+                raise SystemExit
+        interrupted = self.minimize(0, 'queue', 4*m, memory, returns=returns,
+                diagnosis=diagnosis, checkpoint=checkpoint, checkpoint_interval=m)
+        assert interrupted.resolution == 'INTERRUPTED'
+        numpy.random.seed(1) # the random state is restored from the checkpoint
+        resumed = self.minimize(0, 'queue', 4*m, memory, returns=returns, resume_from=checkpoint)
+        assert resumed.niter == uninterrupted.niter
+        assert numpy.array_equal(resumed.x, uninterrupted.x)
+        assert resumed.f == uninterrupted.f
+        assert resumed.ncalls == uninterrupted.ncalls
+
+    def test_resume_iteration_number(self, tmpdir):
+        # with workers, the resumed run carries on with the checkpointed step numbers
+        m = self.m
+        checkpoint = str(tmpdir.join('checkpoint.npz'))
+        self.minimize(0, 'queue', 2*m, checkpoint=checkpoint)
+        resumed = self.minimize(1, 'queue', 3*m, returns={'diagnosis'},
+                diagnosis=lambda k, *args: k, resume_from=checkpoint)
+        assert resumed.niter == 3*m
+        assert 2*m <= min(resumed.diagnosis)
+
+    def test_stochastic_dv_checkpoint(self, cells, tmpdir):
+        checkpoint = str(tmpdir.join('checkpoint.npz'))
+        kwargs = dict(diffusivity_prior=1., potential_prior=1., worker_count=0, verbose=False)
+        numpy.random.seed(0)
+        uninterrupted, _ = stochastic_dv.infer_stochastic_DV(cells, max_iter=20, **kwargs)
+        numpy.random.seed(0)
+        stochastic_dv.infer_stochastic_DV(cells, max_iter=10, checkpoint=checkpoint, **kwargs)
+        resumed, _ = stochastic_dv.infer_stochastic_DV(cells, max_iter=20, resume_from=checkpoint,
+                **kwargs)
+        assert numpy.array_equal(resumed.values, uninterrupted.values)
+
+
+class TestWarmStart(object):
+
+    def infer(self, cells, warm_start=None):
+        iterations = []
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            maps = standard_d.infer_smooth_D(cells, diffusivity_prior=1., localization_error=.03,
+                    warm_start=warm_start, callback=iterations.append)
+        return maps, len(iterations)
+
+    def test_same_mesh(self, cells):
+        maps, cold_iterations = self.infer(cells)
+        warm_maps, warm_iterations = self.infer(cells, map_onto_cells(maps, cells))
+        assert warm_iterations < cold_iterations
+        assert numpy.allclose(warm_maps['diffusivity'], maps['diffusivity'], rtol=1e-2)
+
+    @pytest.mark.parametrize('diffusivity_prior', [None, 1.])
+    def test_d_mode(self, diffusivity_prior):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            partition = tessellate(brownian_trajectories(), 'grid', avg_location_count=40,
+                    cache=False)
+            maps = infer(partition, 'd', diffusivity_prior=diffusivity_prior)
+            warm_maps = infer(partition, 'd', diffusivity_prior=diffusivity_prior,
+                    warm_start=maps)
+        assert numpy.allclose(warm_maps['diffusivity'], maps['diffusivity'], rtol=1e-2)
+
+    def test_nearest_center(self, cells):
+        index = numpy.array(list(cells.keys()))
+        centers = numpy.stack([ cells[i].center for i in index ])
+        # previous maps defined on a coarser mesh made of every other cell
+        coarse = numpy.arange(0, index.size, 2)
+        maps = pd.DataFrame(dict(diffusivity=coarse.astype(float)), index=numpy.arange(coarse.size))
+        warm_start = map_onto_cells(maps, cells, centers[coarse])
+        assert list(warm_start.index) == list(index)
+        nearest = numpy.argmin(((centers[:,numpy.newaxis,:] - centers[numpy.newaxis,coarse,:]) ** 2
+            ).sum(axis=2), axis=1)
+        assert numpy.array_equal(warm_start['diffusivity'].values, coarse[nearest])
+
+
+class TestDiagnostics(object):
+
+    def test_objective_counter(self, cells):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = standard_d.infer_smooth_D(cells, diffusivity_prior=1., localization_error=.03)
+            maps, info = standard_d.infer_smooth_D(cells, diffusivity_prior=1., localization_error=.03,
+                    diagnostics=True)
+        assert numpy.allclose(maps.values, expected.values)
+        diagnostics = info['diagnostics']
+        trace = diagnostics['trace']
+        assert diagnostics['nruns'] == 1
+        assert 0 < diagnostics['niter'] == trace.shape[0]
+        assert diagnostics['niter'] <= diagnostics['ncalls']
+        assert numpy.all(numpy.diff(trace[:,0]) > 0)
+        assert trace[-1,0] <= diagnostics['ncalls']
+        assert 0 < diagnostics['evaltime']
+
+    def test_merge(self, cells):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            groups = cells.group(ngroups=3)
+            _, info = groups.run(standard_d.infer_smooth_D, diffusivity_prior=1.,
+                    localization_error=.03, diagnostics=True, worker_count=0)
+        diagnostics = info['diagnostics']
+        assert diagnostics['nruns'] == len(groups.cells)
+        assert diagnostics['niter'] == diagnostics['trace'].shape[0]
+        assert numpy.all(numpy.diff(diagnostics['trace'][:,0]) > 0)
+
+    def test_sparse_bfgs(self):
+        m = 10
+        fun = lambda j, x: (x[j] - j) ** 2
+        result = minimize_sparse_bfgs(fun, numpy.zeros(m), m, lambda i: [i],
+                lambda i: numpy.array([i]), None, max_iter=5*m, worker_count=0,
+                returns={'f', 'ncalls', 'evaltime'}, eps=1.)
+        diagnostics = sparse_bfgs_diagnostics(result)
+        assert diagnostics['ncalls'] == sum(result.ncalls)
+        assert diagnostics['trace'].shape == (len(result.f), 3)
+        assert 0 < diagnostics['evaltime']
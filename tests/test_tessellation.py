@@ -0,0 +1,505 @@
+
+import numpy
+import pandas
+import pytest
+
+seed = 123456789
+
+
+from tramway.tessellation.base import *
+class TestDelaunay(object):
+
+    def example_points(self, n=3000):
+        numpy.random.seed(seed)
+        return pandas.DataFrame(10. * numpy.random.rand(n, 2), columns=['x', 'y'])
+
+    def example_tessellation(self, n=80):
+        numpy.random.seed(seed + 1)
+        tessellation = Voronoi()
+        tessellation.tessellate(pandas.DataFrame(10. * numpy.random.rand(n, 2), columns=['x', 'y']))
+        return tessellation
+
+    def _normalize(self, cell_index):
+        if isinstance(cell_index, tuple):
+            I, J = cell_index
+            order = numpy.lexsort((J, I))
+            return I[order].tolist(), J[order].tolist()
+        else:
+            return numpy.asarray(cell_index).tolist()
+
+    @pytest.mark.parametrize('kwargs', [
+        {}, dict(min_location_count=40), dict(knn=30), dict(knn=(None, 30)), dict(knn=(20, 50)),
+        dict(knn=lambda c: (20, 50)), dict(radius=(None, .6)), dict(radius=(.5, None)),
+        dict(knn=50, min_location_count=20), dict(format='force array', knn=50)])
+    def test_kdtree_index(self, kwargs):
+        tessellation, points = self.example_tessellation(), self.example_points()
+        kdtree = tessellation.cell_index(points, index='kdtree', **kwargs)
+        dense = tessellation.cell_index(points, index='dense', **kwargs)
+        assert self._normalize(kdtree) == self._normalize(dense)
+
+    def test_kdtree_index_few_points(self):
+        # fewer points than the minimum number of nearest neighbours
+        tessellation, points = self.example_tessellation(), self.example_points(5)
+        kwargs = dict(knn=lambda c: (8, None))
+        kdtree = tessellation.cell_index(points, index='kdtree', **kwargs)
+        dense = tessellation.cell_index(points, index='dense', **kwargs)
+        assert numpy.all(kdtree[0] < 5)
+        assert self._normalize(kdtree) == self._normalize(dense)
+
+    def test_radius(self):
+        tessellation, points = self.example_tessellation(), self.example_points()
+        I, J = tessellation.cell_index(points, radius=.8, format='pair')
+        X, Y = points.values, tessellation.cell_centers
+        d = numpy.sqrt(numpy.sum((X[:,numpy.newaxis,:] - Y[numpy.newaxis,:,:]) ** 2, axis=2))
+        _I, _J = (d <= .8).nonzero()
+        assert self._normalize((I, J)) == self._normalize((_I, _J))
+        assert self._normalize((I, J)) == self._normalize(
+                tessellation.cell_index(points, radius=.8, format='pair', index='dense'))
+
+    def test_tree_update(self):
+        tessellation = self.example_tessellation()
+        tree = tessellation.cell_tree
+        assert tessellation.cell_tree is tree
+        tessellation.cell_centers = tessellation.cell_centers[:-1]
+        assert tessellation.cell_tree is not tree
+        assert tessellation.cell_tree.n == tessellation.cell_centers.shape[0]
+
+
+
+from tramway.tessellation.window import SlidingWindow
+class TestSlidingWindow(object):
+
+    def example(self, n=5000, shuffle=False):
+        numpy.random.seed(seed)
+        points = pandas.DataFrame(10. * numpy.random.rand(n, 2), columns=['x', 'y'])
+        points['t'] = numpy.sort(100. * numpy.random.rand(n))
+        if shuffle:
+            points = points.iloc[numpy.random.permutation(n)]
+        spatial_mesh = Voronoi()
+        spatial_mesh.tessellate(pandas.DataFrame(10. * numpy.random.rand(50, 2), columns=['x', 'y']))
+        tessellation = SlidingWindow(duration=10., shift=2.)
+        tessellation.spatial_mesh = spatial_mesh
+        return tessellation, points
+
+    def reference(self, tessellation, points, **kwargs):
+        # assign the points segment by segment
+        exclude = kwargs.pop('exclude_cells_by_location_count', None)
+        ncells = tessellation.spatial_mesh.cell_adjacency.shape[0]
+        ts = points['t'].values
+        ps, cs = [], []
+        for t, (t0, t1) in enumerate(tessellation.time_lattice):
+            pts, = numpy.nonzero((t0 <= ts) & (ts < t1))
+            ids = tessellation.spatial_mesh.cell_index(points.iloc[pts], **kwargs)
+            if isinstance(ids, tuple):
+                _pts, ids = ids
+                pts = pts[_pts]
+            ps.append(pts)
+            cs.append(ids + t * ncells)
+        ps, cs = numpy.concatenate(ps), numpy.concatenate(cs)
+        if exclude:
+            location_count = numpy.bincount(cs, minlength=ncells * len(tessellation.time_lattice))
+            ok = ~exclude(location_count.reshape((-1, ncells)).T).T.ravel()[cs]
+            ps, cs = ps[ok], cs[ok]
+        return ps, cs
+
+    @pytest.mark.parametrize('shuffle', [False, True])
+    @pytest.mark.parametrize('kwargs', [
+        {}, dict(index='dense'), dict(knn=20),
+        dict(exclude_cells_by_location_count=lambda count: count < 20)])
+    def test_cell_index(self, shuffle, kwargs):
+        tessellation, points = self.example(shuffle=shuffle)
+        ps, cs = tessellation.cell_index(points, **dict(kwargs))
+        _ps, _cs = self.reference(tessellation, points, **dict(kwargs))
+        assert numpy.array_equal(ps, _ps)
+        assert numpy.array_equal(cs, _cs)
+
+
+from tramway.tessellation.gwr.gas import Gas
+class TestGas(object):
+
+    def train(self, nearest_node_search, query_batch_size=20):
+        numpy.random.seed(seed)
+        sample = numpy.random.randn(6000, 2)
+        gas = Gas(sample)
+        gas.insertion_threshold = .2
+        gas.trust = 1.
+        gas.edge_lifetime = 50
+        gas.nearest_node_search = nearest_node_search
+        gas.query_batch_size = query_batch_size
+        errors = []
+        for k in range(0, sample.shape[0], 1000):
+            errors += gas.batch_train(sample[k:k+1000])
+        return gas, errors
+
+    @pytest.mark.parametrize('query_batch_size', [1, 20, 500])
+    def test_kdtree_search(self, query_batch_size):
+        dense, dense_errors = self.train('dense')
+        kdtree, kdtree_errors = self.train('kdtree', query_batch_size)
+        assert kdtree_errors == dense_errors
+        A, V, _ = dense.export()
+        _A, _V, _ = kdtree.export()
+        assert numpy.array_equal(_V['weight'], V['weight'])
+        assert (_A != A).nnz == 0
+
+    def test_auto_search(self, monkeypatch):
+        import tramway.tessellation.gwr.gas as gas_module
+        gas, _ = self.train('auto')
+        assert gas.size < gas_module.KDTREE_MIN_NODE_COUNT
+        assert gas.nearest_node_index() is None
+        monkeypatch.setattr(gas_module, 'KDTREE_MIN_NODE_COUNT', gas.size)
+        assert gas.nearest_node_index() is not None
+
+
+from tramway.helper.tessellation import delete_low_count_cells, update_cell_centers
+class TestReassignment(object):
+
+    def example(self, n=200):
+        numpy.random.seed(seed)
+        points = pandas.DataFrame(10. * numpy.random.rand(20 * n, 2) ** 2, columns=['x', 'y'])
+        tessellation = Voronoi()
+        tessellation.tessellate(pandas.DataFrame(10. * numpy.random.rand(n, 2), columns=['x', 'y']))
+        return Partition(points, tessellation)
+
+    @pytest.mark.parametrize('priority_by', [None, 'count'])
+    @pytest.mark.parametrize('kwargs', [{}, dict(min_location_count=5)])
+    def test_delete_low_count_cells(self, priority_by, kwargs):
+        partition = self.example()
+        partition.cell_index = partition.tessellation.cell_index(partition.points, **kwargs)
+        label = True
+        while True:
+            partition, deleted_cells, label = delete_low_count_cells(partition, 10,
+                    priority_by, label, kwargs)
+            if deleted_cells.size == 0:
+                break
+            reference = partition.tessellation.cell_index(partition.points, **kwargs)
+            assert numpy.array_equal(partition.cell_index, reference)
+        assert numpy.all(10 <= partition.location_count)
+
+    def reference_lloyd(self, partition, max_iter):
+        # Lloyd's algorithm with per-cell masks
+        tessellation, points = partition.tessellation, partition.points
+        X = points[['x', 'y']].values
+        cell_index = partition.cell_index
+        for _ in range(max_iter):
+            centers = numpy.array(tessellation.cell_centers)
+            for i in range(tessellation.number_of_cells):
+                cell = cell_index == i
+                if numpy.any(cell):
+                    centers[i] = numpy.mean(X[cell], axis=0)
+            tessellation.cell_centers = centers
+            prev_cell_index, cell_index = cell_index, tessellation.cell_index(points)
+            if numpy.array_equal(cell_index, prev_cell_index):
+                break
+        return tessellation.cell_centers, cell_index
+
+    @pytest.mark.parametrize('max_iter', [1, 5, True])
+    def test_update_cell_centers(self, max_iter):
+        partition = self.example()
+        centers, cell_index = self.reference_lloyd(self.example(), 1000 if max_iter is True else max_iter)
+        partition = update_cell_centers(partition, max_iter)
+        assert numpy.allclose(partition.tessellation.cell_centers, centers)
+        assert numpy.array_equal(partition.cell_index, cell_index)
+
+    def test_max_iter(self, monkeypatch):
+        import tramway.helper.tessellation
+        monkeypatch.setattr(tramway.helper.tessellation, 'UPDATE_CELL_CENTERS_MAX_ITER', 2)
+        partition = self.example()
+        centers, cell_index = self.reference_lloyd(self.example(), 2)
+        with pytest.warns(RuntimeWarning, match='did not converge'):
+            partition = update_cell_centers(partition, True)
+        assert numpy.allclose(partition.tessellation.cell_centers, centers)
+
+    @pytest.mark.parametrize('kwargs', [dict(knn=(30, None)), dict(knn=(30, None), format='csr')])
+    def test_overlapping_cells(self, kwargs):
+        partition = self.example()
+        partition.cell_index = partition.tessellation.cell_index(partition.points, **kwargs)
+        I, J = partition.cell_index if isinstance(partition.cell_index, tuple) else \
+                partition.cell_index.nonzero()
+        X = partition.points[['x', 'y']].values
+        centers = numpy.array(partition.tessellation.cell_centers)
+        for j in numpy.unique(J):
+            centers[j] = numpy.mean(X[I[J == j]], axis=0)
+        update_cell_centers(partition, 1, kwargs)
+        assert numpy.allclose(partition.tessellation.cell_centers, centers)
+
+
+import scipy.spatial
+class TestCellVolume(object):
+
+    def reference(self, tessellation):
+        # former per-cell implementation of Voronoi.cell_volume
+        adjacency = tessellation.vertex_adjacency.tocsr()
+        vertices, centers = tessellation._vertices, tessellation._cell_centers
+        cell_volume = numpy.full(len(centers), numpy.nan)
+        for i, u in enumerate(centers):
+            js = tessellation.cell_vertices[i]
+            if u.size == 2:
+                _js, simplices = set(js.tolist()), []
+                while _js:
+                    j = _js.pop()
+                    for k in adjacency.indices[adjacency.indptr[j]:adjacency.indptr[j+1]]:
+                        if k in _js:
+                            simplices.append((j, k))
+                if len(simplices) == len(js):
+                    cell_volume[i] = sum( .5 * abs((vertices[j,0] - u[0]) * (vertices[k,1] - u[1]) - \
+                            (vertices[k,0] - u[0]) * (vertices[j,1] - u[1])) for j, k in simplices )
+                    continue
+                pts = numpy.r_[vertices[js], u[numpy.newaxis,:]]
+            else:
+                pts = vertices[js]
+            if pts.shape[1] < pts.shape[0]:
+                try:
+                    cell_volume[i] = scipy.spatial.ConvexHull(pts).volume
+                except scipy.spatial.QhullError:
+                    pass
+        return tessellation.scaler.unscale_surface_area(cell_volume)
+
+    def example(self, dim, n=300):
+        numpy.random.seed(seed)
+        tessellation = Voronoi()
+        tessellation.tessellate(pandas.DataFrame(numpy.random.randn(n, dim),
+            columns=['x', 'y', 'z'][:dim]))
+        return tessellation
+
+    @pytest.mark.parametrize('dim', [2, 3])
+    @pytest.mark.parametrize('worker_count', [None, 2])
+    def test_voronoi(self, dim, worker_count):
+        tessellation = self.example(dim)
+        volume = tessellation.compute_cell_volume(worker_count)
+        reference = self.reference(tessellation)
+        assert numpy.array_equal(numpy.isnan(volume), numpy.isnan(reference))
+        assert numpy.allclose(volume, reference, equal_nan=True)
+        assert tessellation.cell_volume is volume
+
+    def test_deleted_cells(self):
+        tessellation = self.example(2)
+        tessellation.delete_cells(numpy.arange(0, 300, 7))
+        assert numpy.allclose(tessellation.cell_volume, self.reference(tessellation), equal_nan=True)
+
+    def test_open_cells(self):
+        # with 4 cells, no cell is closed
+        tessellation = self.example(2, n=4)
+        volume = tessellation.cell_volume
+        reference = self.reference(tessellation)
+        assert numpy.array_equal(numpy.isnan(volume), numpy.isnan(reference))
+        assert numpy.allclose(volume, reference, equal_nan=True)
+
+
+from tramway.tessellation.kmeans import KMeansMesh
+from tramway.core.scaler import whiten
+class TestKMeansMesh(object):
+
+    def example(self, n=20000):
+        numpy.random.seed(seed)
+        return pandas.DataFrame(numpy.random.randn(n, 2) * [1., 2.], columns=['x', 'y'])
+
+    def inertia(self, tessellation, points):
+        dist, _ = scipy.spatial.cKDTree(tessellation.cell_centers).query(points.values)
+        return numpy.mean(dist * dist)
+
+    def tessellate(self, points, **kwargs):
+        tessellation = KMeansMesh(whiten(), avg_probability=.01)
+        tessellation.tessellate(points, **kwargs)
+        return tessellation
+
+    def test_minibatch(self):
+        points = self.example()
+        batch = self.tessellate(points.copy())
+        minibatch = self.tessellate(points.copy(), minibatch=True, batch_size=1000, seed=1)
+        assert self.inertia(minibatch, points) < 1.1 * self.inertia(batch, points)
+        assert minibatch._adjacency_label is not None
+        other = self.tessellate(points.copy(), minibatch=True, batch_size=1000, seed=1)
+        assert numpy.array_equal(other.cell_centers, minibatch.cell_centers)
+
+    def test_chunks(self):
+        points = self.example()
+        chunks = ( points.iloc[start:start+5000] for start in range(0, len(points), 5000) )
+        tessellation = self.tessellate(chunks, minibatch=True, batch_size=1000, seed=1)
+        assert 50 < tessellation.number_of_cells
+        assert self.inertia(tessellation, points) < \
+            1.5 * self.inertia(self.tessellate(points.copy()), points)
+
+
+import os
+import tempfile
+from tramway.helper.tessellation import tessellate_out_of_core
+from tramway.core.hdf5 import RWAStore
+class TestOutOfCore(object):
+
+    def example(self, n=500, length=20):
+        numpy.random.seed(seed)
+        xy = numpy.cumsum(.05 * numpy.random.randn(n * length, 2), axis=0) % 1.
+        return pandas.DataFrame(numpy.c_[numpy.repeat(numpy.arange(n), length), xy,
+            numpy.tile(.05 * numpy.arange(length), n)], columns=['n', 'x', 'y', 't'])
+
+    @pytest.mark.parametrize('method', ['grid', 'kdtree', 'kmeans', 'gwr', 'hexagon'])
+    def test_partition(self, method):
+        points = self.example()
+        chunks = lambda: ( points.iloc[start:start+3000] for start in range(0, len(points), 3000) )
+        output_file = os.path.join(tempfile.mkdtemp(), 'partition.h5')
+        tessellation, cell_count = tessellate_out_of_core(chunks, method, output_file,
+                sample_size=4000, seed=seed, strict_min_location_count=10)
+        store = RWAStore(output_file, 'r')
+        try:
+            cell_index = store.handle['cell_index'][...]
+            assert numpy.array_equal(store.handle['cell_count'][...], cell_count)
+            assert type(store.peek('tessellation')) is type(tessellation)
+        finally:
+            store.close()
+        reference = tessellation.cell_index(points, min_location_count=10)
+        assert numpy.array_equal(cell_index, reference)
+        assert numpy.array_equal(cell_count,
+                numpy.bincount(reference[0 <= reference], minlength=cell_count.size))
+
+    def test_files(self):
+        points = self.example()
+        tmpdir = tempfile.mkdtemp()
+        for i in range(2):
+            points.iloc[i*5000:(i+1)*5000].to_csv(os.path.join(tmpdir, 'points{}.txt'.format(i)),
+                    sep='\t', header=False, index=False)
+        output_file = os.path.join(tempfile.mkdtemp(), 'partition.h5')
+        tessellation, cell_count = tessellate_out_of_core(tmpdir, 'grid', output_file,
+                chunk_size=1000, sample_size=2000, seed=seed)
+        reference = tessellation.cell_index(points.iloc[:10000])
+        assert numpy.array_equal(cell_count,
+                numpy.bincount(reference[0 <= reference], minlength=cell_count.size))
+
+    def test_sample_size(self):
+        from tramway.helper.tessellation import _StratifiedSample
+        sample = _StratifiedSample(1000, numpy.random.RandomState(seed))
+        points = self.example()
+        for start in range(0, len(points), 700):
+            sample.add(points.iloc[start:start+700])
+            assert sample.size <= 1000
+        assert 500 <= len(sample.sample) <= 1000
+
+
+from tramway.helper.tessellation import tessellate1
+from tramway.core.cache import PartitionCache
+class TestPartitionCache(object):
+
+    def example(self, n=100, length=20):
+        numpy.random.seed(seed)
+        xy = numpy.cumsum(.05 * numpy.random.randn(n * length, 2), axis=0) % 1.
+        return pandas.DataFrame(numpy.c_[numpy.repeat(numpy.arange(n), length), xy,
+            numpy.tile(.05 * numpy.arange(length), n)], columns=['n', 'x', 'y', 't'])
+
+    def tessellate(self, points, cache, method='kmeans', **kwargs):
+        kwargs = dict(dict(avg_location_count=50), **kwargs)
+        return tessellate1(points, method, cache=cache, **kwargs)
+
+    def test_hit(self, tmp_path, monkeypatch):
+        points, cache = self.example(), PartitionCache(str(tmp_path))
+        first = self.tessellate(points, cache)
+        assert len(cache) == 1
+        def tessellate(*args, **kwargs):
+            raise AssertionError('cache miss')
+        monkeypatch.setattr(KMeansMesh, 'tessellate', tessellate)
+        second = self.tessellate(points, cache)
+        assert len(cache) == 1
+        assert second.points is points
+        assert numpy.array_equal(second.tessellation.cell_centers, first.tessellation.cell_centers)
+        assert numpy.array_equal(second.cell_index, first.cell_index)
+        assert second.param['method'] == first.param['method']
+
+    @pytest.mark.parametrize('change', [
+        dict(method='grid'),
+        dict(avg_location_count=20),
+        dict(strict_min_location_count=5),
+        dict(scaling='whiten'),
+        dict(time_window_duration=.5),
+        dict(data=True),
+        ])
+    def test_invalidation(self, tmp_path, change):
+        points, cache = self.example(), PartitionCache(str(tmp_path))
+        self.tessellate(points, cache)
+        change = dict(change)
+        if change.pop('data', False):
+            points = points.copy()
+            points.loc[0, 'x'] += 1e-6
+        self.tessellate(points, cache, **change)
+        assert len(cache) == 2
+
+    def test_uncacheable(self, tmp_path):
+        points, cache = self.example(), PartitionCache(str(tmp_path))
+        self.tessellate(points, cache, filter=lambda voronoi, cell, points: True)
+        assert len(cache) == 0
+
+    def test_opt_in(self, tmp_path, monkeypatch):
+        points = self.example()
+        monkeypatch.setenv('TRAMWAY_CACHE_DIR', str(tmp_path))
+        # caching is disabled by default
+        tessellate1(points, 'kmeans', avg_location_count=50)
+        assert not os.listdir(str(tmp_path))
+        self.tessellate(points, True)
+        assert len(PartitionCache()) == 1
+
+    def test_version(self, tmp_path, monkeypatch):
+        points, cache = self.example(), PartitionCache(str(tmp_path))
+        self.tessellate(points, cache)
+        import tramway.core.cache
+        monkeypatch.setattr(tramway.core.cache, '_tramway_version', '0.0.0')
+        self.tessellate(points, cache)
+        assert len(cache) == 2
+
+    def test_eviction(self, tmp_path):
+        points, cache = self.example(), PartitionCache(str(tmp_path), max_entries=2)
+        partition = self.tessellate(points, False, 'grid')
+        keys = [ cache.key(points, 'grid', dict(i=i)) for i in range(3) ]
+        for i, key in enumerate(keys[:2]):
+            cache.put(key, partition)
+            os.utime(cache.path(key), (i, i))
+        # the first entry becomes the most recently used one
+        assert cache.get(keys[0], points) is not None
+        cache.put(keys[2], partition)
+        assert keys[0] in cache and keys[1] not in cache and keys[2] in cache
+        cache.max_entries, cache.max_size = None, os.path.getsize(cache.path(keys[2]))
+        cache.evict()
+        assert len(cache) == 1
+
+
+from tramway.tessellation.grid import RegularMesh
+from tramway.tessellation.nesting import NestedTessellations
+class TestNestedTessellations(object):
+
+    def example(self, n=5000):
+        numpy.random.seed(seed)
+        points = pandas.DataFrame(numpy.random.rand(n, 2) ** 2, columns=['x', 'y'])
+        parent = RegularMesh(avg_probability=.1)
+        parent.tessellate(points)
+        return points, parent
+
+    def tessellate(self, points, parent, **kwargs):
+        nested = NestedTessellations(parent=parent, factory=KMeansMesh, avg_probability=.2)
+        nested.tessellate(points, **kwargs)
+        return nested
+
+    def reference(self, nested, points):
+        parent_index = nested.parent.cell_index(points)
+        cell_index = numpy.full(len(points), -1)
+        cell_count = 0
+        for u, child in nested.children.items():
+            in_parent = parent_index == u
+            child_index = child.cell_index(points[in_parent])
+            child_index[0 <= child_index] += cell_count
+            cell_index[in_parent] = child_index
+            cell_count += child.cell_adjacency.shape[0]
+        return cell_index
+
+    def test_cell_index(self):
+        points, parent = self.example()
+        nested = self.tessellate(points, parent)
+        assert sorted(nested.children) == numpy.unique(parent.cell_index(points)).tolist()
+        assert numpy.array_equal(nested.cell_index(points), self.reference(nested, points))
+        assert nested.cell_adjacency.shape[0] == nested.cell_centers.shape[0]
+
+    def test_worker_count(self):
+        points, parent = self.example()
+        nested = self.tessellate(points, parent, worker_count=2)
+        reference = self.tessellate(points, parent)
+        assert list(nested.children) == list(reference.children)
+        for u in nested.children:
+            assert nested.children[u].scaler is nested.scaler
+            assert numpy.array_equal(nested.children[u].cell_centers,
+                    reference.children[u].cell_centers)
+        assert numpy.array_equal(nested.cell_index(points), reference.cell_index(points))
@@ -430,6 +430,8 @@ def main():
                 translations = None
             mode_parser.add_argument('--seed', nargs='?', default=False, help='random generator seed (for testing purposes)')
             mode_parser.add_argument('--profile', nargs='?', default=False, help='profile each individual child process if any')
+            if setup.get('supports_diagnostics', False):
+                mode_parser.add_argument('--diagnostics', action='store_true', help='record the evaluation counts, times and convergence trace of the objective function in the output maps')
             mode_parser.add_argument('--disable-metadata', action='store_true', help="do not record additional metadata in the output file")
             try:
                 mode_parser.add_argument('input_file', nargs='?', help='path to input file')
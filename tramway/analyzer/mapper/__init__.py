@@ -17,8 +17,12 @@ from ..artefact import analysis
 from .. import attribute
 from .abc import *
 #from . import stdalg as mappers
-from tramway.inference import plugins
+from tramway.inference import plugins, Distributed
 from tramway.helper.inference import Infer
+from collections import OrderedDict
+from copy import copy
+import numpy as np
+import pandas as pd
 
 
 class MapperInitializer(Initializer):
@@ -88,6 +92,14 @@ class MapperPlugin(AnalyzerNode):
                     self.time.enable_regularization()
     @analysis
     def infer(self, sampling):
+        """
+        Infers the maps for the partitioned data in `sampling`.
+
+        If attribute `warm_start` is ``True`` and time segments are inferred independently,
+        each segment is initialized with the maps of the previous segment.
+        Attribute `warm_start` can also be a :class:`~tramway.inference.base.Maps` object
+        to initialize all the cells with.
+        """
         helper = Infer()
         helper.prepare_data(sampling)
         distr_kwargs, infer_kwargs = {}, {}
@@ -100,11 +112,55 @@ class MapperPlugin(AnalyzerNode):
         if 'cell_sampling' not in distr_kwargs and \
                 self.time.initialized and not self.time.regularize_in_time:
             distr_kwargs['cell_sampling'] = 'connected'
+        warm_start = infer_kwargs.pop('warm_start', None)
         cells = helper.distribute(**distr_kwargs)
         helper.name, helper.setup, helper._infer = self.name, self.setup, self._mapper
         cells = helper.overload_cells(cells)
-        maps = helper.infer(cells, **infer_kwargs)
+        if warm_start is True:
+            if self.time.initialized and not self.time.regularize_in_time:
+                maps = self._infer_time_segments(helper, cells, sampling, **infer_kwargs)
+                if maps is not None:
+                    return maps
+            warm_start = None
+        maps = helper.infer(cells, warm_start=warm_start, **infer_kwargs)
         return maps
+    def _infer_time_segments(self, helper, cells, sampling, **infer_kwargs):
+        """
+        Infers the time segments one after the other, each segment being initialized
+        with the maps of the previous segment.
+
+        Returns :const:`None` if the groups of cells do not split into time segments.
+        """
+        try:
+            ncells = sampling.tessellation.spatial_mesh.cell_adjacency.shape[0]
+        except AttributeError:
+            return None
+        segments = OrderedDict()
+        for j in cells:
+            group = cells[j]
+            if not isinstance(group, Distributed):
+                return None
+            segment = np.unique(group.indices // ncells)
+            if segment.size != 1:
+                return None
+            segments.setdefault(segment[0], []).append(j)
+        maps, previous_maps, previous_segment = [], None, None
+        for segment in sorted(segments):
+            segment_cells = copy(cells)
+            segment_cells.cells = OrderedDict([ (j, cells[j]) for j in segments[segment] ])
+            warm_start = None
+            if previous_maps is not None:
+                warm_start = previous_maps.copy()
+                warm_start.index += (segment - previous_segment) * ncells
+            segment_maps = helper.infer(segment_cells, warm_start=warm_start, **infer_kwargs)
+            maps.append(segment_maps)
+            previous_maps, previous_segment = segment_maps.maps, segment
+        combined = copy(maps[0])
+        combined.maps = pd.concat([ m.maps for m in maps ], axis=0).sort_index()
+        if all( isinstance(m.posteriors, pd.DataFrame) for m in maps ):
+            combined.posteriors = pd.concat([ m.posteriors for m in maps ], axis=0).sort_index()
+        combined.runtime = sum( m.runtime for m in maps )
+        return combined
     @property
     def time(self):
         return self._parent.time
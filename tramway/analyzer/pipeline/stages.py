@@ -10,6 +10,7 @@ from ..artefact import commit_as_analysis
 import os.path
 import numpy as np
 from tramway.core import load_xyt
+from tramway.core.cache import PartitionCache
 from collections import defaultdict
 
 
@@ -30,8 +31,67 @@ def _filters(kwargs):
 def _placeholder_for_root_data(tree):
     tree._data = None
 
+def _slot_values(node):
+    values = {}
+    for cls in type(node).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            if slot != '_parent':
+                values[slot] = getattr(node, slot)
+    return values
 
-def tessellate(label=None, roi_expected=False, spt_data=True, tessellation='freeze', **kwargs):
+def _sampling_state(self, df):
+    """
+    Returns the method name, parameters and scaler that determine the sampling of `df`.
+
+    Raises :class:`TypeError` if the sampling cannot be cached.
+    """
+    from ..tesseller.proxy import TessellerProxy
+    params, method, scaler = {}, None, None
+    tesseller = self.tesseller
+    if tesseller.initialized:
+        if not isinstance(tesseller, TessellerProxy) or tesseller.post_processing.initialized:
+            raise TypeError('custom tessellers are not cached')
+        if not tesseller.reified:
+            tesseller.calibrate(df)
+        method = tesseller.alg_name
+        scaler = tesseller._init_kwargs.get('scaler')
+        params['tesseller'] = (tesseller.cls, tesseller.colnames,
+                { k: v for k, v in tesseller._init_kwargs.items() if k != 'scaler' },
+                tesseller._tessellate_kwargs,
+                { k: tesseller._explicit_kwargs[k] for k in tesseller._iter_explicit_attributes() })
+    if self.time.initialized:
+        try:
+            params['time'] = (type(self.time), self.time.time_window_kwargs)
+        except AttributeError:
+            raise TypeError('custom time segmenters are not cached')
+    if not self.sampler.initialized:
+        self.sampler.from_voronoi()
+    params['sampler'] = (type(self.sampler), _slot_values(self.sampler))
+    return method, params, scaler
+
+def _sample(self, df, cache=None):
+    """
+    Calls :meth:`~tramway.analyzer.sampler.Sampler.sample`, or loads the sampling
+    from `cache` (:class:`~tramway.core.cache.PartitionCache`) if available.
+    """
+    key = None
+    if cache is not None:
+        try:
+            key = cache.key(df, *_sampling_state(self, df))
+        except TypeError:
+            pass
+        else:
+            sampling = cache.get(key, df)
+            if sampling is not None:
+                return sampling
+    sampling = self.sampler.sample(df)
+    if key is not None:
+        cache.put(key, sampling)
+    return sampling
+
+
+def tessellate(label=None, roi_expected=False, spt_data=True, tessellation='freeze', cache=False,
+        **kwargs):
     """
     Returns a standard pipeline stage for SPT data sampling.
 
@@ -64,9 +124,18 @@ def tessellate(label=None, roi_expected=False, spt_data=True, tessellation='free
       this implies the tesellation cannot be updated any longer
       with extra data.
 
+    With `cache` ``True`` or a :class:`~tramway.core.cache.PartitionCache` object,
+    the samplings are looked for in an on-disk cache keyed by the SPT data
+    and the tesseller, time segmenter and sampler parameters.
+    Custom tessellers and post-processing functions disable caching.
+
     """
 
     asr_filters = _filters(kwargs)
+    if cache is True:
+        cache = PartitionCache()
+    elif cache is False:
+        cache = None
 
     def _tessellate(self):
 
@@ -100,7 +169,7 @@ def tessellate(label=None, roi_expected=False, spt_data=True, tessellation='free
 
                     # tessellate
                     self.logger.info(msg)
-                    sampling = self.sampler.sample(df)
+                    sampling = _sample(self, df, cache)
 
                     dry_run = False
 
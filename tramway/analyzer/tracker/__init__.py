@@ -73,20 +73,100 @@ class SingleParticleTracker(BaseTracker):
 Tracker.register(SingleParticleTracker)
 
 
-def _tolist(a):
-    a = a.tolist()
-    if not isinstance(a, list):
-        a = [ a ]
-    return a
+def _link_frames(movie_per_frame, length_high, sparse=False):
+    """
+    Assigns the localizations in each frame to the localizations in the next frame.
+
+    Arguments:
+
+        movie_per_frame (list): localizations as arrays with columns x, y, t, one array per frame.
+
+        length_high (float): maximum distance between two assigned localizations.
+
+        sparse (bool): solve the assignment problems on the sparse graphs of the pairs
+            of localizations closer than `length_high`.
+
+    Returns:
+
+        list: (row, col) pairs of index arrays, one pair per consecutive frames.
+
+    """
+    import tramway.tracking.track_non_track.file_processing_loc as nt
+    if sparse:
+        return [ nt.get_sparse_assigment(
+                    *nt.get_sparse_cost_function(frame_index, movie_per_frame, length_high))
+                for frame_index in range(len(movie_per_frame)-1) ]
+    links = []
+    for frame_index in range(len(movie_per_frame)-1):
+        C = nt.get_cost_function(frame_index, movie_per_frame)
+        try:
+            C_eff,_,_,_,row_eff,col_eff,M,N,n_row_eff,n_col_eff,anomaly = \
+                nt.correct_cost_function(C, length_high)
+        except IndexError:
+            links.append((np.zeros(0, dtype=int), np.zeros(0, dtype=int)))
+            continue
+        _, row, col = \
+                nt.get_assigment_matrix_from_reduced_cost(C_eff, row_eff, col_eff,
+                    M, N, n_col_eff, n_row_eff, anomaly)
+        links.append((np.asarray(row, dtype=int).ravel(), np.asarray(col, dtype=int).ravel()))
+    return links
+
+def _link_frames_star(args):
+    return _link_frames(*args)
+
+def _stitch(movie_per_frame, links):
+    """
+    Joins the frame-to-frame assignments into trajectories.
+
+    Trajectories are numbered in the order of their first localization.
+
+    Arguments:
+
+        movie_per_frame (list): localizations as arrays with columns x, y, t, one array per frame.
+
+        links (list): (row, col) pairs as returned by :func:`_link_frames`.
+
+    Returns:
+
+        pandas.DataFrame: trajectories with columns n, x, y, t.
+
+    """
+    frame_size = np.array([ len(frame) for frame in movie_per_frame ])
+    offset = np.r_[0, np.cumsum(frame_size)]
+    trajectory_index = np.zeros(offset[-1], dtype=int)
+    trajectory_count = 0
+    for frame_index, (row, col) in enumerate(links):
+        source = offset[frame_index] + row
+        destination = offset[frame_index+1] + col
+        n = trajectory_index[source]
+        new = n == 0
+        n[new] = np.arange(trajectory_count+1, trajectory_count+1+np.sum(new))
+        trajectory_count += np.sum(new)
+        trajectory_index[source] = n
+        trajectory_index[destination] = n
+    tracked = np.flatnonzero(trajectory_index)
+    # the localizations are sorted by time
+    tracked = tracked[np.argsort(trajectory_index[tracked], kind='stable')]
+    if movie_per_frame:
+        xyt = np.concatenate(movie_per_frame)[tracked]
+    else:
+        xyt = np.zeros((0,3))
+    return pd.DataFrame(trajectory_index[tracked,np.newaxis], columns=['n']).join(
+            pd.DataFrame(xyt, columns=list('xyt')))
 
 class NonTrackingTracker(BaseTracker):
     """ Non-tracking tracker.
+
+    The frame-to-frame assignments are computed in :attr:`worker_count` processes,
+    if greater than 1, over chunks of consecutive frames.
     """
-    __slots__ = ('_high_diffusivity','_large_length')
+    __slots__ = ('_high_diffusivity','_large_length','_worker_count','_sparse')
     def __init__(self, **kwargs):
         BaseTracker.__init__(self, **kwargs)
         self._high_diffusivity = None
         self._large_length = None
+        self._worker_count = None
+        self._sparse = False
     @property
     def sigma(self):
         return self.localization_precision
@@ -106,9 +186,36 @@ class NonTrackingTracker(BaseTracker):
     @estimated_large_length.setter
     def estimated_large_length(self, length):
         self._large_length = length
+    @property
+    def worker_count(self):
+        """
+        *int*: Number of processes the frame-to-frame assignments are computed in;
+        negative values are subtracted from the number of CPUs, as with
+        :class:`~tramway.analyzer.env.environments.LocalHost`;
+        default is :const:`None`, for the current process only
+        """
+        return self._worker_count
+    @worker_count.setter
+    def worker_count(self, wc):
+        if wc is not None and wc < 0:
+            import multiprocessing
+            wc = max(1, multiprocessing.cpu_count() + wc)
+        self._worker_count = wc
+    @property
+    def sparse(self):
+        """
+        *bool*: Solve each frame-to-frame assignment on the sparse graph of the pairs of
+        localizations closer than :attr:`estimated_large_length`, with the largest
+        possible number of links;
+        much faster on dense movies; the trajectories may differ from those of the default
+        dense solver, whose padding heuristic may link fewer localizations
+        """
+        return self._sparse
+    @sparse.setter
+    def sparse(self, b):
+        self._sparse = b
     ###
     def track(self, locations, register=False, source=None):
-        import tramway.tracking.track_non_track.file_processing_loc as nt
         images = self._eldest_parent.images
         if isinstance(locations, str):
             loc_file = locations
@@ -117,6 +224,7 @@ class NonTrackingTracker(BaseTracker):
             loc_file = None
             locations = locations[list('xyt')]
 
+        import tramway.tracking.track_non_track.file_processing_loc as nt
         movie_per_frame, n_unique = nt.convert_to_list(locations.values)
         dt_theo = self.dt
         t_init = self.dt * 1
@@ -134,83 +242,24 @@ class NonTrackingTracker(BaseTracker):
         if D_high is None:
             raise AttributeError('attribute estimated_high_diffusivity is not set')
 
-        trajectories = {}
-
-        current_trajectory_index = np.uint32(1)
-        currently_assigned = set()
-
-        for frame_index in range(n_unique-1):
-
-            C = nt.get_cost_function(frame_index, movie_per_frame)
-
+        worker_count = self.worker_count
+        if worker_count is None or worker_count <= 1 or n_unique < 3:
+            links = _link_frames(movie_per_frame, length_high, self.sparse)
+        else:
+            # chunks of consecutive frames overlap by one frame
+            chunk_count = min(n_unique-1, 4*worker_count)
+            bounds = np.linspace(0, n_unique-1, chunk_count+1).round().astype(int)
+            chunks = [ (movie_per_frame[start:stop+1], length_high, self.sparse)
+                    for start, stop in zip(bounds[:-1], bounds[1:]) ]
+            from multiprocessing import Pool
+            pool = Pool(worker_count)
             try:
-                C_eff,_,_,_,row_eff,col_eff,M,N,n_row_eff,n_col_eff,anomaly = \
-                    nt.correct_cost_function(C, length_high)
-            except IndexError:
-                #print(C, length_high)
-                currently_assigned = set()
-                continue
-
-            _, row, col = \
-                    nt.get_assigment_matrix_from_reduced_cost(C_eff, row_eff, col_eff,
-                        M, N, n_col_eff, n_row_eff, anomaly)
-
-            assert isinstance(row, np.ndarray)
-            if row.size == 0:
-                currently_assigned = set()
-                continue
-
-            if currently_assigned:
-                source_ = movie_per_frame[frame_index]
-                destination = movie_per_frame[frame_index+1]
-                row_to_col = np.full(len(source_), -1, dtype=int)
-                row_to_col[row] = col
-                if row.size == 1:
-                    row, col = _tolist(row), _tolist(col)
-                newly_assigned = set(row)
-                new_assignment = np.zeros(len(destination), dtype=np.uint32)
-                growing_trajectory = currently_assigned & newly_assigned
-                for i in growing_trajectory:
-                    traj_index = current_assignment[i]
-                    assert 0<traj_index
-                    j = row_to_col[i]
-                    trajectories[traj_index].append(destination[[j]])
-                    new_assignment[j] = traj_index
-                for i in newly_assigned - growing_trajectory:
-                    traj_index = current_trajectory_index
-                    current_trajectory_index += 1
-                    j = row_to_col[i]
-                    trajectories[traj_index] = [ source_[[i]], destination[[j]] ]
-                    new_assignment[j] = traj_index
-                current_assignment = new_assignment
-
-            else:
-                if row.size == 1:
-                    row, col = _tolist(row), _tolist(col)
-                source_ = movie_per_frame[frame_index][row]
-                destination = movie_per_frame[frame_index+1][col]
-                n = current_trajectory_index
-                new_trajectory_indices = np.arange(n, n+len(col), dtype=np.uint32)
-                current_trajectory_index += len(col)
-                current_assignment = np.zeros(len(movie_per_frame[frame_index+1]), dtype=np.uint32)
-                current_assignment[col] = new_trajectory_indices
-                for k in np.arange(len(col), dtype=np.uint32):
-                    trajectories[new_trajectory_indices[k]] = [ source_[[k]], destination[[k]] ]
+                links = list(itertools.chain(*pool.map(_link_frames_star, chunks)))
+            finally:
+                pool.close()
+                pool.join()
 
-            try:
-                currently_assigned = set(col)
-            except TypeError:
-                print(col)
-
-        trajectory_indices, trajectory_coordinates = [], []
-        for n in range(1, current_trajectory_index):
-            traj = trajectories[np.uint32(n)]
-            trajectory_indices.append(np.full((sum([len(t) for t in traj]),1), n))
-            trajectory_coordinates.append(traj)
-        trajectory_indices = np.vstack(trajectory_indices)
-        trajectory_coordinates = np.vstack(list(itertools.chain(*trajectory_coordinates)))
-        trajectories = pd.DataFrame(trajectory_indices, columns=['n']).join(
-                pd.DataFrame(trajectory_coordinates, columns=list('xyt')))
+        trajectories = _stitch(movie_per_frame, links)
 
         if register:
             self.spt_data.add_tracked_data(trajectories, filepath=loc_file if source is None else source)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2021, Institut Pasteur
+#   Contributor: François Laurent
+
+# This file is part of the TRamWAy software available at
+# "https://github.com/DecBayComp/TRamWAy" and is distributed under
+# the terms of the CeCILL license as circulated at the following URL
+# "http://www.cecill.info/licenses.en.html".
+
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""
+Content-addressed on-disk cache for data partitions.
+
+A :class:`~tramway.tessellation.base.Partition` is stored in a *.rwa* file named after a digest of
+the point data, the tessellation method, its parameters, the state of the
+:class:`~tramway.core.scaler.Scaler` and the version of TRamWAy.
+The point data are not stored; they are reattached on loading.
+
+The cache directory defaults to *~/.cache/tramway/partitions* and can be set with environment
+variable ``TRAMWAY_CACHE_DIR``.
+
+Note that the state of the random number generators is not part of the key.
+A randomized tessellation method (e.g. *gwr* or *kmeans*) reuses the cached draw.
+"""
+
+import os
+import hashlib
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from .scaler import Scaler
+
+
+def default_cache_directory():
+    """
+    Returns the value of environment variable ``TRAMWAY_CACHE_DIR``, or
+    *~/.cache/tramway/partitions* if the variable is not defined.
+    """
+    directory = os.environ.get('TRAMWAY_CACHE_DIR')
+    if not directory:
+        directory = os.path.join(os.path.expanduser('~'), '.cache', 'tramway', 'partitions')
+    return directory
+
+
+_tramway_version = False
+
+def tramway_version():
+    """
+    Returns the version of the installed *tramway* package, or ``None`` if not available.
+    """
+    global _tramway_version
+    if _tramway_version is False:
+        try:
+            import pkg_resources
+            _tramway_version = pkg_resources.get_distribution('tramway').version
+        except Exception:
+            _tramway_version = None
+    return _tramway_version
+
+
+def _update(h, obj):
+    """
+    Feeds a canonical representation of `obj` into hash object `h`.
+
+    Raises :class:`TypeError` if `obj` (or any of its elements) cannot be digested,
+    e.g. if `obj` is a function.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update('{}:{!r};'.format(type(obj).__name__, obj).encode('utf-8'))
+    elif isinstance(obj, type):
+        h.update('type:{}.{};'.format(obj.__module__, obj.__qualname__).encode('utf-8'))
+    elif isinstance(obj, np.ndarray):
+        h.update('ndarray:{}:{};'.format(obj.dtype.str, obj.shape).encode('utf-8'))
+        if obj.dtype.hasobject:
+            for element in obj.ravel():
+                _update(h, element)
+        else:
+            h.update(np.ascontiguousarray(obj).data)
+    elif isinstance(obj, pd.DataFrame):
+        h.update('DataFrame:{};'.format(obj.shape).encode('utf-8'))
+        for col in obj.columns:
+            _update(h, col)
+            _update(h, obj[col].values)
+    elif isinstance(obj, (pd.Series, pd.Index)):
+        h.update('{}:{!r};'.format(type(obj).__name__, obj.name).encode('utf-8'))
+        if isinstance(obj, pd.Series):
+            _update(h, obj.index.values)
+        _update(h, obj.values)
+    elif isinstance(obj, dict):
+        h.update('dict:{:d};'.format(len(obj)).encode('utf-8'))
+        for key in sorted(obj, key=repr):
+            _update(h, key)
+            _update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update('{}:{:d};'.format(type(obj).__name__, len(obj)).encode('utf-8'))
+        for element in obj:
+            _update(h, element)
+    elif isinstance(obj, (set, frozenset)):
+        _update(h, sorted(obj, key=repr))
+    elif isinstance(obj, Scaler):
+        function = obj.function
+        if function is not None:
+            function = '{}.{}'.format(function.__module__, function.__qualname__)
+        _update(h, type(obj))
+        _update(h, dict(init=obj.init, center=obj.center, factor=obj.factor,
+            columns=obj.columns, function=function, euclidean=obj.euclidean))
+    else:
+        raise TypeError('cannot digest objects of type {}'.format(type(obj).__name__))
+
+
+def digest(*args):
+    """
+    Hexadecimal digest of the arguments.
+
+    The arguments can be combinations of dictionnaries, sequences, scalars, strings,
+    :class:`numpy.ndarray`, :class:`pandas.DataFrame` and :class:`~tramway.core.scaler.Scaler`
+    objects.
+    Data frames are digested column-wise.
+
+    Raises :class:`TypeError` if any argument cannot be digested.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for arg in args:
+        _update(h, arg)
+    return h.hexdigest()
+
+
+class PartitionCache(object):
+    """
+    On-disk cache for :class:`~tramway.tessellation.base.Partition` objects,
+    with least-recently-used eviction.
+
+    Attributes:
+        directory (str): cache directory; created on the first write.
+        max_size (int): maximum total size of the cache in bytes.
+        max_entries (int): maximum number of cached partitions.
+    """
+    __slots__ = ('directory', 'max_size', 'max_entries')
+
+    extension = '.rwa'
+
+    def __init__(self, directory=None, max_size=1<<30, max_entries=100):
+        if directory is None:
+            directory = default_cache_directory()
+        self.directory = directory
+        self.max_size = max_size
+        self.max_entries = max_entries
+
+    def key(self, points, method, params=None, scaler=None):
+        """
+        Returns the key for partitioning `points` with tessellation method `method`,
+        parameters `params` and scaler `scaler`, with the current version of TRamWAy.
+
+        Raises :class:`TypeError` if any argument cannot be digested;
+        the corresponding partition cannot be cached.
+        """
+        return digest(tramway_version(), points, method, params, scaler)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def get(self, key, points=None):
+        """
+        Returns the partition cached under `key` with `points` as the point data,
+        or ``None`` if `key` is not in the cache.
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        from .hdf5.store import RWAStore
+        try:
+            store = RWAStore(path, 'r')
+            try:
+                partition = store.peek('partition')
+            finally:
+                store.close()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            # corrupted or incompatible entry
+            self._remove(path)
+            return None
+        partition._points = points
+        try:
+            # mark the entry as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return partition
+
+    def put(self, key, partition):
+        """
+        Stores `partition` under `key`, without the point data, and evicts the least
+        recently used entries in excess.
+
+        A warning is issued if `partition` cannot be stored.
+        """
+        from .hdf5.store import RWAStore
+        from tramway.tessellation.base import Partition
+        entry = Partition(None, partition.tessellation, partition.cell_index,
+                param=dict(partition.param))
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmpfile = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        os.close(fd)
+        try:
+            store = RWAStore(tmpfile, 'w')
+            try:
+                store.poke('partition', entry)
+            finally:
+                store.close()
+            os.replace(tmpfile, self.path(key))
+        except (KeyboardInterrupt, SystemExit):
+            self._remove(tmpfile)
+            raise
+        except Exception as e:
+            # caching is not critical
+            self._remove(tmpfile)
+            warnings.warn('cannot cache the partition: {}'.format(e), RuntimeWarning)
+            return
+        self.evict()
+
+    def entries(self):
+        """
+        Returns the (*path*, *size*, *last access time*) triplets of the cached partitions,
+        least recently used first.
+        """
+        entries = []
+        try:
+            files = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for f in files:
+            if not f.endswith(self.extension):
+                continue
+            path = os.path.join(self.directory, f)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache complies with
+        :attr:`max_size` and :attr:`max_entries`.
+        """
+        entries = self.entries()
+        total_size = sum( size for _, size, _ in entries )
+        count = len(entries)
+        for path, size, _ in entries:
+            if (self.max_size is None or total_size <= self.max_size) and \
+                    (self.max_entries is None or count <= self.max_entries):
+                break
+            self._remove(path)
+            total_size -= size
+            count -= 1
+
+    def clear(self):
+        """ Removes all the cached partitions. """
+        for path, _, _ in self.entries():
+            self._remove(path)
+
+    def __contains__(self, key):
+        return os.path.isfile(self.path(key))
+
+    def __len__(self):
+        return len(self.entries())
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+__all__ = ['PartitionCache', 'default_cache_directory', 'digest']
+
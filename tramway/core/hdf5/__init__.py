@@ -54,6 +54,15 @@ else:
         hdf5.hdf5_service.by_storable_type['tramway.tessellation.base.CellStats'] = \
                 hdf5.hdf5_service.by_storable_type['tramway.tessellation.base.Partition']
 
+# the spatial index of the cell centers is rebuilt on demand
+try:
+    from tramway.tessellation.base import CellTree
+except:
+    pass
+else:
+    if _rwa_available:
+        hdf5_not_storable(CellTree, agnostic=True)
+
 try:
     from tramway.tessellation.kdtree.dichotomy import Dichotomy, ConnectedDichotomy
 except:
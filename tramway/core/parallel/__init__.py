@@ -19,6 +19,7 @@ except ImportError:
     import Queue as queue
 import time
 import numpy as np
+from collections import namedtuple
 from warnings import warn
 try:
     from . import abc
@@ -125,6 +126,11 @@ class WorkerNearDeathException(Exception):
     def __str__(self):
         return 'Process {} died with error (most recent call last):\n{}'.format(self._name, self._msg)
 
+SharedStep = namedtuple('SharedStep', ('resource_id', 'version', 'updates'))
+SharedStep.__doc__ = """ Notification that stands for a job step whose state lives in the shared block
+of a :class:`Workspace`, together with the extension updates, if any."""
+
+
 class Worker(multiprocessing.Process):
     """ Worker that runs job steps.
 
@@ -147,7 +153,7 @@ class Worker(multiprocessing.Process):
 
     """
     def __init__(self, _id, workspace, task_queue, return_queue, update_queue,
-            name=None, args=(), kwargs={}, daemon=None, **_kwargs):
+            name=None, args=(), kwargs={}, daemon=None, shared=False, **_kwargs):
         # `daemon` is not supported in Py2; pass `daemon` only if defined
         if daemon is None:
             __kwargs = {}
@@ -159,6 +165,9 @@ class Worker(multiprocessing.Process):
         self.tasks = task_queue
         self.update = update_queue
         self.feedback = return_queue
+        self.shared = shared
+        self.steps = None # worker-local job steps, if shared
+        self._k = None
         self.args = args
         kwargs.update(_kwargs)
         self.kwargs = kwargs
@@ -175,8 +184,14 @@ class Worker(multiprocessing.Process):
         #module_logger.debug('get_task: waiting...') # DEBUG
         k, task = self.tasks.get()
         #module_logger.debug('get_task: received {}'.format(k)) # DEBUG
+        self._k = k
+        if isinstance(task, SharedStep):
+            task = self.steps[task.resource_id]
         task.set_workspace(self.workspace)
         self.pull_updates()
+        if self.shared:
+            # the notifications about the resources of the step may not have arrived yet
+            self.workspace.pull_shared(task)
         return k, task
     def push_update(self, update, status=None):
         """ Send a completed job step back to the scheduler and to the other workers.
@@ -188,24 +203,47 @@ class Worker(multiprocessing.Process):
             status (any): extra information that :meth:`Scheduler.stop` will receive.
 
         """
-        if isinstance(update, abc.VehicleJobStep):
-            update.push_updates(self.workspace.pop_extension_updates())
-        update.unset_workspace() # free memory space
-        if self.update is not None:
-            self.update.put(update)
+        if self.shared:
+            updates = self.workspace.pop_extension_updates()
+            # write the locked resources and the state of the step into the shared workspace,
+            # and notify the other workers and the scheduler with (resource id, version) only
+            version = self.workspace.push_shared(update)
+            update.unset_workspace()
+            notification = SharedStep(update.resource_id, version, updates)
+            if self.update is not None:
+                self.update.put(notification)
+            if version is not None:
+                self.steps[update.resource_id] = update
+                update = notification
+            elif isinstance(update, abc.VehicleJobStep):
+                update.push_updates(updates)
+        else:
+            if isinstance(update, abc.VehicleJobStep):
+                update.push_updates(self.workspace.pop_extension_updates())
+            update.unset_workspace() # free memory space
+            if self.update is not None:
+                self.update.put(update)
         #module_logger.debug('push_update: sending back') # DEBUG
         self.feedback.put((update, status))
         #module_logger.debug('push_update: sent') # DEBUG
     def pull_updates(self):
         if self.update is None:
             return
+        updated = False
         while True:
             try:
                 update = self.update.get_nowait()
             except queue.Empty:
                 break
             else:
-                self.workspace.update(update) # `Workspace.update` reloads the workspace into the update
+                if self.shared:
+                    self.workspace.push_extension_updates(update.updates)
+                    updated = True
+                else:
+                    self.workspace.update(update) # `Workspace.update` reloads the workspace into the update
+        if updated:
+            # the other workers have modified the shared workspace
+            self.workspace.pull_shared()
     def run(self):
         try:
             self.target(*self.args, **self.kwargs)
@@ -225,7 +263,10 @@ def _pseudo_worker(worker):
                 None, None, None, name=name, args=args, kwargs=kwargs)
             self._scheduler = scheduler
         def get_task(self):
-            return self._scheduler.next_task()
+            k, task = self._scheduler.next_task()
+            if task is None: # maximum number of iterations reached
+                raise NormalTermination
+            return k, task
         def push_update(self, update, status=None):
             i = update.resource_id
             self._scheduler.task[i] = update
@@ -248,7 +289,7 @@ class Scheduler(object):
     """
     def __init__(self, workspace, tasks, worker_count=None, iter_max=None,
             name=None, args=(), kwargs={}, daemon=None, max_runtime=None,
-            task_timeout=None, **_kwargs):
+            task_timeout=None, backend='queue', **_kwargs):
         """
         Arguments:
 
@@ -267,6 +308,14 @@ class Scheduler(object):
                 the other tasks keep on;
                 *new in 0.5b5*.
 
+            backend (str): either 'queue', to send the completed job steps to every worker
+                so that they update their copy of the workspace,
+                or 'shared_memory', to keep the parameter vector of a :class:`Workspace`
+                and the state of the job steps (see :meth:`shared_steps`) in shared memory
+                so that the scheduler and the workers send each other
+                (resource id, version) notifications only; 'shared_memory' falls back to 'queue'
+                if :mod:`multiprocessing.shared_memory` is not available.
+
         """
         self.workspace = workspace
         self.task = tasks
@@ -282,6 +331,12 @@ class Scheduler(object):
         elif worker_count < 0:
             worker_count = multiprocessing.cpu_count() + worker_count
         kwargs.update(_kwargs)
+        if backend not in ('queue', 'shared_memory'):
+            raise ValueError("backend must be either 'queue' or 'shared_memory'")
+        if backend == 'shared_memory' and not isinstance(workspace, Workspace):
+            raise TypeError("the 'shared_memory' backend requires a Workspace")
+        self.backend = backend
+        self.shared = False
         if worker_count:
             self.task_queue = multiprocessing.Queue()
             self.return_queue = multiprocessing.Queue()
@@ -361,6 +416,11 @@ class Scheduler(object):
         self.active[step.resource_id] = k
         self.lock(step)
         step.unset_workspace() # free memory
+        if self.shared:
+            version = self.workspace.shared_version(step)
+            if version is not None:
+                # the worker loads the step from the shared workspace
+                step = SharedStep(step.resource_id, version, None)
         #module_logger.debug('send_task: sending {}...'.format(k)) # DEBUG
         self.task_queue.put((k, step))
         #module_logger.debug('send_task: sent') # DEBUG
@@ -391,8 +451,14 @@ class Scheduler(object):
                     return self.stop(None, None, status)
             else:
                 break
-        #step.set_workspace(self.workspace) # reload workspace
-        self.workspace.update(step) # `update` reloads the workspace into `step`
+        if isinstance(step, SharedStep):
+            notification, step = step, self.task[step.resource_id]
+            step.set_workspace(self.workspace)
+            self.workspace.push_extension_updates(notification.updates)
+            self.workspace.pull_shared(step)
+        else:
+            #step.set_workspace(self.workspace) # reload workspace
+            self.workspace.update(step) # `update` reloads the workspace into `step`
         assert step.get_workspace() is not None
         i = step.resource_id
         self.task[i] = step
@@ -401,6 +467,16 @@ class Scheduler(object):
             return not self.stop(k, i, status)
         finally:
             self.unlock(step)
+    def shared_steps(self):
+        """
+        Job steps whose state is kept in shared memory with the 'shared_memory' backend.
+
+        Default implementation returns the job steps in `tasks`.
+        The steps that are not returned are passed as a whole between the processes.
+        """
+        if isinstance(self.task, (list, tuple)):
+            return list(self.task)
+        return [ self.task[i] for i in self.task ]
     def iter_max_reached(self):
         return self.k_max and self.k_max <= self.k_eff
     def workers_alive(self):
@@ -473,12 +549,23 @@ class Scheduler(object):
                 ret = False
             return ret
 
+        if self.backend == 'shared_memory':
+            # share the workspace before the worker processes are forked
+            try:
+                self.workspace.share(self.shared_steps())
+            except ImportError:
+                warn("multiprocessing.shared_memory is not available; falling back to the 'queue' backend", ImportWarning)
+            else:
+                self.shared = True
+                for w in self.workers.values():
+                    w.shared = True
+                    w.steps = self.task
         for w in self.workers.values():
             w.start()
         self.init_resource_lock()
         if self.global_timeout:
             self.start_time = time.time()
-        k = 0
+        k = self.k_eff # nonzero if resumed from a checkpoint
         postponed = dict()
         try:
             k = self.fill_slots(k, postponed)
@@ -514,6 +601,9 @@ class Scheduler(object):
                 w.terminate()
             except:
                 pass
+        if self.shared:
+            self.workspace.unshare()
+            self.shared = False
         return ret
     def stop(self, k, i, status):
         """
@@ -540,12 +630,12 @@ class Scheduler(object):
 
 class EpochScheduler(Scheduler):
     def __init__(self, workspace, tasks, epoch_length=None, soft_epochs=False, worker_count=None,
-            iter_max=None, name=None, args=(), kwargs={}, daemon=None, **_kwargs):
+            iter_max=None, name=None, args=(), kwargs={}, daemon=None, backend='queue', **_kwargs):
         epoch_length = len(tasks) if epoch_length is None else epoch_length
         if not soft_epochs and not worker_count:
             worker_count = min(epoch_length, multiprocessing.cpu_count() - 1)
         Scheduler.__init__(self, workspace, tasks, worker_count=worker_count, iter_max=iter_max,
-            name=name, args=args, kwargs=kwargs, daemon=daemon, **_kwargs)
+            name=name, args=args, kwargs=kwargs, daemon=daemon, backend=backend, **_kwargs)
         self.soft_epochs = soft_epochs
         self._task_epoch = np.arange(epoch_length)
 
@@ -602,13 +692,123 @@ class Workspace(ProtoWorkspace):
 
         data_array (array-like): working copy of the parameter vector.
 
+        shared_array (numpy.ndarray): parameter vector in shared memory, if shared;
+            see also :meth:`share`.
+
     """
-    __slots__ = 'data_array',
+    __slots__ = 'data_array', 'shared_array', '_shared_memory', '_shared_block', \
+            '_shared_slots', '_shared_versions', '_pulled_versions'
     def __init__(self, data_array, *args):
         ProtoWorkspace.__init__(self, args)
         self.data_array = data_array
+        self.shared_array = None
+        self._shared_memory = None
+        self._shared_block = None
+        self._shared_slots = {}
+        self._shared_versions = None
+        self._pulled_versions = {}
     def __len__(self):
         return len(self.data_array)
+    def share(self, steps=()):
+        """ Copy the parameter vector and the state of the job steps into shared memory.
+
+        Must be called before the worker processes are started.
+        The working copy in each process is synchronized with :meth:`pull_shared`
+        and :meth:`push_shared`.
+
+        The shared block is laid out as the parameter vector followed by one state buffer
+        per job step, plus a version counter per job step.
+        The job steps whose :attr:`JobStep.state_size` is ``None`` are not given any buffer.
+
+        Arguments:
+
+            steps (iterable): job steps with distinct resource ids.
+
+        """
+        from multiprocessing import shared_memory
+        data = np.asarray(self.data_array)
+        self._shared_slots = {}
+        stop = data.size
+        for step in steps:
+            step.set_workspace(self)
+            size = getattr(step, 'state_size', None)
+            if size is not None:
+                start, stop = stop, stop + size
+                self._shared_slots[step.resource_id] = (len(self._shared_slots), start, stop, step)
+        nbytes = stop * data.itemsize
+        self._shared_memory = shared_memory.SharedMemory(create=True,
+                size=max(1, nbytes + len(self._shared_slots) * 8))
+        self._shared_block = np.ndarray((stop,), dtype=data.dtype, buffer=self._shared_memory.buf)
+        self._shared_versions = np.ndarray((len(self._shared_slots),), dtype=np.int64,
+                buffer=self._shared_memory.buf, offset=nbytes)
+        self.shared_array = self._shared_block[:data.size]
+        self.shared_array[...] = data
+        self._shared_versions[...] = 0
+        for i, (j, start, stop, step) in self._shared_slots.items():
+            step.dump_state(self._shared_block[start:stop])
+            self._shared_slots[i] = (j, start, stop) # do not keep the steps alive
+            self._pulled_versions[i] = 0
+    def shared_version(self, step):
+        """ Number of times the state of a job step has been pushed into the shared block,
+        or ``None`` if the step has no state buffer. """
+        try:
+            j, _, _ = self._shared_slots[step.resource_id]
+        except KeyError:
+            return None
+        return int(self._shared_versions[j])
+    def pull_shared(self, step=None):
+        """ Copy the shared parameter vector into the working copy.
+
+        If a job step is given, copy its resources only, and load its state unless
+        it has not changed since the last call in the current process.
+        """
+        if step is None:
+            self.data_array[...] = self.shared_array
+            return
+        resources = self.resources(step)
+        if resources is None:
+            self.data_array[...] = self.shared_array
+        else:
+            self.data_array[resources] = self.shared_array[resources]
+        i = step.resource_id
+        try:
+            j, start, stop = self._shared_slots[i]
+        except KeyError:
+            return
+        version = int(self._shared_versions[j])
+        if self._pulled_versions.get(i) != version:
+            step.load_state(self._shared_block[start:stop])
+            self._pulled_versions[i] = version
+    def push_shared(self, step):
+        """ Copy the resources of a job step from the working copy into the shared parameter vector,
+        and the state of the step into its shared buffer.
+
+        Returns the new version of the state, or ``None`` if the step has no state buffer.
+        """
+        resources = self.resources(step)
+        if resources is None:
+            self.shared_array[...] = self.data_array
+        else:
+            self.shared_array[resources] = self.data_array[resources]
+        i = step.resource_id
+        try:
+            j, start, stop = self._shared_slots[i]
+        except KeyError:
+            return None
+        step.dump_state(self._shared_block[start:stop])
+        self._shared_versions[j] += 1
+        version = self._pulled_versions[i] = int(self._shared_versions[j])
+        return version
+    def unshare(self):
+        """ Copy the shared parameter vector back into the working copy and release the shared memory. """
+        self.data_array[...] = self.shared_array
+        # release the views before closing the shared memory
+        self.shared_array = self._shared_block = self._shared_versions = None
+        self._shared_slots = {}
+        self._pulled_versions = {}
+        self._shared_memory.close()
+        self._shared_memory.unlink()
+        self._shared_memory = None
 
 
 class JobStep(object):
@@ -648,6 +848,22 @@ class JobStep(object):
     @property
     def resources(self):
         return self.get_workspace().resources(self)
+    @property
+    def state_size(self):
+        """ `int`: Size of the buffer that :meth:`dump_state` fills, or ``None`` if the state
+        of the step cannot be kept in the shared block of a :class:`Workspace`.
+
+        A job step without such a buffer is passed as a whole between the processes,
+        as with the 'queue' backend.
+        """
+        return None
+    def dump_state(self, state):
+        """ Write the state of the step into `state`, a :attr:`state_size`-long array. """
+        raise NotImplementedError('abstract method')
+    def load_state(self, state):
+        """ Restore the state of the step from `state`, as written by :meth:`dump_state`;
+        `state` must not be referenced by the step. """
+        raise NotImplementedError('abstract method')
 
 abc.JobStep.register(JobStep)
 
@@ -694,5 +910,5 @@ class VehicleJobStep(JobStep, UpdateVehicle):
 abc.VehicleJobStep.register(VehicleJobStep)
 
 
-__all__ = [ 'StarConn', 'StarQueue', 'ProtoWorkspace', 'Workspace', 'JobStep', 'UpdateVehicle', 'VehicleJobStep', 'Worker', 'Scheduler', 'EpochScheduler', 'abc' ]
+__all__ = [ 'StarConn', 'StarQueue', 'ProtoWorkspace', 'Workspace', 'JobStep', 'UpdateVehicle', 'VehicleJobStep', 'SharedStep', 'Worker', 'Scheduler', 'EpochScheduler', 'abc' ]
 
@@ -435,6 +435,76 @@ def load_xyt(path, columns=None, concat=True, return_paths=False, verbose=False,
         return df
 
 
+def iter_xyt_chunks(path, chunk_size=100000, columns=None, header=None, verbose=False,
+        **kwargs):
+    """
+    Read trajectory files by chunks of rows.
+
+    Unlike :func:`load_xyt`, the files are not loaded in memory at once,
+    and the rows are not reordered.
+    The trajectory indices of the successive files are shifted so that they do not overlap,
+    provided that the trajectories are ordered in each file.
+
+    Arguments:
+
+        path (str or list of str): path to trajectory file or directory.
+
+        chunk_size (int): number of rows per chunk.
+
+        columns (list of str): column names; default is 'n', 'x', 'y' and 't'.
+
+        header (bool): see :func:`load_xyt`.
+
+        verbose (bool): print extra messages.
+
+    Returns:
+
+        generator: :class:`pandas.DataFrame` chunks.
+
+    Extra keyword arguments are passed to :func:`~pandas.read_csv`.
+    """
+    if columns is not None and header is True:
+        raise ValueError('both column names and header are defined')
+    if 'sep' not in kwargs and 'delimiter' not in kwargs:
+        kwargs['delim_whitespace'] = True
+    if not isinstance(path, list):
+        path = [path]
+    paths = []
+    for p in path:
+        if os.path.isdir(p):
+            paths += [ os.path.join(p, f) for f in sorted(os.listdir(p)) ]
+        else:
+            paths.append(p)
+    index_max = 0
+    for f in paths:
+        if verbose:
+            print('reading file: {}'.format(f))
+        file_kwargs = dict(kwargs)
+        if header is False:
+            file_kwargs['header'] = 0
+        else:
+            with open(f, 'r') as fd:
+                first_line = fd.readline()
+            if re.search(r'[a-df-zA-DF-Z_]', first_line):
+                if columns is None:
+                    columns = first_line.split()
+                file_kwargs['header'] = 0
+            elif header is True:
+                raise ValueError('no header found in file: {}'.format(f))
+        if columns is None:
+            columns = ['n', 'x', 'y', 't']
+        file_kwargs['names'] = columns
+        offset = None
+        for chunk in pd.read_csv(f, chunksize=chunk_size, **file_kwargs):
+            if 'n' in columns:
+                if offset is None:
+                    offset = index_max if chunk['n'].iloc[0] < index_max else 0
+                if offset:
+                    chunk['n'] += offset
+                index_max = max(index_max, chunk['n'].max() + 1)
+            yield chunk
+
+
 def crop(points, box, by=None, add_deltas=True, keep_nans=False, no_deltas=False, keep_nan=None,
         preserve_index=False):
     """
@@ -754,6 +824,7 @@ __all__ = [
     'trajectories_to_translocations',
     'translocations_to_trajectories',
     'load_xyt',
+    'iter_xyt_chunks',
     'load_mat',
     'crop',
     'discard_static_trajectories',
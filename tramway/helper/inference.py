@@ -227,7 +227,8 @@ class Infer(Helper):
     def infer(self, cells, worker_count=None, profile=None, min_diffusivity=None, \
             localization_error=None, sigma=None, sigma2=None, \
             diffusivity_prior=None, potential_prior=None, jeffreys_prior=None, rgrad=None, \
-            comment=None, verbose=None, snr_extensions=False, **kwargs):
+            comment=None, verbose=None, snr_extensions=False, warm_start=None, \
+            warm_start_centers=None, diagnostics=False, **kwargs):
         if verbose is None:
             verbose = self.verbose
         mode = self.name
@@ -254,6 +255,23 @@ class Infer(Helper):
             kwargs['profile'] = profile
         if rgrad:
             kwargs['rgrad'] = rgrad
+        if warm_start is not None:
+            if self.input_is_partition or not self.setup.get('supports_warm_start', False):
+                warn('{} mode does not support warm start; ignoring `warm_start`'.format(mode),
+                        RuntimeWarning)
+            else:
+                if warm_start_centers is not None:
+                    warm_start_centers = getattr(warm_start_centers, 'tessellation',
+                            warm_start_centers)
+                    warm_start_centers = getattr(warm_start_centers, 'cell_centers',
+                            warm_start_centers)
+                kwargs['warm_start'] = map_onto_cells(warm_start, cells, warm_start_centers)
+        if diagnostics:
+            if self.setup.get('supports_diagnostics', False):
+                kwargs['diagnostics'] = True
+            else:
+                warn('{} mode does not support diagnostics; ignoring `diagnostics`'.format(mode),
+                        RuntimeWarning)
 
         try:
             _fun = getattr(self.module, self.setup['infer'])
@@ -271,6 +289,9 @@ class Infer(Helper):
             x = cells.run(_fun, **kwargs)
 
         ret = {}
+        if isinstance(x, tuple) and x[2:] and isinstance(x[-1], dict):
+            # (maps, posteriors, info)
+            x, ret = x[:-1], x[-1]
         if isinstance(x, tuple):
             if isinstance(x[1], pd.DataFrame):
                 maps = Maps(x[0], mode=mode, posteriors=x[1])
@@ -290,7 +311,7 @@ class Infer(Helper):
             maps = Maps(x, mode=mode)
 
         for p in kwargs:
-            if p not in ['worker_count', 'profile', 'returns']:
+            if p not in ['worker_count', 'profile', 'returns', 'backend', 'warm_start', 'diagnostics']:
                 setattr(maps, p, kwargs[p])
 
         runtime = time.time() - runtime
@@ -426,6 +447,21 @@ def infer1(cells, mode='degraded.d', output_file=None, partition={}, verbose=Fal
 
         snr_extensions (bool): add snr extensions for Bayes factor calculation.
 
+        warm_start (Maps or pandas.DataFrame): maps of a previous inference to initialize
+            the parameters with, for the modes that support it;
+            see also :func:`~tramway.inference.base.map_onto_cells`.
+
+        warm_start_centers (numpy.ndarray or Partition or Tessellation): cell centers
+            of the mesh `warm_start` refers to, if it differs from the mesh in `cells`;
+            every cell is then initialized with the values of the nearest center.
+
+        diagnostics (bool): count the evaluations of the objective function, measure the time
+            spent in the objective function and record the convergence trace,
+            for the modes that support it;
+            the diagnostics are stored as attribute `diagnostics` of the resulting
+            :class:`~tramway.inference.base.Maps` object;
+            see also :class:`~tramway.inference.optimization.ObjectiveCounter`.
+
     Returns:
 
         Maps or pandas.DataFrame or tuple:
@@ -23,7 +23,8 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
         initial_trajectory_count=None, new_trajectory_count=None,
         lifetime_tau=None, lifetime=None, single=False,
         box=(0., 0., 1., 1.), duration=10., time_step=.05, minor_step_count=99,
-        reflect=False, full=False, count_outside_trajectories=None):
+        reflect=False, full=False, count_outside_trajectories=None,
+        engine='loop', vectorized_callables=False, seed=None):
     r"""
     Generate random walks.
 
@@ -94,12 +95,28 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
             in determining the number of trajectories at each observation step;
             **deprecated**
 
+        engine (str): either 'loop', to simulate the trajectories one after the other,
+            or 'vectorized', to move all the active trajectories at once;
+            both engines generate the same trajectory indices and times for a given `seed`
+
+        vectorized_callables (bool): with ``engine='vectorized'``, the callables admit
+            a (k, dim) array of coordinates instead of a single coordinate vector,
+            and return arrays of k rows; `drift` also admits the diffusivity as a (k,) array
+            and the force as a (k, dim) array;
+            otherwise the callables are called once per trajectory and minor step
+
+        seed (int): seed for a local random number generator;
+            default is the global generator of :mod:`numpy.random`
+
     Returns:
 
         pandas.DataFrame: simulated trajectories with 'n' the trajectory index,
             't' the time and with other columns for location coordinates
 
     """
+    if engine not in ('loop', 'vectorized'):
+        raise ValueError("`engine` must be either 'loop' or 'vectorized'")
+    random = np.random if seed is None else np.random.RandomState(seed)
     if turnover is not None:
         warnings.warn('`turnover` is deprecated', DeprecationWarning)
     if count_outside_trajectories is False:
@@ -114,6 +131,7 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
     #    return 0.
     #def null_vector_map(xy, t):
     #    return np.zeros((dim,))
+    fields = (diffusivity, force, viscosity, drift)
     if callable(diffusivity):
         pass
     elif np.isscalar(diffusivity) and 0 < diffusivity:
@@ -162,7 +180,7 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
     K = None
     if new_trajectory_count is None:
         if trajectory_count_sd:
-            K = np.rint(np.random.randn(N) * trajectory_count_sd + trajectory_mean_count).astype(int)
+            K = np.rint(random.randn(N) * trajectory_count_sd + trajectory_mean_count).astype(int)
         else:
             K = np.full(N, trajectory_mean_count, dtype=int)
     elif initial_trajectory_count is None:
@@ -190,7 +208,7 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
         if lifetime:
             _lifetime = np.array([ lifetime(t) for j in range(k_new) ])
         else:
-            _lifetime = -np.log(1 - np.random.rand(k_new)) * lifetime_tau
+            _lifetime = -np.log(1 - random.rand(k_new)) * lifetime_tau
         _lifetime = np.rint(_lifetime / time_step).astype(int) + 1
         _lifetime = _lifetime[min_step_count <= _lifetime]
         time_support.append((t, _lifetime))
@@ -209,55 +227,60 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
     N = np.empty((total_location_count, ), dtype=int)       # trajectory index
     X = np.empty((total_location_count, dim), dtype=_box.dtype) # spatial coordinates
     T = np.empty((total_location_count, ), dtype=float)     # time
-    i, n = 0, 0
-    for t0, lifetimes in time_support:
-        k = lifetimes.size # number of new trajectories at time t
-        X0 = np.random.rand(k, dim) * support_size + support_lower_bound # initial coordinates
-        for x0, _lifetime in zip(X0, lifetimes): # for each new trajectory
-            n += 1
-            N[i] = n
-            X[i] = x = x0
-            T[i] = t = t0
-            i += 1
-            # from here the main code (``not reflect``) is duplicated to reduce the number of if-tests
-            if reflect:
-                # duplicated code
-                for j in range(1,_lifetime):
-                    for _ in range(minor_step_count+1):
-                        D = diffusivity(x, t)
-                        A = drift(x, t, D)
-                        dx = actual_time_step * A + \
-                            np.sqrt(actual_time_step * 2. * D) * np.random.randn(dim)
-                        x = x + dx
-                        # additional code
-                        above = support_upper_bound < x
-                        x[above] = 2*support_upper_bound[above] - x[above]
-                        below = x < support_lower_bound
-                        if np.any(below & above):
-                            raise NotImplementedError('the jump is so large that its reflection also exceeds the opposite bound')
-                        x[below] = 2*support_lower_bound[below] - x[below]
-                        #
-                        t = t + actual_time_step
-                    t = t0 + j * time_step # moderate numerical precision errors
-                    N[i] = n
-                    X[i] = x
-                    T[i] = t
-                    i += 1
-            else:
-                # reference code
-                for j in range(1,_lifetime):
-                    for _ in range(minor_step_count+1):
-                        D = diffusivity(x, t)
-                        A = drift(x, t, D)
-                        dx = actual_time_step * A + \
-                            np.sqrt(actual_time_step * 2. * D) * np.random.randn(dim)
-                        x = x + dx
-                        t = t + actual_time_step
-                    t = t0 + j * time_step # moderate numerical precision errors
-                    N[i] = n
-                    X[i] = x
-                    T[i] = t
-                    i += 1
+    if engine == 'vectorized':
+        _vectorized_random_walk(time_support, fields, vectorized_callables,
+            support_lower_bound, support_size, time_step, minor_step_count, reflect, random,
+            N, X, T)
+    else:
+        i, n = 0, 0
+        for t0, lifetimes in time_support:
+            k = lifetimes.size # number of new trajectories at time t
+            X0 = random.rand(k, dim) * support_size + support_lower_bound # initial coordinates
+            for x0, _lifetime in zip(X0, lifetimes): # for each new trajectory
+                n += 1
+                N[i] = n
+                X[i] = x = x0
+                T[i] = t = t0
+                i += 1
+                # from here the main code (``not reflect``) is duplicated to reduce the number of if-tests
+                if reflect:
+                    # duplicated code
+                    for j in range(1,_lifetime):
+                        for _ in range(minor_step_count+1):
+                            D = diffusivity(x, t)
+                            A = drift(x, t, D)
+                            dx = actual_time_step * A + \
+                                np.sqrt(actual_time_step * 2. * D) * random.randn(dim)
+                            x = x + dx
+                            # additional code
+                            above = support_upper_bound < x
+                            x[above] = 2*support_upper_bound[above] - x[above]
+                            below = x < support_lower_bound
+                            if np.any(below & above):
+                                raise NotImplementedError('the jump is so large that its reflection also exceeds the opposite bound')
+                            x[below] = 2*support_lower_bound[below] - x[below]
+                            #
+                            t = t + actual_time_step
+                        t = t0 + j * time_step # moderate numerical precision errors
+                        N[i] = n
+                        X[i] = x
+                        T[i] = t
+                        i += 1
+                else:
+                    # reference code
+                    for j in range(1,_lifetime):
+                        for _ in range(minor_step_count+1):
+                            D = diffusivity(x, t)
+                            A = drift(x, t, D)
+                            dx = actual_time_step * A + \
+                                np.sqrt(actual_time_step * 2. * D) * random.randn(dim)
+                            x = x + dx
+                            t = t + actual_time_step
+                        t = t0 + j * time_step # moderate numerical precision errors
+                        N[i] = n
+                        X[i] = x
+                        T[i] = t
+                        i += 1
     # format the data as a dataframe
     columns = 'xyz'
     if dim <= 3:
@@ -280,6 +303,105 @@ def random_walk(diffusivity=None, force=None, viscosity=None, drift=None,
     return points
 
 
+def _rowwise(f):
+    """
+    Makes a callable that admits a single coordinate vector (and extra per-location arguments)
+    callable with a (k, dim) array of coordinates (and extra arrays of k rows).
+    """
+    def _f(x, t, *args):
+        return np.stack([ np.asarray(f(x[i], t, *[ a[i] for a in args ]), dtype=float)
+            for i in range(x.shape[0]) ])
+    return _f
+
+
+def _vectorized_random_walk(time_support, fields, vectorized_callables,
+        support_lower_bound, support_size, time_step, minor_step_count, reflect, random,
+        N, X, T):
+    """
+    Vectorized engine for :func:`random_walk`; fills in `N`, `X` and `T` in-place.
+
+    At each observation step, all the active trajectories are moved at once.
+    Births and deaths are handled with the first step and lifetime of each trajectory,
+    and `X`, `N` and `T` are laid out the same way as with the 'loop' engine.
+    """
+    diffusivity, force, viscosity, drift = fields
+    wrap = (lambda f: f) if vectorized_callables else _rowwise
+    if callable(diffusivity):
+        diffusivity = wrap(diffusivity)
+    if force:
+        force = wrap(force)
+    if callable(viscosity):
+        viscosity = wrap(viscosity)
+    if drift:
+        drift = wrap(drift)
+    def _drift(x, t, D):
+        if drift:
+            if force:
+                return drift(x, t, D, force(x, t))
+            else:
+                return drift(x, t)
+        elif force:
+            if viscosity is None:
+                return D[:,np.newaxis] * force(x, t)
+            elif callable(viscosity):
+                return force(x, t) / np.reshape(viscosity(x, t), (-1, 1))
+            else:
+                return force(x, t) / viscosity
+        else:
+            return 0.
+    dim = support_lower_bound.size
+    support_upper_bound = support_lower_bound + support_size
+    actual_time_step = time_step / float(minor_step_count + 1)
+    if not time_support:
+        return
+    # first observation step, initial time and lifetime of each trajectory
+    t0 = np.concatenate([ np.full(lifetimes.size, t) for t, lifetimes in time_support ])
+    lifetime = np.concatenate([ lifetimes for _, lifetimes in time_support ])
+    first_step = np.rint(t0 / time_step).astype(int)
+    first_row = np.r_[0, np.cumsum(lifetime)[:-1]]
+    k = lifetime.size
+    N[...] = np.repeat(np.arange(1, k+1), lifetime)
+    T[...] = np.repeat(t0, lifetime) + \
+            (np.arange(N.size) - np.repeat(first_row, lifetime)) * time_step
+    # initial coordinates, drawn in the same order as with the 'loop' engine
+    x = np.vstack([ random.rand(lifetimes.size, dim) for _, lifetimes in time_support ]) \
+            * support_size + support_lower_bound
+    X[first_row] = x
+    last_step = first_step + lifetime - 1
+    active = np.zeros(0, dtype=int)
+    born = 0
+    for step in range(first_step[0], last_step.max()):
+        # births
+        newborn = np.searchsorted(first_step, step, side='right')
+        active = np.r_[active, np.arange(born, newborn)]
+        born = newborn
+        # deaths
+        active = active[step < last_step[active]]
+        if active.size == 0:
+            continue
+        _x = x[active]
+        t = step * time_step
+        for _ in range(minor_step_count+1):
+            if callable(diffusivity):
+                D = np.broadcast_to(np.asarray(diffusivity(_x, t), dtype=float).ravel(), active.shape)
+            else:
+                D = np.full(active.shape, diffusivity, dtype=float)
+            A = _drift(_x, t, D)
+            dx = actual_time_step * A + \
+                np.sqrt(actual_time_step * 2. * D)[:,np.newaxis] * random.randn(active.size, dim)
+            _x = _x + dx
+            if reflect:
+                above = support_upper_bound < _x
+                _x = np.where(above, 2*support_upper_bound - _x, _x)
+                below = _x < support_lower_bound
+                if np.any(below & above):
+                    raise NotImplementedError('the jump is so large that its reflection also exceeds the opposite bound')
+                _x = np.where(below, 2*support_lower_bound - _x, _x)
+            t = t + actual_time_step
+        x[active] = _x
+        X[first_row[active] + step + 1 - first_step[active]] = _x
+
+
 def add_noise(points, sigma, copy=False):
     columns = [ c for c in points.columns if c not in ('n', 't') ]
     dim = len(columns)
@@ -18,6 +18,7 @@ import pandas as pd
 import scipy.sparse as sparse
 from ..core import *
 from ..core.hdf5 import *
+from ..core.cache import PartitionCache
 from ..core.analyses import abc
 from ..tessellation import *
 from .base import *
@@ -25,6 +26,7 @@ from warnings import warn
 import six
 import traceback
 import itertools
+from math import ceil
 # no module-wide matplotlib import for head-less usage of `tessellate`
 # in the case matplotlib's backend is interactive
 
@@ -38,6 +40,7 @@ class Tessellate(Helper):
         self.partition_kwargs = {}
         self.time_window_kwargs = {}
         self.reassignment_kwargs = {}
+        self.cache = None
 
     @property
     def _partition_kwargs(self):
@@ -335,6 +338,16 @@ class Tessellate(Helper):
 
         nesting = self.input_label is not None
 
+        # look for the partition in the cache
+        cache_key = None if nesting else self.cache_key()
+        if cache_key is not None:
+            cells = self.cache.get(cache_key, self.xyt_data)
+            if cells is not None:
+                self.cells = cells
+                if self.analyses is not None:
+                    self.insert_analysis(cells, comment=comment)
+                return cells
+
         # initialize a Tessellation object
         if nesting:
             if self.time_window_kwargs:
@@ -409,12 +422,30 @@ class Tessellate(Helper):
         if self.reassignment_kwargs:
             cells.param['reassignment'] = self.reassignment_kwargs
 
+        if cache_key is not None:
+            self.cache.put(cache_key, cells)
+
         # insert the resulting analysis in the analysis tree
         if self.analyses is not None:
             self.insert_analysis(cells, comment=comment)
 
         return cells
 
+    def cache_key(self):
+        """
+        Returns the key for the partition in :attr:`cache`, or ``None`` if the cache is disabled
+        or the parameters cannot be digested (e.g. a *filter* function).
+        """
+        if self.cache is None:
+            return None
+        params = dict(colnames=self.colnames, tessellation=self.tessellation_kwargs,
+                partition=self.partition_kwargs, time_window=self.time_window_kwargs,
+                reassignment=self.reassignment_kwargs)
+        try:
+            return self.cache.key(self.xyt_data, self.name, params, self.scaler)
+        except TypeError:
+            return None
+
     def reassign(self):
         """called by :met:`tessellate`. Should not be called directly."""
         cells = self.cells
@@ -486,7 +517,7 @@ def tessellate1(xyt_data, method='gwr', output_file=None, verbose=False, \
         label=None, output_label=None, comment=None, input_label=None, inplace=False, \
         overwrite=None, return_analyses=False, \
         load_options=None, tessellation_options=None, partition_options=None, save_options=None, \
-        force=None, \
+        force=None, cache=False, \
         **kwargs):
     """
     Tessellation from points series and partitioning.
@@ -668,6 +699,16 @@ def tessellate1(xyt_data, method='gwr', output_file=None, verbose=False, \
         save_options (dict):
             Pass extra keyword arguments to :func:`~tramway.core.xyt.save_rwa` if called.
 
+        cache (bool or tramway.core.cache.PartitionCache):
+            Look for the partition in an on-disk cache, and store it there if missing.
+            The cache is keyed by the data, the method, its parameters, the scaler and
+            the version of TRamWAy.
+            ``True`` uses the default cache, ``False`` (default) disables caching.
+            The state of the random number generators is not part of the key;
+            randomized methods such as *gwr* or *kmeans* reuse the cached draw.
+            Nested tessellations are not cached.
+            See also :mod:`tramway.core.cache`.
+
     Returns:
         tramway.tessellation.base.Partition: A partition of the data with its
             :attr:`~tramway.tessellation.base.Partition.tessellation` attribute set.
@@ -729,6 +770,12 @@ def tessellate1(xyt_data, method='gwr', output_file=None, verbose=False, \
         time_window_options=time_window_options, enable_time_regularization=enable_time_regularization, \
         kwargs=kwargs)
 
+    if cache is True:
+        cache = PartitionCache()
+    elif cache is False:
+        cache = None
+    helper.cache = cache
+
     cells = helper.tessellate(comment=comment)
     cells.param.update(kwargs)
 
@@ -746,6 +793,204 @@ def tessellate1(xyt_data, method='gwr', output_file=None, verbose=False, \
 
 
 
+class _StratifiedSample(object):
+    """
+    Random subsample of a stream of chunks, with the chunks as strata and proportional
+    allocation.
+
+    Each chunk contributes a fraction `rate` of its points, drawn without replacement.
+    Whenever the sample exceeds `max_size` points, `rate` is halved and every stratum is
+    trimmed accordingly, so that the memory footprint is bounded.
+    """
+    __slots__ = ('max_size', 'random', 'rate', 'strata', 'size')
+
+    def __init__(self, max_size, random=np.random):
+        self.max_size = max_size
+        self.random = random
+        self.rate = 1.
+        self.strata = [] # (rows in random order, stratum size) pairs
+        self.size = 0
+
+    def add(self, chunk):
+        n = len(chunk)
+        m = int(ceil(self.rate * n))
+        self.strata.append((chunk.iloc[self.random.permutation(n)[:m]], n))
+        self.size += m
+        while self.max_size < self.size:
+            self.rate /= 2.
+            strata, self.strata, self.size = self.strata, [], 0
+            for rows, n in strata:
+                m = int(ceil(self.rate * n))
+                self.strata.append((rows.iloc[:m], n))
+                self.size += m
+
+    @property
+    def sample(self):
+        return pd.concat([ rows for rows, _ in self.strata ], ignore_index=True)
+
+
+def tessellate_out_of_core(xyt_data, method='gwr', output_file=None, verbose=False, \
+        chunk_size=100000, sample_size=100000, seed=None, ref_distance=None, \
+        min_location_count=None, avg_location_count=None, max_location_count=None, \
+        overwrite=False, load_options=None, **kwargs):
+    """
+    Tessellation of a dataset too large to be loaded in memory.
+
+    The dataset is read twice by chunks of `chunk_size` points.
+    The first pass draws a random subsample of at most `sample_size` points, stratified by
+    chunk, and estimates the average translocation distance, if `ref_distance` is not defined.
+    The tessellation is grown on the subsample with :func:`tessellate1`, with the location
+    counts (`min_location_count`, etc) referring to the full dataset.
+    The second pass assigns the points to the cells chunk by chunk, and writes the cell
+    indices to `output_file`.
+
+    `output_file` is an HDF5 file with the following entries:
+
+    * *tessellation*: the tessellation, readable with
+      :class:`~tramway.core.hdf5.store.RWAStore`,
+    * *cell_index*: the cell index of each point, ``-1`` for unassigned points,
+    * *cell_count*: the number of points per cell.
+
+    Only partitions that assign each point to at most one cell are supported;
+    `knn`, `radius` and filters are not.
+    The minimum number of points per cell at the partition step, if any
+    (`strict_min_location_count`), is applied once all the points have been assigned.
+
+    Arguments:
+
+        xyt_data (str or list or callable):
+            path(s) to trajectory file(s) or directory, read with
+            :func:`~tramway.core.xyt.iter_xyt_chunks`,
+            or function that takes no input arguments and returns a new iterable of
+            :class:`pandas.DataFrame` chunks at each call.
+
+        method (str): tessellation method or plugin name; see :func:`tessellate1`.
+
+        output_file (str): path to the output HDF5 file.
+
+        verbose (bool): verbose output.
+
+        chunk_size (int): number of points per chunk read from files.
+
+        sample_size (int): maximum number of points in the subsample.
+
+        seed (int): random generator seed for the subsample.
+
+        ref_distance (float): see :func:`tessellate1`.
+
+        min_location_count/avg_location_count/max_location_count (int):
+            see :func:`tessellate1`; these numbers apply to the full dataset.
+
+        overwrite (bool): overwrite `output_file` if it exists.
+
+        load_options (dict):
+            extra keyword arguments for :func:`~tramway.core.xyt.iter_xyt_chunks`.
+
+    Returns:
+
+        tuple: tessellation (:class:`~tramway.tessellation.base.Tessellation`) and
+            number of points per cell (:class:`numpy.ndarray`).
+
+    Extra keyword arguments are passed to :func:`tessellate1`.
+    """
+    if not output_file:
+        raise ValueError('output_file is not defined')
+    if os.path.exists(output_file) and not overwrite:
+        raise OSError('file already exists: {}'.format(output_file))
+    if callable(xyt_data):
+        chunks = xyt_data
+    else:
+        if load_options is None:
+            load_options = {}
+        def chunks():
+            return iter_xyt_chunks(xyt_data, chunk_size, verbose=verbose, **load_options)
+    random = np.random if seed is None else np.random.RandomState(seed)
+    min_n = kwargs.pop('strict_min_location_count', None)
+
+    # first pass: subsample and count the points
+    sample = _StratifiedSample(sample_size, random)
+    point_count = 0
+    transloc_length, transloc_count = 0., 0
+    for chunk in chunks():
+        point_count += len(chunk)
+        if ref_distance is None and 'n' in chunk.columns:
+            dxy = np.asarray(translocations(chunk))
+            dr = np.sqrt(np.sum(dxy * dxy, axis=1))
+            dr = dr[~np.isnan(dr)]
+            transloc_length += np.sum(dr)
+            transloc_count += dr.size
+        sample.add(chunk)
+    if point_count == 0:
+        raise ValueError('no points found')
+    if ref_distance is None:
+        if transloc_count == 0:
+            raise ValueError('please specify ref_distance')
+        ref_distance = transloc_length / transloc_count
+        if verbose:
+            print('average translocation distance: {}'.format(ref_distance))
+    sample = sample.sample
+    if verbose:
+        print('{} points sampled out of {}'.format(len(sample), point_count))
+
+    # grow the tessellation on the subsample, with cell sizes for the full dataset
+    if min_location_count is None:
+        min_location_count = 20 # default value in `tessellate1`
+    if avg_location_count is None:
+        avg_location_count = 4 * min_location_count
+    for _count, _probability in ((min_location_count, 'min_probability'),
+            (avg_location_count, 'avg_probability'),
+            (max_location_count, 'max_probability')):
+        if _count and _probability not in kwargs:
+            kwargs[_probability] = float(_count) / point_count
+    cells = tessellate1(sample, method, verbose=verbose, ref_distance=ref_distance,
+            min_location_count=min_location_count, avg_location_count=avg_location_count,
+            max_location_count=max_location_count, **kwargs)
+    tess = cells.tessellation
+    partition_kwargs = dict(cells.param.get('partition', {}))
+    for _kw in ('knn', 'radius', 'time_knn', 'filter'):
+        if partition_kwargs.get(_kw, None) is not None:
+            raise ValueError('{} is not supported by tessellate_out_of_core'.format(_kw))
+
+    # second pass: assign the points chunk by chunk
+    cell_count = np.zeros(tess.number_of_cells, dtype=int)
+    store = RWAStore(output_file, 'w')
+    try:
+        store.poke('tessellation', tess)
+        dataset = store.handle.create_dataset('cell_index', (point_count,), dtype='i8',
+                chunks=(min(chunk_size, point_count),))
+        start = 0
+        for chunk in chunks():
+            cell_index = tess.cell_index(chunk, **partition_kwargs)
+            if not (isinstance(cell_index, np.ndarray) and cell_index.ndim == 1):
+                raise ValueError('the partition should assign each point to at most one cell')
+            stop = start + cell_index.size
+            dataset[start:stop] = cell_index
+            cell_count += np.bincount(cell_index[0 <= cell_index],
+                    minlength=cell_count.size)
+            start = stop
+        if start != point_count:
+            raise RuntimeError('the data changed between the two passes')
+        if min_n:
+            # unassign the points in the cells with too few points
+            excluded = cell_count < min_n
+            if np.any(excluded):
+                block = dataset.chunks[0]
+                for start in range(0, point_count, block):
+                    cell_index = dataset[start:start+block]
+                    assigned = 0 <= cell_index
+                    exclude = np.zeros_like(assigned)
+                    exclude[assigned] = excluded[cell_index[assigned]]
+                    if np.any(exclude):
+                        cell_index[exclude] = -1
+                        dataset[start:start+block] = cell_index
+                cell_count[excluded] = 0
+        store.handle.create_dataset('cell_count', data=cell_count)
+    finally:
+        store.close()
+
+    return tess, cell_count
+
+
 fig_formats = ['png', 'pdf', 'ps', 'eps', 'svg', 'html']
 
 def tessellate0(xyt_data, method='gwr', output_file=None, verbose=False, \
@@ -1750,12 +1995,66 @@ def cell_plot(cells, xy_layer=None, output_file=None, fig_format=None, \
             mplt.close(fig)
 
 
+def _nearest_center_partition(partition, partition_kwargs):
+    """
+    Whether the point-cell association of `partition` is the nearest-center assignment of
+    :meth:`~tramway.tessellation.base.Delaunay.cell_index`, possibly with the points in the
+    cells with less than *min_location_count* points left unassigned (``-1``).
+
+    Such an association can be updated without indexing all the points again.
+    """
+    kwargs = { kw: arg for kw, arg in partition_kwargs.items() if arg is not None }
+    kwargs.pop('min_location_count', None)
+    if kwargs.get('metric', None) == 'euclidean':
+        del kwargs['metric']
+    if kwargs:
+        return False
+    tessellation = partition.tessellation
+    if not (isinstance(tessellation, Delaunay) and \
+            type(tessellation).cell_index is Delaunay.cell_index):
+        return False
+    cell_index = partition.cell_index
+    return isinstance(cell_index, np.ndarray) and cell_index.ndim == 1
+
+
+def _assign_nearest_center(tessellation, points, cell_index, min_location_count=None):
+    """
+    Assign the unassigned points (``-1``) to their nearest cell, and unassign the points
+    in the cells with less than `min_location_count` points.
+
+    `cell_index` is modified inplace and returned.
+    """
+    unassigned, = np.nonzero(cell_index < 0)
+    if unassigned.size:
+        if isinstance(points, pd.DataFrame):
+            points = points.iloc[unassigned]
+        else:
+            points = points[unassigned]
+        points = tessellation.scaler.scale_point(points, inplace=False)
+        _, cell_index[unassigned] = tessellation._nearest_cell(
+                tessellation.descriptors(points, asarray=True))
+    if min_location_count:
+        count = np.bincount(cell_index, minlength=tessellation.number_of_cells)
+        cell_index[count[cell_index] < min_location_count] = -1
+    return cell_index
+
+
 def delete_low_count_cells(partition, count_threshold, priority_by=None, label=True, partition_kwargs={}):
+    """
+    Delete the cells with less than `count_threshold` points, and assign their points
+    to the remaining cells.
+
+    If the points are assigned to their nearest cell center, only the points of the deleted
+    cells are indexed again.
+    Otherwise, :meth:`~tramway.tessellation.base.Tessellation.cell_index` is called
+    with `partition_kwargs`.
+    """
     tessellation = partition.tessellation
     deleted_cells, = np.nonzero(partition.location_count<count_threshold)
     #print('ncells', partition.number_of_cells, 'npts_min', np.min(partition.location_count), 'npts_max', np.max(partition.location_count), 'ncells_deleted', deleted_cells.size)
     if deleted_cells.size == 0:
         return partition, deleted_cells, label
+    nearest_center = _nearest_center_partition(partition, partition_kwargs)
     if priority_by:
         if priority_by == 'count':
             priority = -partition.location_count[deleted_cells]
@@ -1768,38 +2067,112 @@ def delete_low_count_cells(partition, count_threshold, priority_by=None, label=T
         index_mapping, label = tessellation.delete_cells(deleted_cells)
 
     points = partition.points
-    cell_indices = tessellation.cell_index(points, **partition_kwargs)
+    if nearest_center:
+        cell_indices = partition.cell_index
+        assigned = 0 <= cell_indices
+        cell_indices = np.where(assigned, index_mapping[np.where(assigned, cell_indices, 0)], -1)
+        # the points of the deleted cells are mapped onto the number of remaining cells
+        cell_indices[cell_indices == tessellation.number_of_cells] = -1
+        cell_indices = _assign_nearest_center(tessellation, points, cell_indices,
+                partition_kwargs.get('min_location_count', None))
+    else:
+        cell_indices = tessellation.cell_index(points, **partition_kwargs)
     new_partition = Partition(points, tessellation, cell_indices)
     return new_partition, deleted_cells, label
 
 
+def _point_cell_pairs(cell_index):
+    """
+    Point indices and cell indices of the point-cell associations in `cell_index`,
+    that can be an array, a pair of arrays or a sparse matrix.
+    """
+    if isinstance(cell_index, tuple):
+        return cell_index
+    elif sparse.issparse(cell_index):
+        cell_index = cell_index.tocoo()
+        return cell_index.row, cell_index.col
+    else:
+        point_indices, = np.nonzero(0 <= cell_index)
+        return point_indices, cell_index[point_indices]
+
+
+def _same_cell_index(a, b):
+    if isinstance(a, tuple) or isinstance(b, tuple):
+        return isinstance(a, tuple) and isinstance(b, tuple) and \
+                all( np.array_equal(_a, _b) for _a, _b in zip(a, b) )
+    elif sparse.issparse(a) or sparse.issparse(b):
+        return sparse.issparse(a) and sparse.issparse(b) and a.shape == b.shape and \
+                (a != b).nnz == 0
+    else:
+        return np.array_equal(a, b)
+
+
+UPDATE_CELL_CENTERS_MAX_ITER = 100
+
+
 def update_cell_centers(cells, max_iter, partition_kwargs={}):
-    points = cells.points[['x','y']].values # TODO: use `descriptors` instead
+    """
+    Move the cell centers to the centers of mass of their assigned points,
+    index the points again and repeat until the point-cell association does not change
+    (Lloyd's algorithm).
+
+    Arguments:
+
+        cells (Partition): partition with point-cell association.
+
+        max_iter (int or bool): maximum number of iterations; ``True`` means
+            :const:`UPDATE_CELL_CENTERS_MAX_ITER` iterations at most, with a warning
+            if the point-cell association still changes.
+
+        partition_kwargs (dict): keyword arguments to
+            :meth:`~tramway.tessellation.base.Tessellation.cell_index`.
+
+    Returns:
+
+        Partition: new partition; the tessellation is modified inplace.
+    """
     tess = cells.tessellation
+    points = tess.descriptors(cells.points, asarray=True)
+    nearest_center = _nearest_center_partition(cells, partition_kwargs)
+    min_location_count = partition_kwargs.get('min_location_count', None)
     cell_indices = cells.cell_index
 
-    if max_iter is True:
-        max_iter = np.inf
+    unlimited = max_iter is True
+    if unlimited:
+        max_iter = UPDATE_CELL_CENTERS_MAX_ITER
 
     k = 0
+    converged = False
     while k < max_iter:
-        prev_cell_indices = cell_indices
+        point_indices, _cell_indices = _point_cell_pairs(cell_indices)
+        count = np.bincount(_cell_indices, minlength=tess.number_of_cells)
+        nonempty = 0 < count
         cell_centers = np.array(tess.cell_centers) # copy
-        any_new = False
-        for i in range(tess.number_of_cells):
-            prev_cell_i = prev_cell_indices==i
-            cell_i = cell_indices==i
-            if np.any(cell_i) and not np.all(cell_i==prev_cell_i):
-                any_new = True
-                center = np.mean(points[cell_i], axis=0)
-                assert not np.any(np.isnan(center))
-                cell_centers[i] = center
-        if any_new:
-            tess.cell_centers = cell_centers
-            cell_indices = tess.cell_index(cells.points, **partition_kwargs)
-            k += 1
+        for col in range(points.shape[1]):
+            total = np.bincount(_cell_indices, weights=points[point_indices, col],
+                    minlength=tess.number_of_cells)
+            cell_centers[nonempty, col] = total[nonempty] / count[nonempty]
+        tess.cell_centers = cell_centers
+        if isinstance(tess, Voronoi):
+            # let _postprocess recompute the vertices
+            tess.cell_vertices = None
+            tess.vertices = None
+            tess.vertex_adjacency = None
+            tess.cell_volume = None
+        prev_cell_indices = cell_indices
+        if nearest_center:
+            cell_indices = _assign_nearest_center(tess, cells.points,
+                    np.full(prev_cell_indices.size, -1, dtype=prev_cell_indices.dtype),
+                    min_location_count)
         else:
+            cell_indices = tess.cell_index(cells.points, **partition_kwargs)
+        k += 1
+        if _same_cell_index(cell_indices, prev_cell_indices):
+            converged = True
             break
+    if unlimited and not converged:
+        warn('the cell centers did not converge in {:d} iterations'.format(max_iter),
+                RuntimeWarning)
     return Partition(cells.points, tess, cell_indices)
 
 
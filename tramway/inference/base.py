@@ -16,13 +16,15 @@ from tramway.core import *
 from tramway.core.exceptions import *
 from tramway.tessellation import format_cell_index, nearest_cell
 import tramway.tessellation as tessellation
-from .gradient import grad1, delta0
+from .gradient import grad1, delta0, local_linear_operators, sparse_linear_operators
+from .optimization import merge_diagnostics
 import numpy as np
 import pandas as pd
 import scipy.sparse as sparse
 import scipy.spatial.qhull
 from copy import copy
 from collections import OrderedDict
+import multiprocessing
 from multiprocessing import Pool, Lock
 import os # for os.name
 import six
@@ -237,7 +239,7 @@ class Distributed(Local):
             margin cells are not central.
 
     """
-    __slots__ = ('_reverse', '_adjacency', 'central', '_degree', '_ccount', '_tcount')
+    __slots__ = ('_reverse', '_adjacency', 'central', '_degree', '_ccount', '_tcount', '_operators')
     __lazy__  = Local.__lazy__ + ('reverse', 'degree', 'ccount', 'tcount')
 
     def __init__(self, cells, adjacency, index=None, center=None, span=None, central=None, \
@@ -246,6 +248,7 @@ class Distributed(Local):
         self.cells = cells # let's `cells` setter perform the necessary checks
         self.adjacency = adjacency
         self.central = central
+        self._operators = None
 
     @property
     def cells(self):
@@ -476,6 +479,60 @@ class Distributed(Local):
         """
         return delta0(self, i, X, index_map, **kwargs)
 
+    def gradient_operator(self, index=None, reverse_index=None, operator='grad', **kwargs):
+        """
+        Compiled spatial gradient.
+
+        The local operator (:meth:`grad` per default) is linear in its measurement argument.
+        It is compiled once into sparse matrices, one per element of its output, i.e. one per
+        spatial dimension for :meth:`grad`, so that the *j*-th component of the gradient of
+        `X` at all the cells is ``G[j].dot(X)``.
+
+        The matrices are cached until :meth:`clear_caches` is called.
+
+        See also :func:`~tramway.inference.gradient.sparse_linear_operators`.
+
+        Arguments:
+
+            index (numpy.ndarray):
+                cell indices, corresponding to the rows of the matrices;
+                default is all the cells.
+
+            reverse_index (numpy.ndarray):
+                index map that converts cell indices to indices in the measurement vectors
+                (columns of the matrices); default is the reverse of `index`.
+
+            operator (str):
+                name of the local operator method, e.g. *'grad'* or *'local_variation'*.
+
+        Other keyword arguments are passed to the local operator,
+        see also :func:`~tramway.inference.gradient.get_grad_kwargs`.
+
+        Returns:
+
+            list: :class:`scipy.sparse.csr_matrix` operators.
+
+        """
+        return self._compiled_operators(operator, index, reverse_index, kwargs)
+
+    def _compiled_operators(self, operator, index, reverse_index, kwargs, neighbours='neighbours'):
+        if index is None:
+            index = np.array(list(self.cells.keys()))
+        if reverse_index is None:
+            reverse_index = np.full(self.adjacency.shape[0], -1, dtype=int)
+            reverse_index[index] = np.arange(len(index))
+        key = (operator, tuple(np.asarray(index).tolist()), tuple(sorted(kwargs.items())))
+        if self._operators is None:
+            self._operators = {}
+        try:
+            return self._operators[key]
+        except KeyError:
+            pass
+        operators = local_linear_operators(self, operator, index, reverse_index,
+                neighbours=neighbours, **kwargs)
+        operators = self._operators[key] = sparse_linear_operators(operators)
+        return operators
+
     def flatten(self):
         def concat(arrays):
             if isinstance(arrays[0], tuple):
@@ -718,12 +775,22 @@ class Distributed(Local):
                 with name/keyword `worker_count`;
                 in this case, `worker_count` must be a multiple of `function_worker_count`.
 
+            backend (str):
+                either 'pickle', to send each group of cells, `function`, `args` and `kwargs`
+                to the worker processes,
+                or 'fork', to make the worker processes inherit them at fork time and
+                send them group indices only;
+                the 'fork' backend falls back to sequential processing if the 'fork'
+                start method is not available.
+
         Returns:
 
             pandas.DataFrame:
                 single merged array of maps.
                 If `function` returns two output arguments, :meth:`run` also
                 returns a second merged array of posterior probabilities(?).
+                Output arguments of type `dict` with a *diagnostics* item are
+                merged with :func:`~tramway.inference.optimization.merge_diagnostics`.
 
         """
         # clear the caches
@@ -735,8 +802,11 @@ class Distributed(Local):
         if parallel:
             worker_count = kwargs.pop('worker_count', None)
             profile = kwargs.pop('profile', False)
+            backend = kwargs.pop('backend', 'pickle')
+            if backend not in ('pickle', 'fork'):
+                raise ValueError("backend must be either 'pickle' or 'fork'")
 
-        for arg in ('returns', 'worker_count', 'profile'):
+        for arg in ('returns', 'worker_count', 'profile', 'backend'):
             try:
                 val = kwargs.pop('function_'+arg)
             except KeyError:
@@ -756,28 +826,45 @@ class Distributed(Local):
                     worker_count = 0
                 else:
                     warn('multiprocessing may break on Windows', RuntimeWarning)
+            if backend == 'fork' and worker_count != 0:
+                try:
+                    context = multiprocessing.get_context('fork')
+                except ValueError:
+                    warn("the 'fork' start method is not available; running sequentially", RuntimeWarning)
+                    worker_count = 0
             # if `worker_count` is `None`, `Pool` will use `multiprocessing.cpu_count()`
             # if `worker_count == 0`, make it single-processing
-            if worker_count == 0:
-                pool = None
-            else:
-                pool = Pool(worker_count)
             fargs = (function, args, kwargs)
             if profile:
                 fargs = (profile, fargs)
                 cells = [ (i, self.cells[i]) for i in self.cells ]#if bool(self.cells[i]) ]
             else:
                 cells = [ self.cells[i] for i in self.cells ]#if bool(self.cells[i]) ]
-            if six.PY3 or pool is None:
-                if profile:
-                    _run = __profile_run__
-                else:
-                    _run = __run__
-                if pool is None:
-                    ys = [ _run(fargs, c) for c in cells ]
-                else:
-                    ys = pool.map(partial(_run, fargs), cells)
+            if profile:
+                _run = __profile_run__
+            else:
+                _run = __run__
+            if worker_count == 0:
+                ys = [ _run(fargs, c) for c in cells ]
+            elif backend == 'fork':
+                # the payload is inherited by the forked workers; only its key and
+                # the group indices are pickled
+                key = id(cells)
+                __fork_payloads__[key] = (_run, fargs, cells)
+                try:
+                    pool = context.Pool(worker_count)
+                    try:
+                        ys = pool.map(partial(__fork_run__, key), range(len(cells)))
+                    finally:
+                        pool.close()
+                        pool.join()
+                finally:
+                    del __fork_payloads__[key]
+            elif six.PY3:
+                pool = Pool(worker_count)
+                ys = pool.map(partial(_run, fargs), cells)
             elif six.PY2:
+                pool = Pool(worker_count)
                 import itertools
                 if profile:
                     _run = __profile_run_star__
@@ -791,10 +878,14 @@ class Distributed(Local):
                     if ys[1:]:
                         if isinstance(ys[0], tuple):
                             ys = zip(*ys)
-                            result = tuple([
-                                pd.concat(_ys, axis=0).sort_index()
-                                for _ys in ys
-                                if _ys and isinstance(_ys[0], pd.DataFrame) ])
+                            result = []
+                            for _ys in ys:
+                                if _ys and isinstance(_ys[0], pd.DataFrame):
+                                    result.append(pd.concat(_ys, axis=0).sort_index())
+                                elif _ys and isinstance(_ys[0], dict) and 'diagnostics' in _ys[0]:
+                                    result.append(dict(diagnostics=merge_diagnostics(
+                                        [ _y['diagnostics'] for _y in _ys ])))
+                            result = tuple(result)
                             if not result[1:]:
                                 result, = result
                         else:
@@ -889,7 +980,23 @@ class Distributed(Local):
         """
         return self.adjacency.indices[self.adjacency.indptr[i]:self.adjacency.indptr[i+1]]
 
+    def pack(self, index=None):
+        """
+        Concatenate the translocation data of the cells.
+
+        Arguments:
+
+            index (sequence): indices of the cells to be packed, in order.
+
+        Returns:
+
+            PackedTranslocations: packed translocations.
+
+        """
+        return PackedTranslocations(self, index)
+
     def clear_caches(self):
+        self._operators = None
         try:
             first = True
             for c in self.values():
@@ -950,6 +1057,12 @@ def __run__(func, cell):
 def __run_star__(args):
     return __run__(*args)
 
+__fork_payloads__ = {}
+
+def __fork_run__(key, i):
+    _run, fargs, cells = __fork_payloads__[key]
+    return _run(fargs, cells[i])
+
 
 def __profile_run__(func, args):
     import cProfile, pstats
@@ -1294,6 +1407,116 @@ class TrackedMolecules(Translocations):
     __slots__ = 'n',
 
 
+class PackedTranslocations(object):
+    """
+    Translocations of several cells concatenated in a compressed sparse row (CSR) layout,
+    so that per-cell sums can be evaluated with a few vectorized calls instead of
+    a Python loop over the cells.
+
+    Attributes:
+
+        index (numpy.ndarray):
+            cell indices; the *j*-th segment holds the translocations of cell ``index[j]``.
+
+        offsets (numpy.ndarray):
+            segment boundaries, with ``len(index) + 1`` elements;
+            the translocations of the *j*-th cell lie between ``offsets[j]``
+            and ``offsets[j+1]``.
+
+        segment (numpy.ndarray):
+            segment (positional cell) index of each translocation.
+
+        dr (numpy.ndarray):
+            concatenated translocation displacements.
+
+        dt (numpy.ndarray):
+            concatenated translocation durations.
+
+        dr2 (numpy.ndarray):
+            concatenated squared displacement norms.
+
+    """
+    __slots__ = ('index', 'offsets', 'segment', 'dr', 'dt', 'dr2', '_count', '_starts', '_nonempty')
+
+    def __init__(self, cells, index=None):
+        """
+        Arguments:
+
+            cells (Distributed): cells with translocation data.
+
+            index (sequence): indices of the cells to be packed, in order;
+                default is all the cells.
+
+        """
+        if index is None:
+            index = list(cells.keys())
+        self.index = np.asarray(index)
+        dr, dt = [], []
+        for i in self.index:
+            cell = cells[i]
+            dr.append(np.asarray(cell.dr))
+            dt.append(np.asarray(cell.dt))
+        count = np.array([ len(_dt) for _dt in dt ], dtype=int)
+        self.offsets = np.r_[0, np.cumsum(count)]
+        self.segment = np.repeat(np.arange(self.index.size), count)
+        if dr:
+            self.dr = np.concatenate(dr, axis=0)
+            self.dt = np.concatenate(dt)
+        else:
+            self.dr, self.dt = np.zeros((0, cells.dim)), np.zeros(0)
+        self.dr2 = np.sum(self.dr * self.dr, axis=1)
+        self._count = count
+        self._nonempty = 0 < count
+        self._starts = self.offsets[:-1][self._nonempty]
+
+    def __len__(self):
+        return self.index.size
+
+    @property
+    def count(self):
+        """
+        `numpy.ndarray`, ro property
+
+        Number of translocations in each cell.
+        """
+        return self._count
+
+    def sum(self, x):
+        """
+        Per-cell sums.
+
+        Arguments:
+
+            x (numpy.ndarray): array with a translocation along the first dimension.
+
+        Returns:
+
+            numpy.ndarray: array with a cell along the first dimension.
+
+        """
+        if self._nonempty.all():
+            return np.add.reduceat(x, self._starts, axis=0)
+        s = np.zeros((self.index.size,) + x.shape[1:], dtype=x.dtype)
+        if self._starts.size:
+            s[self._nonempty] = np.add.reduceat(x, self._starts, axis=0)
+        return s
+
+    def expand(self, x):
+        """
+        Per-translocation copies of per-cell values.
+
+        Arguments:
+
+            x (numpy.ndarray): array with a cell along the first dimension.
+
+        Returns:
+
+            numpy.ndarray: array with a translocation along the first dimension.
+
+        """
+        return np.repeat(x, self._count, axis=0)
+
+
 def identify_columns(points, trajectory_col=True):
     """
     Identify columns by type.
@@ -1661,6 +1884,42 @@ def get_translocations(points, index=None, coord_cols=None, trajectory_col=True,
     return initial_point, final_point, initial_cell, final_cell, get_point
 
 
+def _group_by_cell(cell_index, cell_count):
+    """
+    Sort (trans-)locations by cell.
+
+    Arguments:
+
+        cell_index (ndarray or callable): cell index for each (trans-)location,
+            as returned by `get_locations` or `get_translocations`.
+
+        cell_count (int): number of cells.
+
+    Returns:
+
+        tuple or None: (*order*, *offsets*) such that ``order[offsets[j]:offsets[j+1]]``
+            are the row indices, in increasing order, of the (trans-)locations in cell `j`;
+            ``None`` if `cell_index` is not an array.
+
+    """
+    if not isinstance(cell_index, np.ndarray) or cell_index.ndim != 1:
+        return None
+    # stable sort so that the rows of each cell keep their original order
+    order = np.argsort(cell_index, kind='stable')
+    valid = (0 <= cell_index) & (cell_index < cell_count)
+    offsets = np.r_[0, np.cumsum(np.bincount(cell_index[valid], minlength=cell_count))]
+    # skip the negative indices that come first
+    offsets += np.count_nonzero(cell_index < 0)
+    return order, offsets
+
+
+def _take_rows(a, i):
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        return a.iloc[i]
+    else:
+        return a[i]
+
+
 def distributed(cells, new_cell=None, new_group=FiniteElements, fuzzy=None,
         new_cell_kwargs={}, new_group_kwargs={}, fuzzy_kwargs={},
         new=None, include_empty_cells=False, verbose=False):
@@ -1757,7 +2016,8 @@ def distributed(cells, new_cell=None, new_group=FiniteElements, fuzzy=None,
             new_cell = Locations
 
     # assign/weight (trans-)locations to cells
-    if fuzzy is None:
+    default_fuzzy = fuzzy is None
+    if default_fuzzy:
         if are_translocations:
             def f(tessellation, cell, translocations, translocation_cell, get_point):
                 initial_point, final_point = translocations
@@ -1820,6 +2080,46 @@ def distributed(cells, new_cell=None, new_group=FiniteElements, fuzzy=None,
         else:
             J = np.logical_and(0 < cells.location_count, 0 < cells.tessellation.cell_label)
 
+    # with the default assignment and explicit cell indices, sort the (trans-)locations
+    # by cell once instead of scanning the whole dataset for each cell
+    deltas = None
+    if default_fuzzy:
+        if are_translocations:
+            grouped = _group_by_cell(initial_cell, J.size)
+        else:
+            grouped = _group_by_cell(location_index, J.size)
+    else:
+        grouped = None
+    if grouped is not None:
+        order, offsets = grouped
+        if are_translocations:
+            if has_precomputed_deltas:
+                deltas = final_point - initial_point
+            else:
+                try:
+                    consecutive = np.array_equal(
+                            np.asarray(initial_point.index) + 1,
+                            np.asarray(final_point.index))
+                except TypeError:
+                    consecutive = False
+                if consecutive:
+                    # translocations are paired in the same order everywhere
+                    __origin = initial_point.copy()
+                    __origin.index += 1
+                    deltas = final_point - __origin
+            if are_tracked_molecules:
+                trajectory_index = cells.points['n'][initial_point.index].values
+        # make the rows of each cell contiguous
+        if are_translocations:
+            initial_point = _take_rows(initial_point, order)
+            final_point = _take_rows(final_point, order)
+            if deltas is not None:
+                deltas = _take_rows(deltas, order)
+            if are_tracked_molecules:
+                trajectory_index = trajectory_index[order]
+        else:
+            locations = _take_rows(locations, order)
+
     # select (with the fuzzy filter) and pre-build cells
     _fuzzy, data, hull = {}, {}, {}
     if are_translocations:
@@ -1829,40 +2129,54 @@ def distributed(cells, new_cell=None, new_group=FiniteElements, fuzzy=None,
             continue
 
         # find (trans-)locations for cell j
-        i = fuzzy(cells.tessellation, j, *fuzzy_args, **fuzzy_kwargs)
-        if i.dtype in (bool, np.bool, np.bool8, np.bool_):
-            _fuzzy[j] = None
+        if grouped is None:
+            i = fuzzy(cells.tessellation, j, *fuzzy_args, **fuzzy_kwargs)
+            if i.dtype in (bool, np.bool_):
+                _fuzzy[j] = None
+            else:
+                _fuzzy[j] = i[i != 0]
+                i = i != 0
+            take = get_point
         else:
-            _fuzzy[j] = i[i != 0]
-            i = i != 0
+            i = slice(offsets[j], offsets[j+1])
+            _fuzzy[j] = None
+            take = _take_rows
 
+        _trajectory_index = None
         if are_translocations:
-            _origin = get_point(initial_point, i)
-            _destination = get_point(final_point, i)
-            if has_precomputed_deltas:
-                assert np.all(_origin.index == _destination.index)
-                __origin = _origin
+            _origin = take(initial_point, i)
+            _destination = take(final_point, i)
+            if not has_precomputed_deltas and _origin.shape[0] == 0:
+                # no translocations to pair
+                J[j] = False
+                continue
+            if deltas is not None:
+                points = take(deltas, i)
+                if are_tracked_molecules:
+                    _trajectory_index = trajectory_index[i]
             else:
-                __origin = _origin.copy() # make copy
-                __origin.index += 1
-                try:
-                    _ok = np.array([i in _destination.index for i in __origin.index])
-                    _ok &= np.array([i in __origin.index for i in _destination.index])
-                except TypeError:
-                    J[j] = False
-                    continue
-                _origin = get_point(_origin, _ok)
-                __origin = get_point(__origin, _ok)
-                _destination = get_point(_destination, _ok)
-            _points = _origin # for convex hull; ideally not only origins
-            points = _destination - __origin # translocations
+                if has_precomputed_deltas:
+                    assert np.all(_origin.index == _destination.index)
+                    __origin = _origin
+                else:
+                    __origin = _origin.copy() # make copy
+                    __origin.index += 1
+                    try:
+                        _ok = np.isin(__origin.index, _destination.index)
+                        _ok &= np.isin(_destination.index, __origin.index)
+                    except TypeError:
+                        J[j] = False
+                        continue
+                    _origin = get_point(_origin, _ok)
+                    __origin = get_point(__origin, _ok)
+                    _destination = get_point(_destination, _ok)
+                points = _destination - __origin # translocations
         else:
-            points = _points = get_point(locations, i) # locations
+            points = take(locations, i) # locations
 
         assert not np.any(np.isnan(np.asarray(points)))
 
         # convex hull
-        _points = np.asarray(get_var(_points, space_cols))
         try:
             hull[j] = cells.tessellation.cell_volume[j]
         except (KeyboardInterrupt, SystemExit):
@@ -1880,7 +2194,8 @@ def distributed(cells, new_cell=None, new_group=FiniteElements, fuzzy=None,
             J[j] = False
         else:
             if are_tracked_molecules:
-                _trajectory_index = cells.points['n'][_origin.index].values
+                if _trajectory_index is None:
+                    _trajectory_index = cells.points['n'][_origin.index].values
                 extra[j] = (_origin, _destination, _trajectory_index)
             elif are_translocations:
                 extra[j] = (_origin, _destination)
@@ -2237,7 +2552,7 @@ class DiffusivityWarning(RuntimeWarning):
             return 'diffusivity too low: {} < {}'.format(self.diffusivity, self.lower_bound)
 
 
-def smooth_infer_init(cells, min_diffusivity=None, jeffreys_prior=None, **kwargs):
+def smooth_infer_init(cells, min_diffusivity=None, jeffreys_prior=None, warm_start=None, **kwargs):
     """
     Initialize the diffusivity array for translocations.
 
@@ -2252,6 +2567,9 @@ def smooth_infer_init(cells, min_diffusivity=None, jeffreys_prior=None, **kwargs
 
         jeffreys_prior (bool): activate Jeffreys' prior.
 
+        warm_start (pandas.DataFrame): previous maps as returned by :func:`map_onto_cells`;
+            the initial diffusivity is taken from column *diffusivity* where defined.
+
     Returns:
 
     * *index* (:class:`numpy.ndarray`) -- cell indices corresponding to arrays *n*, *dt_mean* and *D_initial*.
@@ -2327,6 +2645,7 @@ def smooth_infer_init(cells, min_diffusivity=None, jeffreys_prior=None, **kwargs
             border.append(None)
 
     n, dt_mean, D_initial = np.array(n), np.array(dt_mean), np.array(D_initial)
+    D_initial = warm_start_values(cells, index, warm_start, 'diffusivity', D_initial)
 
     if min_diffusivity is None:
         noise_dt = kwargs['sigma2']
@@ -2345,9 +2664,95 @@ def smooth_infer_init(cells, min_diffusivity=None, jeffreys_prior=None, **kwargs
     return index, reverse_index, n, dt_mean, D_initial, min_diffusivity, D_bounds, border
 
 
+def map_onto_cells(maps, cells, centers=None):
+    """
+    Map parameter values onto the terminal cells of a :class:`Distributed` object,
+    for example to initialize an inference with the maps of a previous run.
+
+    Arguments:
+
+        maps (Maps or pandas.DataFrame): parameter maps, indexed by cell indices.
+
+        cells (Distributed): distributed cells, possibly grouped.
+
+        centers (numpy.ndarray): centers of the cells `maps` refers to, as an array
+            with as many rows as cell indices;
+            if ``None``, `maps` is supposed to refer to the same cells as `cells`;
+            otherwise, each cell in `cells` gets the values of the nearest center
+            with all values defined.
+
+    Returns:
+
+        pandas.DataFrame: parameter values indexed by the indices of the terminal cells.
+    """
+    try:
+        maps = maps.maps
+    except AttributeError:
+        pass
+    terminal_cells = OrderedDict()
+    def collect(cells):
+        for cell in cells.values():
+            if isinstance(cell, Distributed):
+                collect(cell)
+            else:
+                terminal_cells[cell.index] = cell
+    collect(cells)
+    index = np.array(list(terminal_cells.keys()), dtype=int)
+    if centers is None:
+        return maps.reindex(index)
+    maps = maps.dropna()
+    if maps.empty:
+        return maps.reindex(index)
+    tree = scipy.spatial.cKDTree(np.asarray(centers)[maps.index.values])
+    _, nearest = tree.query(np.stack([ terminal_cells[i].center for i in index ]))
+    return pd.DataFrame(maps.values[nearest], index=index, columns=maps.columns)
+
+
+def warm_start_values(cells, index, warm_start, columns, initial):
+    """
+    Overwrite initial parameter values with the values of previous maps.
+
+    Arguments:
+
+        cells (Distributed): first input argument of the *infer* function.
+
+        index (sequence): indices of the cells in `cells`, as returned by
+            :func:`smooth_infer_init`.
+
+        warm_start (pandas.DataFrame): previous maps as returned by :func:`map_onto_cells`,
+            or ``None``.
+
+        columns (str or list): column(s) of `warm_start` for the parameter.
+
+        initial (numpy.ndarray): default initial values, as an array with as many rows
+            as elements in `index`, and as many columns as in `columns` if more than one.
+
+    Returns:
+
+        numpy.ndarray: initial values; `initial` is returned unchanged if `warm_start`
+            is ``None`` or lacks any of `columns`.
+    """
+    if warm_start is None:
+        return initial
+    if isinstance(columns, str):
+        columns = [columns]
+    if not all( col in warm_start.columns for col in columns ):
+        return initial
+    values = warm_start.reindex([ cells[i].index for i in index ])[columns].values
+    if np.ndim(initial) == 1:
+        values = values[:,0]
+        defined = np.isfinite(values)
+    else:
+        defined = np.all(np.isfinite(values), axis=1)
+    initial = np.array(initial, dtype=float)
+    initial[defined] = values[defined]
+    return initial
+
+
 __all__ = ['Local', 'Distributed', 'Cell', 'Locations', 'Translocations', 'Maps',
     'FiniteElement', 'FiniteElements',
     'identify_columns', 'get_locations', 'get_translocations', 'distributed',
-    'TrackedMolecules', 'DistributeMerge',
-    'DiffusivityWarning', 'OptimizationWarning', 'smooth_infer_init']
+    'TrackedMolecules', 'PackedTranslocations', 'DistributeMerge',
+    'DiffusivityWarning', 'OptimizationWarning', 'smooth_infer_init',
+    'map_onto_cells', 'warm_start_values']
 
@@ -9,10 +9,12 @@ from tramway.tessellation.base import point_adjacency_matrix
 
 from .calculate_bayes_factors import (NaNInputError, calculate_bayes_factors,
                                       calculate_bayes_factors_for_one_cell)
+from .calculate_bayes_factors_batch import calculate_bayes_factors_batch
 from .group_by_sign import group_by_sign
 
 # The package can be imported by just `import bayes_factors`.
-__all__ = ['calculate_bayes_factors', 'calculate_bayes_factors_for_one_cell', 'setup']
+__all__ = ['calculate_bayes_factors', 'calculate_bayes_factors_batch',
+           'calculate_bayes_factors_for_one_cell', 'setup']
 
 
 if sys.version_info < (3, 5):
@@ -44,15 +46,29 @@ def _bayes_factor(cells, B_threshold=None, verbose=True, **kwargs):
     if verbose is not None:
         kwargs['verbose'] = verbose
 
-    # iterate over the cells
-    nan_cells_list = []
-    for key in tqdm(cells):
-        try:
-            calculate_bayes_factors_for_one_cell(cells[key], localization_error, **kwargs)
-        except NaNInputError:
-            nan_cells_list.append(key)
+    # gather the statistics of all the cells
+    keys = list(cells.keys())
+    def get(attr, size=1):
+        values = [ getattr(cells[key], attr, None) for key in keys ]
+        return np.array([ np.full(size, np.nan) if value is None else np.ravel(value)
+            for value in values ], dtype=float)
+    zeta_ts, zeta_sps = get('zeta_total', 2), get('zeta_spurious', 2)
+    ns, Vs, Vs_pi = get('n')[:,0], get('V')[:,0], get('V_prior')[:,0]
+
+    ok = np.all(np.isfinite(zeta_ts), axis=1) & np.all(np.isfinite(zeta_sps), axis=1) & \
+            np.isfinite(ns) & np.isfinite(Vs) & np.isfinite(Vs_pi)
+
+    # calculate the Bayes factors of all the cells at once
+    batch_kwargs = { arg: kwargs[arg] for arg in ('dim', 'B_threshold') if arg in kwargs }
+    lg_Bs, forces, min_ns = [ np.full(len(keys), np.nan) for _ in range(3) ]
+    lg_Bs[ok], forces[ok], min_ns[ok] = calculate_bayes_factors_batch(zeta_ts[ok], zeta_sps[ok],
+            ns[ok], Vs[ok], Vs_pi[ok], localization_error, verbose=verbose, **batch_kwargs)
+    for key, lg_B, force, min_n in zip(keys, lg_Bs, forces, min_ns):
+        cell = cells[key]
+        cell.lg_B, cell.force, cell.min_n = lg_B, force, min_n
 
     # Report error if any
+    nan_cells_list = [ key for key, _ok in zip(keys, ok) if not _ok ]
     if len(nan_cells_list) > 0:
         logging.warn(
             "A NaN value was present in the input parameters for the following cells: {nan_cells_list}.\nBayes factor calculations were skipped for them".format(nan_cells_list=nan_cells_list))
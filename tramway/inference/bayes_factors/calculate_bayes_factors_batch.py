@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2020, Institut Pasteur
+#   Contributor: François Laurent
+
+# This file is part of the TRamWAy software available at
+# "https://github.com/DecBayComp/TRamWAy" and is distributed under
+# the terms of the CeCILL license as circulated at the following URL
+# "http://www.cecill.info/licenses.en.html".
+
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""
+Bayes factors for all the bins at once.
+
+The lambda integrals of :func:`~.calculate_marginalized_integral.calculate_integral_ratio`
+are evaluated with a Gauss-Legendre rule after a change of variable that absorbs
+the :math:`q(\\lambda)^{-p}` factor, and the minimal numbers of jumps are searched for
+with a vectorized bracketing root finder.
+"""
+
+import logging
+
+import numpy as np
+from scipy.special import gammainc, gammaln, logsumexp
+
+from .convenience_functions import n_pi_func
+from .convenience_functions import p as pow
+from .stopwatch import stopwatch
+
+
+__all__ = ['calculate_bayes_factors_batch', 'calculate_lg_bayes_factors',
+        'calculate_minimal_ns']
+
+
+def ln_gammainc(a, x, rtol=1e-16, max_terms=int(1e5)):
+    """
+    Natural logarithm of the regularized lower incomplete gamma function.
+
+    Where :func:`scipy.special.gammainc` underflows, the series
+    :math:`P(a,x) = x^a e^{-x} \\sum_k x^k / \\Gamma(a+k+1)` is summed in log space.
+    """
+    a, x = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(x, dtype=float))
+    P = gammainc(a, x)
+    with np.errstate(divide='ignore'):
+        ln_P = np.log(P)
+    small = np.flatnonzero(P < 1e-280)
+    if small.size:
+        a, x = a.ravel()[small], x.ravel()[small]
+        term = np.ones_like(x)
+        total = np.ones_like(x)
+        active = np.arange(x.size)
+        for k in range(1, max_terms + 1):
+            term[active] *= x[active] / (a[active] + k)
+            total[active] += term[active]
+            active = active[term[active] > rtol * total[active]]
+            if active.size == 0:
+                break
+        ln_P = ln_P.copy()
+        ln_P.ravel()[small] = a * np.log(x) - x - gammaln(a + 1.) + np.log(total)
+    return ln_P
+
+
+def _gauss_legendre(order):
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    # map [-1, 1] onto [0, 1]
+    return .5 * (nodes + 1.), .5 * weights
+
+
+def ln_marginalized_integrals(zeta_t, zeta_sp, p, v, E, rel_loc_error, order=32, u_max=12.):
+    """
+    Natural logarithm of the lambda integrals
+
+    .. math::
+
+        \\int_0^1 q(\\lambda)^{-p} P(p, r q(\\lambda)) d\\lambda,
+        \\qquad q(\\lambda) = v + E \\| \\zeta_t - \\lambda \\zeta_{sp} \\|^2,
+
+    for many bins at once, with :math:`P` the regularized lower incomplete gamma function
+    and :math:`r` the inverse relative localization error.
+    The :math:`\\Gamma(p)` prefactor is omitted as it cancels out in the Bayes factors.
+
+    On either side of the maximum :math:`\\lambda_c` of the integrand in :math:`[0,1]`,
+    the integration variable is :math:`u = \\sqrt{\\kappa \\ln(q / q(\\lambda_c))}`,
+    with :math:`\\kappa` the logarithmic decay rate of the integrand at :math:`\\lambda_c`
+    (:math:`\\kappa = p` without localization error), so that the integrand is
+    :math:`e^{-u^2}` times a non-increasing factor, whatever the sharpness of the peak.
+
+    Arguments:
+
+        zeta_t (numpy.ndarray): M x D array.
+
+        zeta_sp (numpy.ndarray): M x D array.
+
+        p, v, E, rel_loc_error (numpy.ndarray or float): M-element arrays or scalars.
+
+        order (int): number of Gauss-Legendre nodes on each side of the maximum.
+
+        u_max (float): upper bound on the integration interval in :math:`w`;
+            the integrand is :math:`e^{-p w^2 / \\kappa}` times slowly varying factors.
+
+    Returns:
+
+        numpy.ndarray: M-element array.
+    """
+    zeta_t, zeta_sp = np.asarray(zeta_t, dtype=float), np.asarray(zeta_sp, dtype=float)
+    M = zeta_t.shape[0]
+    p, v, E, rel_loc_error = [ np.broadcast_to(np.asarray(x, dtype=float), (M,))
+            for x in (p, v, E, rel_loc_error) ]
+
+    # q(lambda) = q0 + B lambda + A lambda^2
+    A = E * np.sum(zeta_sp * zeta_sp, axis=1)
+    B = -2. * E * np.sum(zeta_t * zeta_sp, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lambda_u = np.where(0 < A, -B / (2. * A), 0.)
+    lambda_c = np.clip(lambda_u, 0., 1.)
+    diff = zeta_t - lambda_c[:,np.newaxis] * zeta_sp
+    q_c = v + E * np.sum(diff * diff, axis=1)
+    diff = zeta_t - lambda_u[:,np.newaxis] * zeta_sp
+    q_u = v + E * np.sum(diff * diff, axis=1)
+
+    def ln_P(q, r, p):
+        # P(p, r q) = 1 if r is infinite (no localization error)
+        ln_p = np.zeros_like(q)
+        finite = np.isfinite(r)
+        if np.any(finite):
+            ln_p[finite] = ln_gammainc(p[finite], q[finite] * r[finite])
+        return ln_p
+
+    # effective power of the integrand at q_c, such that the integrand decays at least
+    # as fast as q^{-kappa}; d ln P(p, x) / d ln x = x^p e^{-x} / (Gamma(p) P(p, x))
+    kappa = p.copy()
+    finite = np.isfinite(rel_loc_error)
+    if np.any(finite):
+        x = q_c[finite] * rel_loc_error[finite]
+        kappa[finite] -= np.exp(p[finite] * np.log(x) - x - gammaln(p[finite]) - \
+                ln_gammainc(p[finite], x))
+    kappa = np.maximum(kappa, 1e-12)
+
+    # if the vertex of q lies just outside [0,1], w below behaves like sqrt(y^2 - y0^2)
+    # with y0 small; integrate in y instead
+    y0_2 = kappa * np.log(q_c / q_u)
+    y0_2[~(y0_2 < 1.)] = 0.
+
+    nodes, weights = _gauss_legendre(order)
+    terms = []
+    for side in (-1., 1.):
+        length = lambda_c if side < 0 else 1. - lambda_c
+        # slope of q at lambda_c towards the current side
+        b = np.maximum(side * (B + 2. * A * lambda_c), 0.)
+        # w = sqrt(kappa ln(q / q_c)) so that the integrand is e^{-p w^2 / kappa} P(p, r q)
+        W = np.sqrt(kappa * np.log1p((b + A * length) * length / q_c))
+        W = np.minimum(W, u_max)
+        y0 = np.sqrt(y0_2)
+        Y = np.sqrt(y0_2 + W * W) - y0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = y0[:,np.newaxis] + Y[:,np.newaxis] * nodes
+            w2_kappa = np.maximum(y * y - y0_2[:,np.newaxis], 0.) / kappa[:,np.newaxis]
+            c = np.expm1(w2_kappa)
+            # solve A delta^2 + b delta = q_c c for delta >= 0
+            delta = 2. * q_c[:,np.newaxis] * c / (b[:,np.newaxis] + \
+                    np.sqrt(b[:,np.newaxis] ** 2 + 4. * A[:,np.newaxis] * q_c[:,np.newaxis] * c))
+            ln_ddelta_dy = np.log(q_c[:,np.newaxis] / (b[:,np.newaxis] + 2. * A[:,np.newaxis] * delta)) \
+                    + np.log(2. * y / kappa[:,np.newaxis]) + w2_kappa
+            q = q_c[:,np.newaxis] * (1. + c)
+            term = np.log(Y[:,np.newaxis] * weights) - p[:,np.newaxis] * w2_kappa + ln_ddelta_dy + \
+                    ln_P(*np.broadcast_arrays(q, rel_loc_error[:,np.newaxis], p[:,np.newaxis]))
+        term[~(0 < Y)] = -np.inf
+        terms.append(term)
+    ln_integral = logsumexp(np.hstack(terms), axis=1)
+
+    # constant integrand
+    flat = (A == 0) & (B == 0)
+    ln_integral[flat] = ln_P(q_c[flat], rel_loc_error[flat], p[flat])
+
+    return ln_integral - p * np.log(q_c)
+
+
+def calculate_lg_bayes_factors(zeta_ts, zeta_sps, ns, Vs, Vs_pi, loc_error, dim=2, order=32):
+    """
+    Decimal logarithm of the Bayes factor for many bins at once.
+
+    Same as the `lg_B` value returned by
+    :func:`~.calculate_bayes_factors._calculate_one_bayes_factor`, for each bin.
+
+    Arguments:
+
+        zeta_ts (numpy.ndarray): M x D array of total force signal-to-noise ratios.
+
+        zeta_sps (numpy.ndarray): M x D array of spurious force signal-to-noise ratios.
+
+        ns (numpy.ndarray): M-element array of jump counts.
+
+        Vs (numpy.ndarray): M-element array of jump variances.
+
+        Vs_pi (numpy.ndarray): M-element array of prior jump variances.
+
+        loc_error (float): localization error, as a variance.
+
+        dim (int): dimensionality of the problem.
+
+        order (int): number of Gauss-Legendre nodes on each side of the integrand maximum.
+
+    Returns:
+
+        numpy.ndarray: M-element array of :math:`\\log_{10}` Bayes factors.
+    """
+    zeta_ts, zeta_sps = np.asarray(zeta_ts, dtype=float), np.asarray(zeta_sps, dtype=float)
+    ns, Vs, Vs_pi = [ np.asarray(x, dtype=float).ravel() for x in (ns, Vs, Vs_pi) ]
+    n_pi = n_pi_func(dim)
+    p = pow(ns, dim)
+    v = 1. + n_pi / ns * Vs_pi / Vs
+    eta2 = n_pi / (ns + n_pi)
+    if 0 < loc_error:
+        rel_loc_error = ns * Vs / (4. * loc_error)
+    else:
+        rel_loc_error = np.inf
+    ln_B = ln_marginalized_integrals(zeta_ts, zeta_sps, p, v, eta2, rel_loc_error, order) - \
+            ln_marginalized_integrals(zeta_ts, zeta_sps, p, v, 1., rel_loc_error, order)
+    return ln_B / np.log(10) + .5 * dim * np.log10(eta2)
+
+
+def _bracketed_roots(f, lower, upper, f_lower, f_upper, xtol, rtol, max_iter=100):
+    """
+    Illinois variant of the regula falsi, for many functions at once.
+
+    `f(x, i)` evaluates the functions of indices `i` at `x`;
+    `f_lower` and `f_upper` must have opposite signs.
+
+    Returns the bound of the final brackets on the side of `upper`.
+    """
+    lower, upper = lower.astype(float), upper.astype(float)
+    f_lower, f_upper = f_lower.astype(float), f_upper.astype(float)
+    side = np.zeros(lower.size, dtype=int)
+    active = np.arange(lower.size)
+    for _ in range(max_iter):
+        converged = np.abs(upper[active] - lower[active]) <= \
+                xtol + rtol * np.abs(upper[active])
+        active = active[~converged]
+        if active.size == 0:
+            break
+        a, b, fa, fb = lower[active], upper[active], f_lower[active], f_upper[active]
+        x = (a * fb - b * fa) / (fb - fa)
+        # fall back to bisection if the secant step leaves the bracket
+        x = np.where((np.minimum(a, b) < x) & (x < np.maximum(a, b)), x, .5 * (a + b))
+        fx = f(x, active)
+        same_as_upper = np.sign(fx) == np.sign(fb)
+        # the upper bound moves; halve the lower value if it already moved last time
+        i = active[same_as_upper]
+        upper[i], f_upper[i] = x[same_as_upper], fx[same_as_upper]
+        f_lower[i[side[i] == 1]] *= .5
+        side[i] = 1
+        i = active[~same_as_upper]
+        lower[i], f_lower[i] = x[~same_as_upper], fx[~same_as_upper]
+        f_upper[i[side[i] == -1]] *= .5
+        side[i] = -1
+    return upper
+
+
+def calculate_minimal_ns(zeta_ts, zeta_sps, ns, Vs, Vs_pi, loc_error, dim=2, B_threshold=10,
+        lg_Bs=None, order=32, max_attempts=40, increase_factor=2, xtol=1., rtol=.001):
+    """
+    Minimal number of jumps per bin for strong evidence, for many bins at once.
+
+    Same as :func:`~.calculate_bayes_factors.calculate_minimal_n` for each bin,
+    except that the search interval is refined with the regula falsi instead of Brent's method.
+
+    Arguments:
+
+        zeta_ts, zeta_sps, ns, Vs, Vs_pi, loc_error, dim, order:
+            see :func:`calculate_lg_bayes_factors`.
+
+        B_threshold (float): Bayes factor threshold for strong evidence.
+
+        lg_Bs (numpy.ndarray): precomputed Bayes factors for `ns`, if available.
+
+    Returns:
+
+        numpy.ndarray: M-element array of minimal numbers of jumps
+            (`NaN` where no such number could be found).
+    """
+    zeta_ts, zeta_sps = np.asarray(zeta_ts, dtype=float), np.asarray(zeta_sps, dtype=float)
+    ns, Vs, Vs_pi = [ np.asarray(x, dtype=float).ravel() for x in (ns, Vs, Vs_pi) ]
+    if lg_Bs is None:
+        lg_Bs = calculate_lg_bayes_factors(zeta_ts, zeta_sps, ns, Vs, Vs_pi, loc_error, dim, order)
+    lg_B_threshold = abs(np.log10(B_threshold))
+
+    def lg_B(n, i):
+        return calculate_lg_bayes_factors(zeta_ts[i], zeta_sps[i], n, Vs[i], Vs_pi[i],
+                loc_error, dim, order)
+
+    min_ns = np.full(ns.size, np.nan)
+    strong = lg_B_threshold <= np.abs(lg_Bs)
+    min_ns[strong] = ns[strong]
+
+    # find the initial search intervals
+    remaining = np.flatnonzero(~strong & np.isfinite(lg_Bs))
+    upper = np.full(ns.size, np.nan)
+    lg_B_upper = np.full(ns.size, np.nan)
+    for attempt in range(max_attempts):
+        if remaining.size == 0:
+            break
+        n = ns[remaining] - 1 + increase_factor ** attempt
+        lg_B_n = lg_B(n, remaining)
+        found = lg_B_threshold <= np.abs(lg_B_n)
+        upper[remaining[found]] = n[found]
+        lg_B_upper[remaining[found]] = lg_B_n[found]
+        remaining = remaining[~found]
+    if remaining.size:
+        logging.warning("Unable to find the minimal number of data points to provide strong evidence for bins: {}".format(remaining))
+
+    # find more accurate locations
+    i = np.flatnonzero(np.isfinite(upper))
+    if i.size:
+        sign = np.sign(lg_B_upper[i])
+        def solve_me(n, j):
+            return lg_B(n, i[j]) - sign[j] * lg_B_threshold
+        roots = _bracketed_roots(solve_me, ns[i], upper[i],
+                lg_Bs[i] - sign * lg_B_threshold, lg_B_upper[i] - sign * lg_B_threshold,
+                xtol, rtol)
+        min_ns[i] = np.ceil(roots)
+    return min_ns
+
+
+def calculate_bayes_factors_batch(zeta_ts, zeta_sps, ns, Vs, Vs_pi, loc_error, dim=2,
+        B_threshold=10, verbose=True, order=32):
+    """
+    Calculate the Bayes factor for a set of bins given a uniform localization error.
+
+    Takes the same arguments and returns the same values as
+    :func:`~.calculate_bayes_factors.calculate_bayes_factors`,
+    with all the bins processed at once.
+    Bins with `NaN` input values are skipped and get `NaN` output values.
+
+    Arguments:
+
+        order (int): number of Gauss-Legendre nodes on each side of the integrand maximum.
+
+    Returns:
+
+        list: `lg_Bs`, `forces` and `min_ns` arrays, in the shape of `ns`.
+    """
+    if dim not in [2]:
+        raise ValueError("Bayes factor calculations in {dim}D not supported yet.".format(dim=dim))
+    zeta_ts, zeta_sps = np.asarray(zeta_ts, dtype=float), np.asarray(zeta_sps, dtype=float)
+    if np.shape(zeta_ts)[1] != 2 or np.shape(zeta_sps)[1] != 2:
+        raise ValueError("zeta_ts and zeta_sps must be matrices of size (M x 2)")
+    shape = np.shape(ns)
+    ns, Vs, Vs_pi = [ np.asarray(x, dtype=float).ravel() for x in (ns, Vs, Vs_pi) ]
+
+    ok = np.all(np.isfinite(zeta_ts), axis=1) & np.all(np.isfinite(zeta_sps), axis=1) & \
+            np.isfinite(ns) & np.isfinite(Vs) & np.isfinite(Vs_pi)
+    if not np.all(ok):
+        logging.warning("A NaN value was present in the input parameters for the following cells: {}.\nBayes factor calculations were skipped for them".format(np.flatnonzero(~ok)))
+
+    lg_Bs = np.full(ns.size, np.nan)
+    forces = np.full(ns.size, np.nan)
+    min_ns = np.full(ns.size, np.nan)
+    args = (zeta_ts[ok], zeta_sps[ok], ns[ok], Vs[ok], Vs_pi[ok], loc_error, dim)
+    with stopwatch("Bayes factor calculation", verbose):
+        lg_Bs[ok] = calculate_lg_bayes_factors(*args, order=order)
+        min_ns[ok] = calculate_minimal_ns(*args, B_threshold=B_threshold, lg_Bs=lg_Bs[ok],
+                order=order)
+    lg_B_threshold = np.log10(B_threshold)
+    forces[ok] = 1 * (lg_Bs[ok] >= lg_B_threshold) - 1 * (lg_Bs[ok] <= -lg_B_threshold)
+
+    return [lg_Bs.reshape(shape), forces.reshape(shape), min_ns.reshape(shape)]
@@ -1,11 +1,13 @@
 """
 Functions allowing to calculate the D posterior and MAP(D) as (will be) described in the Ito-Stratonovich article.
-Provides 3 functions:
+Provides 4 functions:
 - get_D_posterior
 - get_MAP_D
 - get_D_confidence_interval
+- get_D_confidence_intervals
 
 If unsure, use `get_D_confidence_interval`, which provides MAP(D) and a confidence interval for D for the given confidence level.
+For many bins at once, use `get_D_confidence_intervals`.
 If need the D posterior, use `get_D_posterior`.
 """
 
@@ -17,7 +19,7 @@ import numpy as np
 from numpy import exp as exp
 from numpy import log as log
 from scipy.optimize import brentq
-from scipy.special import gammainc, gammaincc, gammaln
+from scipy.special import gammainc, gammaincc, gammaincinv, gammaln
 
 from .convenience_functions import n_pi_func
 from .convenience_functions import p as pow
@@ -130,6 +132,50 @@ def get_D_confidence_interval(alpha, n, zeta_t, V, V_pi, dt, sigma2, dim):
     return MAP_D, CI
 
 
+def get_D_confidence_intervals(alpha, n, zeta_t, V, V_pi, dt, sigma2, dim):
+    """Vectorized version of `get_D_confidence_interval` for many bins at once.
+
+    The posterior of D is a truncated inverse gamma distribution, and the bounds of the confidence
+    interval are obtained in closed form with the inverse of the regularized incomplete gamma function
+    instead of a root search.
+
+    Input:
+    alpha   -   confidence level,
+    n       -   number of jumps in each bin, M x 1 array,
+    zeta_t  -   signal-to-noise ratio for the total force in each bin, M x dim array,
+    V       -   (biased) variance of jumps in each bin, M x 1 array,
+    V_pi    -   (biased) variance of jumps in all other bins excluding the current one, M x 1 array,
+    dt      -   time step
+    sigma2  -   localization error (in the units of variance),
+    dim     -   dimensionality of the problem
+
+    Output:
+    MAP_D   -   MAP values of the diffusivity, M x 1 array,
+    CI      -   confidence intervals for the diffusivity, M x 2 array
+
+    """
+    n, V, V_pi = [np.asarray(x, dtype=float).ravel() for x in (n, V, V_pi)]
+    zeta_t = np.reshape(np.asarray(zeta_t, dtype=float), (n.size, dim))
+    n_pi = n_pi_func(dim)
+    p = pow(n, dim)
+    v = 1.0 + n_pi / n * V_pi / V
+    eta2 = n_pi / (n + n_pi)
+    G3 = v + eta2 * np.sum((zeta_t - _zeta_mu(dim))**2, axis=1)
+    MAP_D = n * V * G3 / 4 / dt / (p + 1)
+    with np.errstate(divide='ignore'):
+        y_L = n * V * G3 / 4 / sigma2
+    P_L = gammainc(p, y_L)
+
+    CI = np.full((n.size, 2), np.nan)
+    for i, q in enumerate([(1 - alpha) / 2, 1 - (1 - alpha) / 2]):
+        # 1 - gammainc(p, y) / gammainc(p, y_L) = q
+        y = gammaincinv(p, (1 - q) * P_L)
+        with np.errstate(divide='ignore'):
+            CI[:, i] = n * V * G3 / 4 / dt / y
+
+    return MAP_D, CI
+
+
 def _zeta_mu(dim):
     """The center of the prior for the total force.
     For diffusivity inference should not depend on the diffusivity gradient.
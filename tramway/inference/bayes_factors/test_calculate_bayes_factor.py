@@ -12,6 +12,7 @@ import numpy as np
 from scipy.integrate import dblquad, quad
 
 from .calculate_bayes_factors import calculate_bayes_factors
+from .calculate_bayes_factors_batch import calculate_bayes_factors_batch
 from .calculate_marginalized_integral import calculate_marginalized_integral
 from .calculate_posteriors import (calculate_one_1D_posterior_in_2D,
                                    calculate_one_1D_prior_in_2D,
@@ -371,6 +372,37 @@ class bayes_test(unittest.TestCase):
                 self.assertTrue(np.isclose(norm, true_norm, rtol=self.rel_tol, atol=self.tol),
                                 "{dim}D diffusivity posterior normalization test with localization error = {loc_error} failed in 2D. Obtained norm = {norm:.8g} did not match the expected norm = {true_norm:.8g}".format(dim=dim, loc_error=loc_error, norm=norm, true_norm=true_norm))
 
+    def test_batch(self):
+        """
+        Compare the Bayes factors and minimal numbers of jumps computed for all the bins
+        at once with the bin-by-bin calculations.
+        """
+        rng = np.random.RandomState(0)
+        M = 40
+        ns = np.round(np.exp(rng.uniform(0, np.log(300), M)))
+        zeta_ts = rng.randn(M, 2) * rng.choice([0.05, 0.3, 1.0, 3.0], (M, 1))
+        zeta_sps = rng.randn(M, 2) * rng.choice([0.0, 0.01, 0.3, 1.0, 3.0], (M, 1))
+        Vs = rng.uniform(0.01, 1.0, M)
+        Vs_pi = Vs * rng.uniform(0.5, 2.0, M)
+        zeta_ts[-1, 0] = np.nan
+
+        for loc_error in [0, 0.1**2.0]:
+            lg_Bs, forces, min_ns = calculate_bayes_factors(zeta_ts[:-1], zeta_sps[:-1], ns[:-1],
+                                                            Vs[:-1], Vs_pi[:-1], loc_error, verbose=False)
+            batch_lg_Bs, batch_forces, batch_min_ns = calculate_bayes_factors_batch(
+                zeta_ts, zeta_sps, ns, Vs, Vs_pi, loc_error, verbose=False)
+
+            self.assertTrue(np.all(np.isnan([batch_lg_Bs[-1], batch_forces[-1], batch_min_ns[-1]])),
+                            "NaN input values did not result in NaN Bayes factors")
+            self.assertTrue(np.allclose(batch_lg_Bs[:-1], lg_Bs, rtol=1e-5, atol=1e-6),
+                            "Batch Bayes factors differ from the bin-by-bin calculations")
+            self.assertTrue(np.array_equal(batch_forces[:-1], forces),
+                            "Batch force predictions differ from the bin-by-bin calculations")
+            # the bin-by-bin calculation may fail on large numbers of jumps
+            found = np.isfinite(min_ns)
+            self.assertTrue(np.allclose(batch_min_ns[:-1][found], min_ns[found], rtol=0.005, atol=1.0),
+                            "Batch minimal numbers of jumps differ from the bin-by-bin calculations")
+
 
 # # A dirty fix for a weird bug in unittest
 # if __name__ == '__main__':
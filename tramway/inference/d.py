@@ -26,6 +26,8 @@ def infer_D(cells, diffusivity_prior=None, jeffreys_prior=None, min_diffusivity=
         max_iter=None, epsilon=None, rgrad=None, **kwargs):
 
     if diffusivity_prior is None:
+        # the cells are optimized independently and the packed solver needs no initial guess
+        kwargs.pop('warm_start', None)
         return degraded_d.infer_D(cells, jeffreys_prior=jeffreys_prior,
                 min_diffusivity=min_diffusivity, **kwargs)
     else:
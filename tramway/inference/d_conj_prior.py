@@ -17,7 +17,7 @@ import pandas as pd
 from tramway.inference.base import Maps
 from tramway.inference.bayes_factors.get_D_posterior import *
 from tramway.inference.gradient import setup_with_grad_arguments, get_grad_kwargs
-from tramway.inference.snr import add_snr_extensions
+from tramway.inference.snr import snr_statistics
 
 
 setup = {
@@ -55,42 +55,23 @@ def infer_d_conj_prior(cells, alpha=.95, return_zeta_spurious=True, trust=False,
     :meth:`~tramway.inference.base.Local.get_localization_error`
     and :func:`~tramway.inference.gradient.get_grad_kwargs`.
     """
-    dim = cells.dim
     dt = cells.any_cell().dt[0]
     sigma2 = cells.get_localization_error(kwargs)
     if sigma2 is None:
         raise ValueError('undefined localization precision; please define `sigma` or `sigma2`')
-    maps = add_snr_extensions(cells, _zeta_spurious=False)
-    n, zeta_t, V, V_pi = maps['n'], Maps(maps)['zeta_total'], maps['V'], maps['V_prior']
-    index, D_map, D_ci = [], [], []
-    for i in cells:
-        try:
-            n_i = n.loc[i]
-            zeta_i = zeta_t.loc[i]
-            V_i = V.loc[i]
-            V_minus_i = V_pi.loc[i]
-        except KeyError:
-            continue
-        try:
-            _map, _ci = get_D_confidence_interval(
-                alpha, n_i, zeta_i, V_i, V_minus_i, dt, sigma2, dim)
-        except (SystemExit, KeyboardInterrupt):
-            raise
-        except:
-            if trust:
-                raise
-            continue
-        index.append(i)
-        D_map.append(_map)
-        D_ci.append(_ci[np.newaxis, :])
-    D_map = np.array(D_map)
-    D_ci = np.vstack(D_ci)
+    index = np.array(list(cells.keys()))
+    packed = cells.pack(index)
+    maps = d_conj_prior_maps(packed.count, packed.sum(packed.dr), packed.sum(packed.dr * packed.dr),
+            dt, sigma2, alpha, index=index, space_cols=cells.space_cols, trust=trust).maps
+    D_columns = ['diffusivity', 'ci low', 'ci high']
     if return_zeta_spurious:
+        D_map = maps['diffusivity'].dropna()
+        index, D_map = D_map.index.values, D_map.values
         reverse_index = np.full(cells.adjacency.shape[0], -1, dtype=int)
         reverse_index[index] = np.arange(len(index))
         grad_kwargs = get_grad_kwargs(**kwargs)
         g_index, g = [], []
-        sd = maps['sd']
+        sd = np.sqrt(maps['V'].dropna())
         g_defined = np.zeros(len(sd), dtype=bool)
         for j, i in enumerate(sd.index):
             gradD = cells.grad(i, D_map, reverse_index, **grad_kwargs)
@@ -102,24 +83,91 @@ def infer_d_conj_prior(cells, alpha=.95, return_zeta_spurious=True, trust=False,
                 g.append(gradD[np.newaxis, :])
         g = np.concatenate(g, axis=0)
         # zeta_spurious
-        dt = cells[i].dt[0]  # `add_snr_extensions` checked that all dts are equal
         sd = sd.values[:, np.newaxis]
         zeta_spurious = g * dt / sd[g_defined]
-        maps = maps.join(pd.DataFrame(
+        maps = maps.drop(columns=D_columns).join(pd.DataFrame(
             zeta_spurious,
             index=g_index,
             columns=['zeta_spurious ' + col for col in cells.space_cols],
-        ))
-    maps = maps.drop(columns=['sd']).join(pd.DataFrame(
-        np.hstack((D_map[:, np.newaxis], D_ci)),
-        index=index,
-        columns=['diffusivity', 'ci low', 'ci high']))
+        )).join(maps[D_columns])
     return maps
 
+def d_conj_prior_maps(n, sum_dr, sum_dr2, dt, sigma2, alpha=.95, index=None, space_cols=None,
+        trust=False):
+    """
+    Diffusivity MAP and confidence interval from per-cell counts and sums, for all the cells
+    at once.
+
+    This is the array-level counterpart of :func:`infer_d_conj_prior`, without *zeta_spurious*.
+
+    Arguments:
+
+        n (numpy.ndarray): number of translocations in each cell.
+
+        sum_dr (numpy.ndarray): per-cell sums of the translocation displacements,
+            with as many columns as spatial dimensions.
+
+        sum_dr2 (numpy.ndarray): per-cell sums of the squared displacements,
+            with as many columns as spatial dimensions.
+
+        dt (float): time step.
+
+        sigma2 (float): localization error, as a variance.
+
+        alpha (float): confidence level for CI estimation.
+
+        index (sequence): cell indices; default is ``range(len(n))``.
+
+        space_cols (sequence): names of the spatial dimensions;
+            default is *'x'*, *'y'* and *'z'*.
+
+        trust (bool): if ``False``, silently skip the cells with more than one translocation
+            for which the MAP or the confidence interval is not defined;
+            if ``True``, raise a :class:`ValueError` instead.
+
+    Returns:
+
+        Maps: maps with variables *n*, *V_prior*, *V*, *zeta_total*, *diffusivity*,
+            *ci low* and *ci high*.
+
+    See also :func:`~tramway.inference.snr.snr_statistics` and
+    :func:`~tramway.inference.bayes_factors.get_D_posterior.get_D_confidence_intervals`.
+    """
+    n = np.asarray(n)
+    sum_dr = np.asarray(sum_dr, dtype=float)
+    dim = sum_dr.shape[1]
+    if index is None:
+        index = np.arange(n.size)
+    else:
+        index = np.asarray(index)
+    if space_cols is None:
+        space_cols = ['x', 'y', 'z'][:dim]
+    V, V_prior, zeta_total, _ = snr_statistics(n, sum_dr, sum_dr2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        D_map, D_ci = get_D_confidence_intervals(alpha, n, zeta_total, V, V_prior, dt, sigma2, dim)
+    nnz = 1 < n
+    defined = nnz & np.isfinite(D_map) & np.all(np.isfinite(D_ci), axis=1)
+    if trust and not np.all(defined[nnz]):
+        raise ValueError('undefined diffusivity at cells: {}'.format(index[nnz & ~defined]))
+    maps = pd.DataFrame(
+        np.stack((n, V_prior), axis=1),
+        index=index,
+        columns=['n', 'V_prior'],
+    ).join(pd.DataFrame(
+        np.hstack((V[:, np.newaxis], zeta_total))[nnz],
+        index=index[nnz],
+        columns=['V'] + ['zeta_total ' + col for col in space_cols],
+    )).join(pd.DataFrame(
+        np.hstack((D_map[:, np.newaxis], D_ci))[defined],
+        index=index[defined],
+        columns=['diffusivity', 'ci low', 'ci high'],
+    ))
+    return Maps(maps, mode='d.conj_prior')
+
 def infer_d_map_and_ci(*args, **kwargs):
     """
     Backward-compatibility alias for :func:`infer_d_conj_prior`.
     """
     return infer_d_conj_prior(*args, **kwargs)
 
-__all__ = ['infer_d_conj_prior', 'infer_d_map_and_ci', 'setup']
+__all__ = ['d_conj_prior_maps', 'infer_d_conj_prior', 'infer_d_map_and_ci', 'setup']
@@ -13,6 +13,7 @@
 
 
 from .base import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -27,7 +28,8 @@ setup = {'name':    'degraded.d',
         ('localization_error',  ('-e', dict(type=float, help='localization precision (see also sigma; default is 0.03)'))),
         ('jeffreys_prior',      ('-j', dict(action='store_true', help="Jeffreys' prior"))),
         ('min_diffusivity',     dict(type=float, help='minimum diffusivity value allowed')))),
-        'cell_sampling':    'individual'}
+        'cell_sampling':    'individual',
+        'supports_diagnostics': True}
 
 
 def d_neg_posterior(diffusivity, cell, sigma2, jeffreys_prior, dt_mean, \
@@ -69,13 +71,153 @@ def d_neg_posterior(diffusivity, cell, sigma2, jeffreys_prior, dt_mean, \
     return d_neg_posterior
 
 
-def infer_D(cells, localization_error=None, jeffreys_prior=False, min_diffusivity=None, **kwargs):
+def d_neg_posterior_derivatives(diffusivity, packed, sigma2, jeffreys_prior, dt_mean):
+    """
+    First and second derivatives of :func:`d_neg_posterior` for several cells at once.
+
+    Arguments:
+
+        diffusivity (numpy.ndarray): diffusivity value in each cell.
+
+        packed (PackedTranslocations): translocations of the cells.
+
+        sigma2 (float): localization error.
+
+        jeffreys_prior (bool): Jeffreys' prior.
+
+        dt_mean (numpy.ndarray): average time step in each cell.
+
+    Returns:
+
+        tuple: first and second derivatives, as arrays with one element per cell.
+
+    """
+    D_dt = packed.expand(diffusivity) * packed.dt + sigma2 # (D+Dnoise)*dt
+    dt_D_dt = packed.dt / D_dt
+    dr2_D_dt = packed.dr2 / (4. * D_dt)
+    grad = packed.sum(dt_D_dt * (1. - dr2_D_dt))
+    hess = packed.sum(dt_D_dt * dt_D_dt * (2. * dr2_D_dt - 1.))
+    if jeffreys_prior:
+        dt_D_dt = dt_mean / (diffusivity * dt_mean + sigma2)
+        grad += 2. * dt_D_dt
+        hess -= 2. * dt_D_dt * dt_D_dt
+    return grad, hess
+
+
+def _infer_D_packed(cells, localization_error, jeffreys_prior=False, min_diffusivity=None,
+        rtol=1e-8, max_iter=200):
+    """
+    Minimizes :func:`d_neg_posterior` in all the cells at once, with a safeguarded
+    Newton-Raphson root finder on the derivative that falls back to bisection.
+
+    Arguments:
+
+        cells (Distributed): cells with translocations.
+
+        localization_error (float): localization error, as :math:`\\sigma^2`.
+
+        jeffreys_prior (bool): Jeffreys' prior.
+
+        min_diffusivity (float or bool): lower bound on the diffusivity;
+            if :const:`None` or :const:`False`, the lower bound is the smallest
+            diffusivity value for the likelihood to be defined.
+
+        rtol (float): relative tolerance on the diffusivity.
+
+        max_iter (int): maximum number of iterations.
+
+    Returns:
+
+        pandas.DataFrame: diffusivity map.
+
+    """
+    index = list(cells.keys())
+    for i in index:
+        cell = cells[i]
+        # sanity checks
+        if not bool(cell):
+            raise ValueError('empty cell')
+        if cell.dr.shape[1] == 0:
+            raise ValueError('translocation array has no column')
+        if cell.dt.shape[1:]:
+            raise ValueError('time deltas are structured in multiple dimensions')
+        # ensure that translocations are properly oriented in time
+        if not np.all(0 < cell.dt):
+            warn('translocation dts are not all positive', RuntimeWarning)
+            cell.dr[cell.dt < 0] *= -1.
+            cell.dt[cell.dt < 0] *= -1.
+    packed = cells.pack(index)
+    count = packed.count
+    dt_mean = packed.sum(packed.dt) / count
+    dt_max = np.maximum.reduceat(packed.dt, packed.offsets[:-1])
+    sigma2 = localization_error
+    # bracket the minimum
+    if min_diffusivity is None or min_diffusivity is False:
+        lower = (1e-16 - sigma2) / dt_max
+    else:
+        lower = np.full(count.size, float(min_diffusivity))
+    # the minimum is at the lower bound where the derivative is already positive
+    grad, _ = d_neg_posterior_derivatives(lower, packed, sigma2, jeffreys_prior, dt_mean)
+    at_lower_bound = 0 <= grad
+    # closed-form solution for constant time steps, as a starting point
+    D = packed.sum(packed.dr2) / (4. * (count + 2. * bool(jeffreys_prior)))
+    D = np.maximum(lower, (D - sigma2) / dt_mean)
+    D[at_lower_bound] = lower[at_lower_bound]
+    grad, hess = d_neg_posterior_derivatives(D, packed, sigma2, jeffreys_prior, dt_mean)
+    upper = np.where(at_lower_bound | (0 < grad), D, np.inf)
+    lower = np.where(grad <= 0, D, lower)
+    _D = D
+    while True:
+        unbounded = np.isinf(upper)
+        if not np.any(unbounded):
+            break
+        _D = 2. * np.abs(_D) + 1e-16
+        _grad, _ = d_neg_posterior_derivatives(_D, packed, sigma2, jeffreys_prior, dt_mean)
+        bounded = unbounded & (0 < _grad)
+        upper[bounded] = _D[bounded]
+        lower[unbounded & ~bounded] = _D[unbounded & ~bounded]
+    active = ~at_lower_bound & (lower < upper)
+    for _ in range(max_iter):
+        if not np.any(active):
+            break
+        # Newton step, or bisection if the step leaves the bracket
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = grad / hess
+            _D = D - step
+        bisect = ~((0 < hess) & (lower < _D) & (_D < upper))
+        _D[bisect] = .5 * (lower[bisect] + upper[bisect])
+        converged = (np.abs(_D - D) <= rtol * np.abs(_D)) | (upper - lower <= rtol * np.abs(_D))
+        D = np.where(active, _D, D)
+        active &= ~converged
+        grad, hess = d_neg_posterior_derivatives(D, packed, sigma2, jeffreys_prior, dt_mean)
+        positive = 0 < grad
+        upper = np.where(active & positive, D, upper)
+        lower = np.where(active & ~positive, D, lower)
+    else:
+        warn('the diffusivity did not converge in {:d} cells'.format(np.sum(active)), RuntimeWarning)
+    return pd.DataFrame({'diffusivity': pd.Series(D, index=packed.index)})
+
+
+def infer_D(cells, localization_error=None, jeffreys_prior=False, min_diffusivity=None,
+        diagnostics=False, **kwargs):
+    """
+    The cells are optimized all at once, unless arguments for :func:`scipy.optimize.minimize`
+    are given or `diagnostics` is ``True``.
+
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
+    """
     if isinstance(cells, Distributed): # multiple cells
         localization_error = cells.get_localization_error(kwargs, 0.03, True, \
                 localization_error=localization_error)
+        if not (kwargs or diagnostics):
+            # no arguments for `scipy.optimize.minimize`; optimize all the cells at once
+            return _infer_D_packed(cells, localization_error, jeffreys_prior, min_diffusivity)
         args = (localization_error, jeffreys_prior, min_diffusivity)
-        inferred = { i: infer_D(c, *args, **kwargs) for i, c in cells.items() }
+        counter = ObjectiveCounter() if diagnostics else None
+        inferred = { i: infer_D(c, *args, diagnostics=counter, **kwargs) for i, c in cells.items() }
         inferred = pd.DataFrame({'diffusivity': pd.Series(inferred)})
+        if diagnostics:
+            return inferred, {'diagnostics': counter.diagnostics()}
         return inferred
     else: # single cell
         cell = cells
@@ -103,7 +245,10 @@ def infer_D(cells, localization_error=None, jeffreys_prior=False, min_diffusivit
                 min_diffusivity = (1e-16-noise_dt) / np.max(cell.dt)
             kwargs['bounds'] = [(min_diffusivity,None)]
         # run the optimization
-        result = minimize(d_neg_posterior, D_initial, \
+        fun = d_neg_posterior
+        if diagnostics:
+            fun = diagnostics.wrap(fun, kwargs)
+        result = minimize(fun, D_initial, \
             args=(cell, localization_error, jeffreys_prior, dt_mean, min_diffusivity), \
             **kwargs)
         # return the resulting optimal diffusivity value
@@ -14,6 +14,7 @@
 
 from tramway.core import ChainArray
 from .base import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -28,7 +29,8 @@ setup = {'name': ('degraded.dd', 'degraded.ddrift'),
         ('localization_error',  ('-e', dict(type=float, help='localization precision (see also sigma; default is 0.03)'))),
         ('jeffreys_prior',      ('-j', dict(action='store_true', help="Jeffreys' prior"))),
         ('min_diffusivity',     dict(type=float, help='minimum diffusivity value allowed')))),
-        'cell_sampling':    'individual'};
+        'cell_sampling':    'individual',
+        'supports_diagnostics': True};
 
 
 def dd_neg_posterior(x, dd, cell, sigma2, jeffreys_prior, dt_mean, min_diffusivity):
@@ -48,21 +50,28 @@ def dd_neg_posterior(x, dd, cell, sigma2, jeffreys_prior, dt_mean, min_diffusivi
     return neg_posterior
 
 
-def infer_DD(cells, localization_error=None, jeffreys_prior=False, min_diffusivity=None, **kwargs):
+def infer_DD(cells, localization_error=None, jeffreys_prior=False, min_diffusivity=None,
+        diagnostics=False, **kwargs):
+    """
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
+    """
     if isinstance(cells, Distributed): # multiple cells
         localization_error = cells.get_localization_error(kwargs, 0.03, True, \
                 localization_error=localization_error)
         args = (localization_error, jeffreys_prior, min_diffusivity)
+        counter = ObjectiveCounter() if diagnostics else None
         index, inferred = [], []
         for i in cells:
             cell = cells[i]
             index.append(i)
-            inferred.append(infer_DD(cell, *args, **kwargs))
+            inferred.append(infer_DD(cell, *args, diagnostics=counter, **kwargs))
         any_cell = cell
         inferred = pd.DataFrame(np.stack(inferred, axis=0), \
             index=index, \
             columns=[ 'diffusivity' ] + \
                 [ 'drift ' + col for col in any_cell.space_cols ])
+        if diagnostics:
+            return inferred, {'diagnostics': counter.diagnostics()}
         return inferred
     else: # single cell
         cell = cells
@@ -89,7 +98,10 @@ def infer_DD(cells, localization_error=None, jeffreys_prior=False, min_diffusivi
                 min_diffusivity = (1e-16 - noise_dt) / np.max(cell.dt)
             kwargs['bounds'] = [(min_diffusivity, None)] + [(None, None)] * cell.dim
         #cell.cache = None # no cache needed
-        result = minimize(dd_neg_posterior, dd.combined, \
+        fun = dd_neg_posterior
+        if diagnostics:
+            fun = diagnostics.wrap(fun, kwargs)
+        result = minimize(fun, dd.combined, \
             args=(dd, cell, localization_error, jeffreys_prior, dt_mean, min_diffusivity), \
             **kwargs)
         #dd.update(result.x)
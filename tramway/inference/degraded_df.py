@@ -14,6 +14,7 @@
 
 from tramway.core import ChainArray
 from .base import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -29,7 +30,8 @@ setup = {'name':    'degraded.df',
         ('jeffreys_prior',      ('-j', dict(action='store_true', help="Jeffreys' prior"))),
         ('min_diffusivity',     dict(type=float, help='minimum diffusivity value allowed')),
         ('debug',       dict(action='store_true')))),
-        'cell_sampling':    'individual'}
+        'cell_sampling':    'individual',
+        'supports_diagnostics': True}
 
 
 def df_neg_posterior(x, df, cell, sigma2, jeffreys_prior, dt_mean, min_diffusivity):
@@ -75,11 +77,15 @@ def df_neg_posterior(x, df, cell, sigma2, jeffreys_prior, dt_mean, min_diffusivi
 
 
 def infer_DF(cells, localization_error=None, jeffreys_prior=False, min_diffusivity=None, debug=False, \
-        **kwargs):
+        diagnostics=False, **kwargs):
+    """
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
+    """
     if isinstance(cells, Distributed): # multiple cells
         localization_error = cells.get_localization_error(kwargs, 0.03, True, \
                 localization_error=localization_error)
         args = (localization_error, jeffreys_prior, min_diffusivity)
+        counter = ObjectiveCounter() if diagnostics else None
         index, inferred = [], []
         for i in cells:
             cell = cells[i]
@@ -96,7 +102,7 @@ def infer_DF(cells, localization_error=None, jeffreys_prior=False, min_diffusivi
                 cell.dr[cell.dt < 0] *= -1.
                 cell.dt[cell.dt < 0] *= -1.
             index.append(i)
-            inferred.append(infer_DF(cell, *args, **kwargs))
+            inferred.append(infer_DF(cell, *args, diagnostics=counter, **kwargs))
         inferred = np.stack(inferred, axis=0)
         #D = inferred[:,0]
         #gradD = []
@@ -113,6 +119,8 @@ def infer_DF(cells, localization_error=None, jeffreys_prior=False, min_diffusivi
             xy = np.vstack([ cells[i].center for i in index ])
             inferred = inferred.join(pd.DataFrame(xy, index=index, \
                 columns=cells.space_cols))
+        if diagnostics:
+            return inferred, {'diagnostics': counter.diagnostics()}
         return inferred
     else: # single cell
         cell = cells
@@ -126,7 +134,10 @@ def infer_DF(cells, localization_error=None, jeffreys_prior=False, min_diffusivi
                 min_diffusivity = (1e-16 - noise_dt) / np.max(cell.dt)
             kwargs['bounds'] = [(min_diffusivity, None)] + [(None, None)] * cell.dim
         #cell.cache = None # no cache needed
-        result = minimize(df_neg_posterior, df.combined, \
+        fun = df_neg_posterior
+        if diagnostics:
+            fun = diagnostics.wrap(fun, kwargs)
+        result = minimize(fun, df.combined, \
             args=(df, cell, localization_error, jeffreys_prior, dt_mean, min_diffusivity), \
             **kwargs)
         #df.update(result.x)
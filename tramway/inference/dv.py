@@ -15,6 +15,7 @@
 from tramway.core import ChainArray
 from .base import *
 from .gradient import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -36,7 +37,10 @@ setup = {'arguments': OrderedDict((
         ('rgrad',       dict(help="alternative gradient for the regularization; can be 'delta0' or 'delta1'")),
         ('export_centers',      dict(action='store_true')),
         ('verbose',         ()))),
-    'cell_sampling': 'connected'}
+    'cell_sampling': 'connected',
+    'supports_warm_start': True,
+    'supports_diagnostics': True}
+setup_with_jac_argument(setup)
 setup_with_grad_arguments(setup)
 
 
@@ -278,17 +282,118 @@ def dv_neg_posterior1(x, dv, cells, sigma2, jeffreys_prior, dt_mean, \
     return result - y0
 
 
+def dv_neg_posterior_and_jac(x, dv, translocations, sigma2, jeffreys_prior, dt_mean, \
+        grad_operators, prior_operators, weights, y0, verbose, posteriors):
+    """
+    Similar to :func:`dv_neg_posterior` and :func:`dv_neg_posterior1`, evaluated
+    on all the cells at once from the packed translocations
+    (see :class:`~tramway.inference.base.PackedTranslocations`), with
+    the spatial gradient of the potential energy and the smoothing priors expressed
+    with the compiled spatial operators
+    (see :meth:`~tramway.inference.base.Distributed.gradient_operator`).
+
+    `prior_operators` can be `grad_operators`.
+
+    Returns:
+
+        tuple: negative log posterior (minus `y0`) and its gradient with respect to `x`.
+
+    """
+    if verbose:
+        t = time.time()
+
+    # extract `D` and `V`
+    dv.update(x)
+    D = dv.D
+    V = dv.V
+    #
+
+    if dv.minimum_diffusivity is not None:
+        observed_min = np.min(D)
+        if observed_min < dv.minimum_diffusivity and not \
+                np.isclose(observed_min, dv.minimum_diffusivity):
+            warn(DiffusivityWarning(observed_min, dv.minimum_diffusivity))
+    noise_dt = sigma2
+
+    # spatial gradient of the local potential energy
+    gradV = np.stack([ G.dot(V) for G in grad_operators ], axis=1)
+    # cells with no gradient are skipped
+    included = np.zeros(D.size, dtype=bool)
+    for G in grad_operators:
+        included |= 0 < np.diff(G.indptr)
+
+    # various posterior terms, for all the translocations
+    dt = translocations.dt
+    D_dt = translocations.expand(D) * dt
+    denominator = 4. * (D_dt + noise_dt)
+    dr_minus_drift = translocations.dr + D_dt[:,np.newaxis] * translocations.expand(gradV)
+    # non-directional squared displacement
+    ndsd = np.sum(dr_minus_drift * dr_minus_drift, axis=1)
+    res = translocations.count * log(pi) + \
+            translocations.sum(np.log(denominator) + ndsd / denominator)
+    # cells with undefined posterior are skipped as well
+    included &= ~np.isnan(res)
+    raw_posterior = np.sum(res[included])
+
+    # derivatives
+    residual = dr_minus_drift / denominator[:,np.newaxis]
+    _included = translocations.expand(included)
+    dD = translocations.sum(np.where(_included, dt * (4. * (1. - ndsd / denominator) / denominator \
+            + 2. * np.sum(residual * translocations.expand(gradV), axis=1)), 0.))
+    dgradV = 2. * translocations.sum(np.where(_included[:,np.newaxis], D_dt[:,np.newaxis] * residual, 0.))
+    if not np.all(included):
+        # drop the rows of the skipped cells, that may exhibit nan coefficients
+        grad_operators = [ G[included] for G in grad_operators ]
+        prior_operators = [ G[included] for G in prior_operators ]
+        dgradV, weights = dgradV[included], weights[included]
+    dV = np.zeros_like(V)
+    for j, G in enumerate(grad_operators):
+        dV += G.T.dot(dgradV[:,j])
+
+    # priors
+    priors = 0.
+    # prior coefficients times the local weights
+    D_weights, V_weights = np.zeros_like(weights), np.zeros_like(weights)
+    for j, i in enumerate(np.flatnonzero(included)):
+        potential_prior = dv.potential_prior(i)
+        if potential_prior:
+            V_weights[j] = potential_prior * weights[j]
+        diffusivity_prior = dv.diffusivity_prior(i)
+        if diffusivity_prior:
+            D_weights[j] = diffusivity_prior * weights[j]
+    priors += smoothing_prior(V, prior_operators, V_weights, dV)
+    priors += smoothing_prior(D, prior_operators, D_weights, dD)
+    if jeffreys_prior:
+        priors += 2. * np.sum(np.log(D * dt_mean + sigma2) - np.log(D))
+        dD += 2. * (dt_mean / (D * dt_mean + sigma2) - 1. / D)
+
+    result = raw_posterior + priors
+    if posteriors is not None:
+        posteriors.append([raw_posterior, result])
+
+    if verbose:
+        print('objective: {}\t time: {}ms'.format(result, int(round((time.time() - t) * 1e3))))
+
+    return result - y0, ChainArray('D', dD, 'V', dV).combined
+
+
 def inferDV(cells, diffusivity_prior=None, potential_prior=None, \
     jeffreys_prior=False, min_diffusivity=None, max_iter=None, epsilon=None, \
     export_centers=False, verbose=True, compatibility=False, \
-    D0=None, V0=None, rgrad=None, **kwargs):
+    D0=None, V0=None, rgrad=None, jac='analytic', warm_start=None, diagnostics=False,
+    **kwargs):
+    """
+    Argument `jac` is described in :func:`~tramway.inference.gradient.setup_with_jac_argument`.
+
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
+    """
 
     localization_error = cells.get_localization_error(kwargs, 0.03, True)
 
     # initial values
     index, reverse_index, n, dt_mean, D_initial, min_diffusivity, D_bounds, border = \
         smooth_infer_init(cells, min_diffusivity=min_diffusivity, jeffreys_prior=jeffreys_prior,
-        sigma2=localization_error)
+        sigma2=localization_error, warm_start=warm_start)
     # V initial values
     if V0 is None:
         try:
@@ -301,6 +406,7 @@ def inferDV(cells, diffusivity_prior=None, potential_prior=None, \
             density = n / np.array([ np.inf if v is None else v for v in volume ])
             density[density == 0] = np.min(density[0 < density])
             V_initial = np.log(np.max(density)) - np.log(density)
+        V_initial = warm_start_values(cells, index, warm_start, 'potential', V_initial)
     else:
         if np.isscalar(V0):
             V_initial = np.full(D_initial.size, V0)
@@ -349,23 +455,43 @@ def inferDV(cells, diffusivity_prior=None, potential_prior=None, \
     # posterior function
     if rgrad in ('delta','delta0','delta1'):
         fun = dv_neg_posterior1
+        operator = 'local_variation'
     else:
         if rgrad not in (None, 'grad', 'grad1', 'gradn'):
             warn('unsupported rgrad: {}'.format(rgrad), RuntimeWarning)
         fun = dv_neg_posterior
+        operator = 'grad'
 
     # posterior function input arguments
-    args = (dv, cells, localization_error, jeffreys_prior, dt_mean,
-            index, reverse_index, grad_kwargs)
+    if jac in ('analytic', True):
+        grad_operators = cells.gradient_operator(index, reverse_index, **grad_kwargs)
+        if operator == 'grad':
+            prior_operators = grad_operators
+        else:
+            prior_operators = cells.gradient_operator(index, reverse_index, operator, **grad_kwargs)
+        weights = local_operator_weights(cells, index, reverse_index)
+        fun, _kwargs['jac'] = dv_neg_posterior_and_jac, True
+        args = (dv, cells.pack(index), localization_error, jeffreys_prior, dt_mean,
+                grad_operators, prior_operators, weights)
+    else:
+        if jac is not None:
+            _kwargs['jac'] = jac
+        args = (dv, cells, localization_error, jeffreys_prior, dt_mean,
+                index, reverse_index, grad_kwargs)
 
     # get the initial posterior value so that it is subtracted from the further evaluations
     y0 = fun(dv.combined, *(args + (0., False, [])))
+    if _kwargs.get('jac', None) is True:
+        y0, _ = y0
     if verbose:
         print('At X0\tactual posterior= {}\n'.format(y0))
     #y0 = 0.
     args = args + (y0, 1 < int(verbose), posteriors)
 
     # run the optimization routine
+    if diagnostics:
+        counter = ObjectiveCounter()
+        fun = counter.wrap(fun, _kwargs)
     result = minimize(fun, dv.combined, args=args, bounds=bounds, **_kwargs)
     if not (result.success or verbose):
         warn('{}'.format(result.message), OptimizationWarning)
@@ -406,5 +532,7 @@ def inferDV(cells, diffusivity_prior=None, potential_prior=None, \
     # format the posteriors
     posteriors = pd.DataFrame(np.array(posteriors), columns=['fit', 'total'])
 
+    if diagnostics:
+        return DVF, posteriors, {'diagnostics': counter.diagnostics()}
     return DVF, posteriors
 
@@ -15,6 +15,7 @@
 import math
 import numpy as np
 import pandas as pd
+import scipy.sparse as sparse
 from numpy.polynomial import polynomial as poly
 from collections import OrderedDict
 
@@ -729,6 +730,187 @@ def _vander(x, y):
     return b + 2. * a * x[0]
 
 
+def local_linear_operators(cells, operator, index, reverse_index, neighbours='neighbours', **kwargs):
+    """
+    Coefficients of a local linear operator at every cell.
+
+    Operators such as :func:`grad1`, :func:`gradn`, :func:`delta0` or :func:`delta1` are linear
+    in the measurement vector and depend only on the values at cell *i* and its neighbours.
+    Each operator is evaluated once per such value with a unit vector as measurement, so that
+    the local operator can later be applied as ``C.dot(X[k])`` and its adjoint as ``C.T.dot(Y)``.
+
+    The cell caches claimed by `operator` are filled with `reverse_index` as index map,
+    in the same way as the posterior functions do.
+
+    Arguments:
+
+        cells (tramway.inference.base.Distributed):
+            distributed cells.
+
+        operator (str):
+            name of the :class:`~tramway.inference.base.Distributed` method,
+            e.g. *'grad'* or *'local_variation'*.
+
+        index (sequence):
+            cell indices.
+
+        reverse_index (numpy.ndarray):
+            index map that converts cell indices to indices in the measurement vectors.
+
+        neighbours (str):
+            name of the :class:`~tramway.inference.base.Distributed` method that
+            lists the cells the operator may involve, e.g. *'time_neighbours'* for
+            :meth:`~tramway.inference.time.DynamicCells.time_derivative`.
+
+    Returns:
+
+        list:
+            for each cell in `index`, either ``None`` if the operator is not defined at
+            this cell, or a pair (*k*, *C*) with *k* the indices in the measurement
+            vector and *C* the coefficient matrix with as many rows as elements in the
+            (flattened) output of the operator and as many columns as elements in *k*.
+
+    """
+    operator = getattr(cells, operator)
+    neighbours = getattr(cells, neighbours)
+    probe = np.zeros(len(index), dtype=float)
+    operators = []
+    for i in index:
+        if operator(i, probe, reverse_index, **kwargs) is None:
+            operators.append(None)
+            continue
+        k = reverse_index[np.r_[i, neighbours(i)]]
+        k = k[0 <= k]
+        C = []
+        for _k in k:
+            probe[_k] = 1.
+            C.append(np.ravel(operator(i, probe, reverse_index, **kwargs)))
+            probe[_k] = 0.
+        operators.append((k, np.stack(C, axis=1)))
+    return operators
+
+
+def local_operator_weights(cells, index, reverse_index=None):
+    """
+    Weights applied by :meth:`~tramway.inference.base.Distributed.grad_sum` at every cell.
+
+    :meth:`~tramway.inference.base.Distributed.grad_sum` is supposed to be linear in its
+    `grad` argument.
+    `reverse_index` is passed as index map, as for :func:`local_linear_operators`.
+
+    Returns:
+
+        numpy.ndarray: weight for each cell in `index`.
+
+    """
+    one = np.ones(1)
+    return np.array([ cells.grad_sum(i, one, reverse_index) for i in index ], dtype=float)
+
+
+def sparse_linear_operators(operators, size=None):
+    """
+    Compile local linear operators into sparse matrices.
+
+    The *r*-th matrix maps the measurement vector onto the *r*-th element of the
+    (flattened) output of the local operator at every cell, so that for example
+    the *j*-th component of the gradient at all the cells is ``G[j].dot(X)``.
+
+    The rows of the cells at which the operator is not defined are empty,
+    while the other rows at least store the diagonal element, even if null.
+
+    Arguments:
+
+        operators (list):
+            output of :func:`local_linear_operators`.
+
+        size (int):
+            number of elements in the measurement vector; default is ``len(operators)``.
+
+    Returns:
+
+        list:
+            :class:`scipy.sparse.csr_matrix` operators, as many as elements in the
+            largest output of the local operator.
+
+    """
+    m = len(operators)
+    if size is None:
+        size = m
+    rows, cols, comps, data = [], [], [], []
+    for j, op in enumerate(operators):
+        if op is None:
+            continue
+        k, C = op
+        r, c = np.nonzero((C != 0) | (k == j)[np.newaxis,:])
+        rows.append(np.full(r.size, j))
+        cols.append(k[c])
+        comps.append(r)
+        data.append(C[r, c])
+    if not rows:
+        return []
+    rows, cols, comps, data = [ np.concatenate(a) for a in (rows, cols, comps, data) ]
+    matrices = []
+    for r in range(np.max(comps) + 1):
+        ok = comps == r
+        matrices.append(sparse.csr_matrix((data[ok], (rows[ok], cols[ok])), shape=(m, size)))
+    return matrices
+
+
+def smoothing_prior(X, operators, weights, out=None):
+    r"""
+    Quadratic penalty on a linear operator and its gradient with respect to `X`.
+
+    .. math::
+
+        \sum_i w_i \sum_r (G_r X)_i^2
+
+    Arguments:
+
+        X (numpy.ndarray):
+            vector of a scalar measurement at every cell.
+
+        operators (list):
+            output of :func:`sparse_linear_operators`
+            (or :meth:`~tramway.inference.base.Distributed.gradient_operator`).
+
+        weights (numpy.ndarray):
+            output of :func:`local_operator_weights`, multiplied by the prior
+            coefficient; null elements skip the corresponding cells.
+
+        out (numpy.ndarray):
+            if defined, the gradient of the penalty is added to `out`.
+
+    Returns:
+
+        float: penalty.
+
+    """
+    result = 0.
+    for G in operators:
+        y = G.dot(X)
+        wy = weights * y
+        result += np.dot(wy, y)
+        if out is not None:
+            out += 2. * G.T.dot(wy)
+    return result
+
+
+def setup_with_jac_argument(setup):
+    """Add the `jac` argument to inference plugin setup.
+
+    Argument `jac` selects the calculation of the gradient of the posterior;
+    ``'analytic'`` (default) or ``True`` for the exact gradient,
+    or any finite-difference scheme supported by :func:`scipy.optimize.minimize`
+    (``None`` for the default scheme) for the original, slower implementation.
+
+    Input argument `setup` is modified inplace.
+    """
+    args = setup.get('arguments', OrderedDict())
+    if 'jac' not in args:
+        args['jac'] = dict(help="posterior gradient; either 'analytic' (default) or a finite-difference scheme such as '2-point'")
+    setup['arguments'] = args
+
+
 def setup_with_grad_arguments(setup):
     """Add :meth:`~tramway.inference.base.Distributed.grad` related arguments to inference plugin setup.
 
@@ -802,5 +984,8 @@ setup_with_grad_arguments(setup)
 
 
 __all__ = ['default_selection_angle', 'get_grad_kwargs', 'neighbours_per_axis', 'grad1', 'gradn',
-        'delta0', 'delta0_without_scaling', 'delta1', 'setup_with_grad_arguments', 'setup', 'gradient_map']
+        'delta0', 'delta0_without_scaling', 'delta1', 'local_linear_operators',
+        'local_operator_weights', 'sparse_linear_operators', 'smoothing_prior',
+        'setup_with_jac_argument', 'setup_with_grad_arguments', 'setup',
+        'gradient_map']
 
@@ -17,11 +17,13 @@ import time
 import scipy.sparse as sparse
 from collections import namedtuple, defaultdict, deque
 import traceback
+import os
 from tramway.core import parallel
 import logging
 
 
-BFGSResult = namedtuple('BFGSResult', ('x', 'H', 'resolution', 'niter', 'f', 'df', 'projg', 'cumtime', 'err', 'diagnosis', 'ncalls'))
+BFGSResult = namedtuple('BFGSResult', ('x', 'H', 'resolution', 'niter', 'f', 'df', 'projg', 'cumtime', 'err', 'diagnosis', 'ncalls', 'evaltime'))
+BFGSResult.__new__.__defaults__ = (None,)
 
 
 def wolfe_line_search(f, x, p, g, subspace=None, args_f=(), args_g=None, args=None, f0=None, g0=None,
@@ -314,6 +316,24 @@ class _defaultdict(object):
         return len(self._dict)
     def __iter__(self):
         return iter(self._dict)
+    def __contains__(self, i):
+        return i in self._dict
+
+
+class _ShuffledComponents(object):
+    """
+    Draws the components in a random order, each component exactly once per epoch.
+
+    The current order is exposed as attribute `components` so that it can be checkpointed.
+    """
+    __slots__ = ('components',)
+    def __init__(self, m):
+        self.components = np.arange(m)
+    def __call__(self, k):
+        _i = k % self.components.size
+        if _i == 0:
+            np.random.shuffle(self.components)
+        return self.components[_i]
 
 
 class SparseFunction(parallel.Workspace):
@@ -347,6 +367,8 @@ class SparseFunction(parallel.Workspace):
 
         ncalls (int): number of calls to `fun`.
 
+        evaltime (float): time spent in `fun`, in seconds; ``None`` if not measured.
+
     See also :func:`minimize_sparse_bfgs`.
     """
     def __init__(self, x, covariate, gradient_subspace, descent_subspace,
@@ -363,6 +385,7 @@ class SparseFunction(parallel.Workspace):
         self.bounds = bounds
         self.h0 = h0
         self.ncalls = 0
+        self.evaltime = None
 
     @property
     def x(self):
@@ -374,7 +397,13 @@ class SparseFunction(parallel.Workspace):
         #self.x[component.descent_subspace] = component.x
     def fun(self, *args, **kwargs):
         self.ncalls += 1
-        return self._fun(*args, **kwargs)
+        if self.evaltime is None:
+            return self._fun(*args, **kwargs)
+        t0 = time.time()
+        try:
+            return self._fun(*args, **kwargs)
+        finally:
+            self.evaltime += time.time() - t0
 
 def extend_global(__global__, independent_components, memory, newton, gradient_covariate):
     """ Add attributes to the workspace.
@@ -856,6 +885,60 @@ class Component(LocalSubspaceProxy, parallel.UpdateVehicle):
             _x[self.gradient_subspace] = __x
         else:
             raise self._size_error
+    @property
+    def state_size(self):
+        """
+        `int`: Size of the state buffer, with 4 flags that tell whether `x`, `f`, `g` and `H`
+        are defined, `f`, `x`, `g` and `H` in the gradient subspace;
+        ``None`` if `H` is a view onto the global inverse Hessian.
+        """
+        inverse_hessian_block = self.__global__.inverse_hessian_block
+        d = self.gradient_subspace_size
+        if inverse_hessian_block is GradientDescent:
+            h = 0
+        elif inverse_hessian_block is IndependentInverseHessianBlock:
+            h = d * d
+        elif inverse_hessian_block is LimitedMemoryInverseHessianBlock:
+            # number of pairs, and then (s, y, rho, gamma) pairs
+            h = 1 + self.__global__.memory * (self.descent_subspace_size + d + 2)
+        else:
+            return None
+        return 5 + 2 * d + h
+    def dump_state(self, state):
+        d = self.gradient_subspace_size
+        defined, f, x, g, H = state[:4], state[4:5], state[5:5+d], state[5+d:5+2*d], state[5+2*d:]
+        defined[...] = [ a is not None for a in (self._x, self._f, self._g, self._H) ]
+        if self._f is not None:
+            f[0] = self._f
+        if self._x is not None:
+            x[...] = self._x
+        if self._g is not None:
+            g[...] = self._g
+        if isinstance(self._H, LimitedMemoryInverseHessianBlock):
+            H[0] = len(self._H.block)
+            pairs = H[1:].reshape((self.__global__.memory, -1))
+            for pair, u in zip(pairs, self._H.block):
+                pair[...] = np.r_[u.s, u.y, u.rho, u.gamma]
+        elif isinstance(self._H, IndependentInverseHessianBlock):
+            H[...] = np.ravel(self._H.block)
+    def load_state(self, state):
+        d = self.gradient_subspace_size
+        defined, f, x, g, H = state[:4], state[4:5], state[5:5+d], state[5+d:5+2*d], state[5+2*d:]
+        has_x, has_f, has_g, has_H = defined.astype(bool)
+        self._x = np.array(x) if has_x else None
+        self._f = float(f[0]) if has_f else None
+        self._g = np.array(g) if has_g else None
+        if not has_H:
+            self._H = None
+            return
+        self._H = self.__global__.inverse_hessian_block(self)
+        if isinstance(self._H, LimitedMemoryInverseHessianBlock):
+            pairs = H[1:].reshape((self.__global__.memory, -1))[:int(H[0])]
+            s = self.descent_subspace_size
+            self._H.block = deque([ Pair(np.array(u[:s]), np.array(u[s:-2]), u[-2], u[-1])
+                for u in pairs ], self._H.block.maxlen)
+        elif isinstance(self._H, IndependentInverseHessianBlock):
+            self._H.block = np.array(H).reshape((d, d))
 
 parallel.abc.VehicleJobStep.register(Component)
 
@@ -872,16 +955,7 @@ def _fun_args(fun, x0, component, covariate, gradient_subspace, descent_subspace
             if component == 0:
                 component = lambda k: 0
             elif 0 < component:
-                m = component
-                def mk_component(m):
-                    components = np.arange(m)
-                    def _component(k):
-                        _i = k % m
-                        if _i == 0:
-                            np.random.shuffle(components)
-                        return components[_i]
-                    return _component
-                component = mk_component(m)
+                component = _ShuffledComponents(component)
             else:
                 raise ValueError('wrong number of components')
         else:
@@ -969,7 +1043,8 @@ def minimize_sparse_bfgs1(fun, x0, component, covariate, gradient_subspace, desc
         ls_armijo_max=None, ls_wolfe=None, ls_failure_rate=.9, fix_ls=None, fix_ls_trigger=5,
         gradient_initial_step=1e-8, Component=Component,
         independent_components=False, newton=True, verbose=False, diagnosis=None,
-        returns=(), max_runtime=None, update_timeout=None, **kwargs):
+        returns=(), max_runtime=None, update_timeout=None,
+        checkpoint=None, checkpoint_interval=100, resume_from=None, **kwargs):
     r"""
     Let the objective function :math:`f(x) = \sum_{i \in C} f_{i}(x) \forall x \in \Theta`
     be a linear function of sparse components :math:`f_{i}` such that
@@ -1095,13 +1170,25 @@ def minimize_sparse_bfgs1(fun, x0, component, covariate, gradient_subspace, desc
         diagnosis (callable): function of the iteration number and the current and candidate-new
             components.
 
-        returns (sequence of str): any subset of {'f', 'df', 'projg', 'err', 'ncalls', 'diagnosis'}
+        returns (sequence of str): any subset of {'f', 'df', 'projg', 'err', 'ncalls', 'evaltime', 'diagnosis'}
             or 'all'.
 
         xref (numpy.ndarray): reference final parameter vector; if defined, at each iteration,
             the L2-norm of the difference between this and the current parameter vector is evaluated
             and returned as attribute `err`; note that this computation may add quite some overhead.
 
+        checkpoint (str): path to a *.npz* file the state of the optimizer is periodically
+            written to, and on termination unless the optimization was interrupted;
+            see also :meth:`SBFGSScheduler.save_checkpoint`.
+
+        checkpoint_interval (int): number of iterations between consecutive checkpoints.
+
+        resume_from (str): path to a checkpoint file to resume the optimization from;
+            `x0` is overwritten by the checkpointed parameter vector, and `max_iter`
+            still refers to the total number of iterations;
+            with ``worker_count=0``, the resumed optimization follows the same path as
+            an uninterrupted optimization, provided that the same arguments are passed.
+
     Returns:
 
         BFGSResult: final parameter vector.
@@ -1121,9 +1208,14 @@ def minimize_sparse_bfgs1(fun, x0, component, covariate, gradient_subspace, desc
             _fun_args(fun, x0, component, covariate, gradient_subspace, descent_subspace,
                     args, bounds, _sum, gradient_sum, gradient_covariate)
 
+    if returns == 'all':
+        returns = {'f', 'df', 'projg', 'err', 'ncalls', 'evaltime', 'diagnosis'}
+
     # component
     __global__ = SparseFunction(x0, covariate, gradient_subspace, descent_subspace,
             eps, fun, _sum, args, regul, bounds, gradient_initial_step)
+    if 'evaltime' in returns:
+        __global__.evaltime = 0.
     extend_global(__global__, independent_components, memory, newton, gradient_covariate)
     C = _defaultdict(Component, __global__)
 
@@ -1134,10 +1226,13 @@ def minimize_sparse_bfgs1(fun, x0, component, covariate, gradient_subspace, desc
             ls_regul=ls_regul, ls_step_max=ls_step_max, ls_step_max_decay=ls_step_max_decay,
             ls_failure_rate=ls_failure_rate, fix_ls=fix_ls, fix_ls_trigger=fix_ls_trigger,
             verbose=verbose, logger=logger, diagnosis=diagnosis,
-            returns={'f', 'df', 'projg', 'err', 'ncalls', 'diagnosis'} if returns == 'all' else returns,
+            returns=returns,
             max_runtime=max_runtime, update_timeout=update_timeout,
+            checkpoint=checkpoint, checkpoint_interval=checkpoint_interval,
             **kwargs)
     sched.logger = logger
+    if resume_from:
+        sched.load_checkpoint(resume_from)
 
     if verbose:
         compact_logs = False
@@ -1159,10 +1254,13 @@ def minimize_sparse_bfgs1(fun, x0, component, covariate, gradient_subspace, desc
             resolution = 'MAXIMUM ITERATION REACHED'
         else:
             resolution = 'INTERRUPTED'
+    if checkpoint and resolution != 'INTERRUPTED':
+        sched.save_checkpoint(checkpoint)
 
     x = __global__.x
     k = sched.k_eff
     ncalls = sched.ncalls
+    evaltime = sched.evaltime
     f_history  = sched.f_history
     df_history = sched.df_history
     dg_history = sched.dg_history
@@ -1192,7 +1290,8 @@ def minimize_sparse_bfgs1(fun, x0, component, covariate, gradient_subspace, desc
             cumt if verbose else None,
             err_history if err_history else None,
             diagnoses  if diagnoses  else None,
-            ncalls     if ncalls     else None)
+            ncalls     if ncalls     else None,
+            evaltime   if evaltime   else None)
 
 
 class SBFGSScheduler(parallel.Scheduler):
@@ -1200,7 +1299,8 @@ class SBFGSScheduler(parallel.Scheduler):
             name=None, args=(), kwargs={}, daemon=None,
             max_iter=None, ftol=None, gtol=None, low_df_rate=None, low_dg_rate=None,
             ls_failure_rate=None, fix_ls=None, fix_ls_trigger=None, returns={},
-            max_runtime=None, update_timeout=None, **_kwargs):
+            max_runtime=None, update_timeout=None, checkpoint=None, checkpoint_interval=None,
+            **_kwargs):
         __global__.gtol = gtol
         parallel.Scheduler.__init__(self, __global__, C, worker_count=worker_count, iter_max=max_iter,
                 name=name, args=args, kwargs=kwargs, daemon=daemon, max_runtime=max_runtime,
@@ -1216,17 +1316,29 @@ class SBFGSScheduler(parallel.Scheduler):
         self.fix_ls_trigger = fix_ls_trigger
         self.recurrent_ls_failure_count = {}
         self.ncalls = [] if 'ncalls' in returns else None
+        self.evaltime = [] if 'evaltime' in returns else None
         self.f_history = [] if 'f' in returns else None
         self.df_history = [] if 'df' in returns else None
         self.dg_history = [] if 'projg' in returns else None
         self.err_history = [] if 'err' in returns else None
         self.diagnoses = [] if 'diagnosis' in returns else None
         self.paused = dict()
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.last_checkpoint = 0
 
     @property
     def worker(self):
         return SBFGSWorker
 
+    def shared_steps(self):
+        if isinstance(self.component, _ShuffledComponents):
+            # the components that are not instanciated yet are not added to `task`,
+            # whose length marks the first epoch
+            return [ self.task[i] if i in self.task else self.task.__make__(i)
+                    for i in self.component.components ]
+        return parallel.Scheduler.shared_steps(self)
+
     def pause(self, i, t):
         self.paused[i] = t
         return len(self.paused) < len(self.task)
@@ -1287,6 +1399,8 @@ class SBFGSScheduler(parallel.Scheduler):
                     if ncalls:
                         if self.ncalls is not None:
                             self.ncalls.append(ncalls)
+                        if self.evaltime is not None:
+                            self.evaltime.append(status.get('evaltime', 0.))
                         if self.err_history is not None:
                             err = status.get('err', None)
                             if err is None:
@@ -1304,6 +1418,8 @@ class SBFGSScheduler(parallel.Scheduler):
         else:
             if self.ncalls is not None:
                 self.ncalls.append(ncalls)
+            if self.evaltime is not None:
+                self.evaltime.append(status.get('evaltime', 0.))
             if self.f_history is not None:
                 self.f_history.append(f)
             if self.df_history is not None:
@@ -1356,8 +1472,109 @@ class SBFGSScheduler(parallel.Scheduler):
             self.ls_failure_count = 0
             self.low_df_count = self.low_dg_count = len(self.paused)
 
+        if self.checkpoint and \
+                (self.checkpoint_interval or 1) <= self.k_eff - self.last_checkpoint:
+            self.save_checkpoint(self.checkpoint)
+
         return parallel.Scheduler.stop(self, k, i, status)
 
+    def save_checkpoint(self, filename):
+        """
+        Write the state of the optimizer into a *.npz* file.
+
+        The state includes the parameter vector, the local parameters and inverse Hessian
+        approximations (or memory pairs) of the components, the iteration counters,
+        the convergence histories but the diagnoses, the state of :mod:`numpy.random`
+        and the current order of the components if these are drawn
+        by :func:`minimize_sparse_bfgs`.
+
+        The file is first written under a temporary name and then renamed,
+        so that the previous checkpoint is kept if the process is killed meanwhile.
+        """
+        __global__ = self.workspace
+        state = dict(x=__global__.x, k=self.k_eff,
+                counts=np.array([self.ls_failure_count, self.low_df_count, self.low_dg_count]),
+                paused=np.array(list(self.paused.items()), dtype=int).reshape((-1, 2)))
+        _, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+        state['rng_keys'] = keys
+        state['rng_state'] = np.array([pos, has_gauss, cached_gaussian])
+        if isinstance(self.component, _ShuffledComponents):
+            state['components'] = self.component.components
+        for attr in ('ncalls', 'evaltime', 'f_history', 'df_history', 'dg_history', 'err_history'):
+            history = getattr(self, attr)
+            if history is not None:
+                state[attr] = np.array(history, dtype=float)
+        H = getattr(__global__, 'H', None)
+        if H is not None:
+            H = sparse.coo_matrix(H)
+            state['H_row'], state['H_col'], state['H_data'] = H.row, H.col, H.data
+        component_ids = list(self.task)
+        state['component_ids'] = np.array(component_ids, dtype=int)
+        for i in component_ids:
+            c = self.task[i]
+            if c._x is not None:
+                state['x_{:d}'.format(i)] = c._x
+            H = c._H
+            if isinstance(H, LimitedMemoryInverseHessianBlock):
+                if H.block:
+                    for attr in Pair._fields:
+                        state['{}_{:d}'.format(attr, i)] = np.array([ getattr(u, attr) for u in H.block ])
+            elif isinstance(H, IndependentInverseHessianBlock):
+                state['H_{:d}'.format(i)] = H.block
+            elif isinstance(H, InverseHessianBlockView):
+                state['fresh_{:d}'.format(i)] = H.fresh
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp_filename, filename)
+        self.last_checkpoint = self.k_eff
+
+    def load_checkpoint(self, filename):
+        """
+        Restore the state of the optimizer from a file written by :meth:`save_checkpoint`.
+        """
+        __global__ = self.workspace
+        with np.load(filename) as state:
+            x = __global__.x
+            if state['x'].shape != x.shape:
+                raise ValueError('the checkpoint does not match the parameter vector')
+            x[...] = state['x']
+            self.k_eff = self.last_checkpoint = int(state['k'])
+            self.ls_failure_count, self.low_df_count, self.low_dg_count = \
+                    [ int(count) for count in state['counts'] ]
+            self.paused = { int(i): int(t) for i, t in state['paused'] }
+            pos, has_gauss, cached_gaussian = state['rng_state']
+            np.random.set_state(('MT19937', state['rng_keys'],
+                int(pos), int(has_gauss), float(cached_gaussian)))
+            if 'components' in state and isinstance(self.component, _ShuffledComponents):
+                self.component.components[...] = state['components']
+            for attr in ('ncalls', 'evaltime', 'f_history', 'df_history', 'dg_history', 'err_history'):
+                if getattr(self, attr) is not None and attr in state:
+                    history = state[attr].tolist()
+                    if attr == 'ncalls':
+                        history = [ int(n) for n in history ]
+                    elif attr == 'dg_history':
+                        history = [ (int(i), proj) for i, proj in history ]
+                    setattr(self, attr, history)
+            if 'H_data' in state:
+                __global__.H = sparse.coo_matrix((state['H_data'], (state['H_row'], state['H_col'])),
+                        shape=__global__.H.shape).tolil()
+            for i in state['component_ids']:
+                i = int(i)
+                c = self.task[i]
+                key = 'x_{:d}'.format(i)
+                if key in state:
+                    c._x = state[key]
+                # the inverse Hessian blocks that are not found are lazily initialized
+                if 's_{:d}'.format(i) in state:
+                    H = c.H
+                    pairs = zip(*[ state['{}_{:d}'.format(attr, i)] for attr in Pair._fields ])
+                    H.block = deque([ Pair(*u) for u in pairs ], H.block.maxlen)
+                elif 'H_{:d}'.format(i) in state:
+                    c.H.block = state['H_{:d}'.format(i)]
+                elif 'fresh_{:d}'.format(i) in state:
+                    c.H.fresh = bool(state['fresh_{:d}'.format(i)])
+
 
 class SBFGSWorker(parallel.Worker):
     def target(self, newton=None, step_scale=None, regul_decay=None,
@@ -1394,6 +1611,8 @@ class SBFGSWorker(parallel.Worker):
                 i = c.i
                 info = dict()
                 __global__.ncalls = 0
+                if __global__.evaltime is not None:
+                    __global__.evaltime = 0.
                 try:
 
                     #assert x is __global__.x
@@ -1547,6 +1766,8 @@ class SBFGSWorker(parallel.Worker):
                 finally:
                     c.push(x)
                     info['ncalls'] = __global__.ncalls
+                    if __global__.evaltime is not None:
+                        info['evaltime'] = __global__.evaltime
                     if xref is not None:
                         err = x - xref
                         err = np.dot(err, err)
@@ -2061,7 +2282,176 @@ def sparse_grad(fun, x, active_i, active_j, args=(), _sum=np.sum, regul=None, bo
         module_logger.warning('sparse_grad failed at all the columns')
         return None, None
 
+def check_jac(fun, x, args=(), jac=True, h=1e-6, columns=None):
+    """
+    Compare the gradient of a function with centered finite differences.
+
+    Arguments:
+
+        fun (callable): objective function, takes `x` and `args`.
+
+        x (numpy.ndarray): point at which the gradient is evaluated.
+
+        args (tuple): extra positional arguments to `fun` (and `jac`).
+
+        jac (bool or callable): if ``True``, `fun` returns the objective value and
+            its gradient (as expected by :func:`scipy.optimize.minimize` with ``jac=True``);
+            otherwise, function that returns the gradient.
+
+        h (float): finite-difference step, relative to the magnitude of each element of `x`.
+
+        columns (sequence): indices in `x` at which the gradient is checked;
+            default is all the elements.
+
+    Returns:
+
+        tuple: (*error*, *g*, *g_fd*) with *error* the maximum absolute difference
+        relative to the maximum absolute value of *g_fd* over the checked elements,
+        and *g* and *g_fd* the checked elements of the gradient respectively as
+        returned by `fun` (or `jac`) and as estimated by finite differences.
+    """
+    x = np.array(x, dtype=float)
+    if jac is True:
+        f = lambda _x: fun(_x, *args)[0]
+        _, g = fun(np.array(x), *args)
+    else:
+        f = lambda _x: fun(_x, *args)
+        g = jac(np.array(x), *args)
+    if columns is None:
+        columns = range(x.size)
+    columns = np.asarray(columns)
+    g = np.asarray(g)[columns]
+    g_fd = np.empty(columns.size, dtype=float)
+    for k, j in enumerate(columns):
+        xj = x[j]
+        hj = h * max(1., abs(xj))
+        x[j] = xj + hj
+        f_a = f(np.array(x))
+        x[j] = xj - hj
+        f_b = f(np.array(x))
+        x[j] = xj
+        g_fd[k] = (f_a - f_b) / (2. * hj)
+    scale = np.max(np.abs(g_fd)) if g_fd.size else 0.
+    error = np.max(np.abs(g - g_fd)) / scale if 0 < scale else np.max(np.abs(g - g_fd), initial=0.)
+    return error, g, g_fd
+
+class ObjectiveCounter(object):
+    """
+    Instrumentation for the objective functions passed to :func:`scipy.optimize.minimize`.
+
+    :meth:`wrap` returns a wrapper for the objective function that counts the evaluations
+    and measures the time spent evaluating the function, and hooks a callback into the
+    keyword arguments to :func:`~scipy.optimize.minimize` that records the convergence trace.
+    The same counter can be passed to several successive optimizations, for example one per cell.
+
+    The inference modes whose setup has item *supports_diagnostics* set to ``True`` take
+    a boolean `diagnostics` argument.
+    If `diagnostics` is ``True``, they return an extra output argument, as a `dict` with item
+    *diagnostics* in the format of :meth:`diagnostics`.
+    The :func:`~tramway.helper.inference.infer` helper stores these diagnostics as attribute
+    `diagnostics` of the resulting :class:`~tramway.inference.base.Maps` object.
+
+    Attributes:
+
+        nruns (int): number of wrapped optimizations.
+
+        ncalls (int): number of calls to the objective function.
+
+        evaltime (float): time spent evaluating the objective function, in seconds.
+
+        trace (list): (*ncalls*, *evaltime*, *f*) triplets recorded at each iteration,
+            with *f* the last evaluated objective value.
+
+    See also :meth:`diagnostics`.
+    """
+    __slots__ = ('nruns', 'ncalls', 'evaltime', 'trace', '_f')
+
+    def __init__(self):
+        self.nruns = 0
+        self.ncalls = 0
+        self.evaltime = 0.
+        self.trace = []
+        self._f = None
+
+    def wrap(self, fun, kwargs):
+        """
+        Arguments:
+
+            fun (callable): objective function.
+
+            kwargs (dict): keyword arguments to :func:`~scipy.optimize.minimize`;
+                its *callback* item is set or chained.
+
+        Returns:
+
+            callable: instrumented objective function.
+        """
+        self.nruns += 1
+        callback = kwargs.get('callback', None)
+        def _callback(*args):
+            self.trace.append((self.ncalls, self.evaltime, self._f))
+            if callback is not None:
+                return callback(*args)
+        kwargs['callback'] = _callback
+        def _fun(x, *args):
+            t0 = time.time()
+            y = fun(x, *args)
+            self.evaltime += time.time() - t0
+            self.ncalls += 1
+            self._f = y[0] if isinstance(y, tuple) else y
+            return y
+        return _fun
+
+    def diagnostics(self):
+        """
+        Returns:
+
+            dict: diagnostics with keys *nruns*, *niter*, *ncalls* and *evaltime*,
+            and *trace* as an array with columns *ncalls*, *evaltime* and *f*.
+        """
+        trace = np.array(self.trace, dtype=float).reshape((-1, 3))
+        return dict(nruns=self.nruns, niter=len(self.trace), ncalls=self.ncalls,
+                evaltime=self.evaltime, trace=trace)
+
+
+def sparse_bfgs_diagnostics(result):
+    """
+    Diagnostics in the format of :meth:`ObjectiveCounter.diagnostics` from the output
+    of :func:`minimize_sparse_bfgs` with `returns` including *f*, *ncalls* and *evaltime*.
+
+    Each iteration of the trace refers to a single component update, and
+    *f* is the value of the local cost of the updated component.
+    """
+    f = np.asarray(result.f if result.f else [], dtype=float)
+    ncalls = np.cumsum(result.ncalls[:f.size]) if f.size else np.zeros(0)
+    evaltime = np.cumsum(result.evaltime[:f.size]) if f.size else np.zeros(0)
+    trace = np.stack((ncalls, evaltime, f), axis=1) if f.size else np.zeros((0, 3))
+    return dict(nruns=1, niter=result.niter,
+            ncalls=sum(result.ncalls) if result.ncalls else 0,
+            evaltime=sum(result.evaltime) if result.evaltime else 0.,
+            trace=trace)
+
+
+def merge_diagnostics(diagnostics):
+    """
+    Merge the diagnostics of independent optimizations, for example one per group of cells.
+
+    Counts and times are summed; the traces are concatenated with cumulative
+    *ncalls* and *evaltime* columns.
+    """
+    merged = dict(nruns=0, niter=0, ncalls=0, evaltime=0.)
+    traces = []
+    for diagnostic in diagnostics:
+        trace = np.array(diagnostic['trace'], dtype=float)
+        trace[:,:2] += [merged['ncalls'], merged['evaltime']]
+        traces.append(trace)
+        for attr in merged:
+            merged[attr] += diagnostic[attr]
+    merged['trace'] = np.concatenate(traces, axis=0) if traces else np.zeros((0, 3))
+    return merged
+
 minimize_sparse_bfgs = minimize_sparse_bfgs1
 
-__all__ = [ 'BFGSResult', 'minimize_sparse_bfgs', 'minimize_sparse_bfgs0', 'minimize_sparse_bfgs1', 'SparseFunction', 'wolfe_line_search', 'sparse_grad' ]
+__all__ = [ 'BFGSResult', 'minimize_sparse_bfgs', 'minimize_sparse_bfgs0', 'minimize_sparse_bfgs1', 'SparseFunction', 'wolfe_line_search', 'sparse_grad', 'check_jac',
+    'ObjectiveCounter', 'sparse_bfgs_diagnostics', 'merge_diagnostics' ]
 
@@ -141,7 +141,6 @@ def add_snr_extensions(cells, maps=None, grad_kwargs={}, _zeta_spurious=True):
                 break
             if not hasattr(any_cell, 'diffusivity'):
                 raise AttributeError('missing attribute `diffusivity`; please infer diffusion first')
-            D = []
     else:
         if isinstance(maps, Maps):
             _maps = maps.maps
@@ -152,39 +151,21 @@ def add_snr_extensions(cells, maps=None, grad_kwargs={}, _zeta_spurious=True):
         index = _maps.index.values
         if _zeta_spurious:
             D = _maps['diffusivity'].values
-    # compute mean displacement m and variances V and V_prior (defined at cells `index`)
-    sum_pts  = lambda a: np.sum(a, axis=0, keepdims=True)
-    sum_dims = lambda a: np.sum(a, axis=1, keepdims=True)
-    m, n, dr, dr2 = [], [], [], []
-    dts = []
-    for i in index:
-        cell = cells[i]
-        n.append(len(cell))
-        m.append(np.mean(cell.dr, axis=0, keepdims=True))
-        dr.append(sum_pts(cell.dr))
-        dr2.append(sum_pts(cell.dr * cell.dr))
-        dts.append(cell.dt)
-        if maps is None and _zeta_spurious:
-            D.append(cell.diffusivity)
-    n = np.array(n)
+    # compute variances V and V_prior and zeta_total (defined at cells `index`)
+    packed = cells.pack(index)
+    n = packed.count
+    dr = packed.sum(packed.dr)
+    dr2 = packed.sum(packed.dr * packed.dr)
+    if maps is None and _zeta_spurious:
+        D = [ cells[i].diffusivity for i in index ]
+    V, V_prior, zeta_total, sd = snr_statistics(n, dr, dr2)
     nnz = 1 < n
-    m   = np.concatenate(m, axis=0)
-    n   = n[:,np.newaxis]
-    dr  = np.concatenate(dr, axis=0)
-    dr2 = np.concatenate(dr2, axis=0)
-    V   = sum_dims(dr2 - dr * dr / n) / n #(n - 1)
-    n_prior   = np.sum(n)    - n
-    dr_prior  = sum_pts(dr)  - dr
-    dr2_prior = sum_pts(dr2) - dr2
-    V_prior   = sum_dims(dr2_prior - dr_prior * dr_prior / n_prior) / n_prior #(n_prior - 1)
-    # compute zeta_total (defined at cells `index`) and zeta_spurious (defined at cells `g_index`)
-    sd = np.sqrt(V)
-    zeta_total = np.zeros_like(m)
-    zeta_total[nnz] = m[nnz] / sd[nnz]
+    n, V, V_prior, sd = n[:,np.newaxis], V[:,np.newaxis], V_prior[:,np.newaxis], sd[:,np.newaxis]
+    # compute zeta_spurious (defined at cells `g_index`)
     if _zeta_spurious:
         if maps is None:
             D = np.array(D)
-        dts = np.concatenate(dts)
+        dts = packed.dt
         dt = np.median(dts)
         if not np.all(np.isclose(dts, dt)):
             raise ValueError('dts are not all equal')
@@ -248,5 +229,47 @@ def add_snr_extensions(cells, maps=None, grad_kwargs={}, _zeta_spurious=True):
     return maps
 
 
-__all__ = [ 'add_snr_extensions', 'infer_snr', 'setup' ]
+def snr_statistics(n, sum_dr, sum_dr2):
+    """
+    Signal-to-noise ratio related variables from per-cell counts and sums.
+
+    This is the array-level counterpart of :func:`add_snr_extensions`, without
+    *zeta_spurious*.
+    The prior variance of a cell is the variance of the translocations in all the other cells.
+
+    Arguments:
+
+        n (numpy.ndarray): number of translocations in each cell.
+
+        sum_dr (numpy.ndarray): per-cell sums of the translocation displacements,
+            with as many columns as spatial dimensions.
+
+        sum_dr2 (numpy.ndarray): per-cell sums of the squared displacements,
+            with as many columns as spatial dimensions.
+
+    Returns:
+
+        tuple: arrays *V*, *V_prior*, *zeta_total* and *sd* (square root of *V*);
+            *V*, *zeta_total* and *sd* are NaN at the cells with less than two translocations.
+
+    """
+    n = np.asarray(n)
+    sum_dr, sum_dr2 = np.asarray(sum_dr, dtype=float), np.asarray(sum_dr2, dtype=float)
+    nnz = 1 < n
+    _n = n[:,np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        V = np.sum(sum_dr2 - sum_dr * sum_dr / _n, axis=1) / n #(n - 1)
+        n_prior = np.sum(n) - n
+        dr_prior = np.sum(sum_dr, axis=0, keepdims=True) - sum_dr
+        dr2_prior = np.sum(sum_dr2, axis=0, keepdims=True) - sum_dr2
+        V_prior = np.sum(dr2_prior - dr_prior * dr_prior / n_prior[:,np.newaxis], axis=1) / n_prior #(n_prior - 1)
+        sd = np.sqrt(V)
+        zeta_total = sum_dr / _n / sd[:,np.newaxis]
+    V[~nnz] = np.nan
+    sd[~nnz] = np.nan
+    zeta_total[~nnz] = np.nan
+    return V, V_prior, zeta_total, sd
+
+
+__all__ = [ 'add_snr_extensions', 'infer_snr', 'setup', 'snr_statistics' ]
 
@@ -14,6 +14,7 @@
 
 from .base import *
 from .gradient import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -32,7 +33,10 @@ setup = {'name': ('standard.d', 'smooth.d'),
         ('max_iter',        dict(type=int, help='maximum number of iterations')),
         ('rgrad',       dict(help="alternative gradient for the regularization; can be 'delta'/'delta0' or 'delta1'")),
         ('tol',             dict(type=float, help='tolerance for scipy minimizer')))),
-    'cell_sampling': 'group'}
+    'cell_sampling': 'group',
+    'supports_warm_start': True,
+    'supports_diagnostics': True}
+setup_with_jac_argument(setup)
 setup_with_grad_arguments(setup)
 
 
@@ -138,14 +142,53 @@ def d_neg_posterior1(diffusivity, cells, sigma2, diffusivity_prior, \
     return result
 
 
+def d_neg_posterior_and_jac(diffusivity, translocations, sigma2, diffusivity_prior, \
+    jeffreys_prior, dt_mean, min_diffusivity, operators, weights):
+    """
+    Similar to :func:`smooth_d_neg_posterior` and :func:`d_neg_posterior1`, evaluated
+    on all the cells at once from the packed translocations
+    (see :class:`~tramway.inference.base.PackedTranslocations`), with
+    the smoothing prior expressed with the compiled spatial operators
+    (see :meth:`~tramway.inference.base.Distributed.gradient_operator`).
+
+    Returns:
+
+        tuple: negative log posterior and its gradient with respect to `diffusivity`.
+
+    """
+    if min_diffusivity is not None:
+        observed_min = np.min(diffusivity)
+        if observed_min < min_diffusivity and not np.isclose(observed_min, min_diffusivity):
+            warn(DiffusivityWarning(observed_min, min_diffusivity))
+    noise_dt = sigma2
+    dt, dr2 = translocations.dt, translocations.dr2
+    D_dt = 4. * (translocations.expand(diffusivity) * dt + noise_dt) # 4*(D+Dnoise)*dt
+    result = dt.size * log(pi) + np.sum(np.log(D_dt)) + np.sum(dr2 / D_dt)
+    # d/dD [ log(D_dt) + dr2 / D_dt ] = 4 * dt * (1/D_dt - dr2/D_dt**2)
+    jac = 4. * translocations.sum(dt * (D_dt - dr2) / (D_dt * D_dt))
+    # prior
+    if diffusivity_prior:
+        result += smoothing_prior(diffusivity, operators, diffusivity_prior * weights, jac)
+    if jeffreys_prior:
+        result += 2. * np.sum(np.log(diffusivity * dt_mean + sigma2))
+        jac += 2. * dt_mean / (diffusivity * dt_mean + sigma2)
+    return result, jac
+
+
 def infer_smooth_D(cells, diffusivity_prior=None, jeffreys_prior=None, \
-    min_diffusivity=None, max_iter=None, epsilon=None, rgrad=None, verbose=False, **kwargs):
+    min_diffusivity=None, max_iter=None, epsilon=None, rgrad=None, verbose=False, \
+    jac='analytic', warm_start=None, diagnostics=False, **kwargs):
+    """
+    Argument `jac` is described in :func:`~tramway.inference.gradient.setup_with_jac_argument`.
+
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
+    """
 
     # initial values
     localization_error = cells.get_localization_error(kwargs, 0.03, True)
     index, reverse_index, n, dt_mean, D_initial, min_diffusivity, D_bounds, _ = \
         smooth_infer_init(cells, min_diffusivity=min_diffusivity, jeffreys_prior=jeffreys_prior,
-        sigma2=localization_error)
+        sigma2=localization_error, warm_start=warm_start)
 
     # gradient options
     grad_kwargs = get_grad_kwargs(kwargs, epsilon=epsilon)
@@ -172,14 +215,30 @@ def infer_smooth_D(cells, diffusivity_prior=None, jeffreys_prior=None, \
     # posterior function
     if rgrad in ('delta','delta0','delta1'):
         fun = d_neg_posterior1
+        operator = 'local_variation'
     else:
         if rgrad not in (None, 'grad', 'grad1', 'gradn'):
             warn('unsupported rgrad: {}'.format(rgrad), RuntimeWarning)
         fun = smooth_d_neg_posterior
+        operator = 'grad'
 
-    args = (cells, localization_error, diffusivity_prior, jeffreys_prior, dt_mean, min_diffusivity, index, reverse_index, grad_kwargs)
+    if jac in ('analytic', True):
+        if diffusivity_prior:
+            operators = cells.gradient_operator(index, reverse_index, operator, **grad_kwargs)
+            weights = local_operator_weights(cells, index, reverse_index)
+        else:
+            operators = weights = None
+        fun, kwargs['jac'] = d_neg_posterior_and_jac, True
+        args = (cells.pack(index), localization_error, diffusivity_prior, jeffreys_prior, dt_mean, min_diffusivity, operators, weights)
+    else:
+        if jac is not None:
+            kwargs['jac'] = jac
+        args = (cells, localization_error, diffusivity_prior, jeffreys_prior, dt_mean, min_diffusivity, index, reverse_index, grad_kwargs)
 
     # run the optimization
+    if diagnostics:
+        counter = ObjectiveCounter()
+        fun = counter.wrap(fun, kwargs)
     result = minimize(fun, D_initial, args=args, **kwargs)
     if not (result.success or verbose):
         warn('{}'.format(result.message), OptimizationWarning)
@@ -188,5 +247,7 @@ def infer_smooth_D(cells, diffusivity_prior=None, jeffreys_prior=None, \
     D = result.x
     D = pd.DataFrame(D, index=index, columns=['diffusivity'])
 
+    if diagnostics:
+        return D, {'diagnostics': counter.diagnostics()}
     return D
 
@@ -15,6 +15,7 @@
 from tramway.core import ChainArray
 from .base import *
 from .gradient import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -34,7 +35,10 @@ setup = {'name': ('standard.dd', 'standard.ddrift', 'smooth.dd', 'smooth.ddrift'
         ('max_iter',        dict(type=int, help='maximum number of iterations')),
         ('rgrad',   dict(help="alternative gradient for the regularization; can be 'delta'/'delta0' or 'delta1'")),
         ('tol',             dict(type=float, help='tolerance for scipy minimizer')))),
-    'cell_sampling': 'group'}
+    'cell_sampling': 'group',
+    'supports_warm_start': True,
+    'supports_diagnostics': True}
+setup_with_jac_argument(setup)
 setup_with_grad_arguments(setup)
 
 
@@ -108,15 +112,70 @@ def dd_neg_posterior1(x, dd, cells, sigma2, diffusivity_prior, drift_prior,
     return result
 
 
+def dd_neg_posterior_and_jac(x, dd, translocations, sigma2, diffusivity_prior, drift_prior,
+        jeffreys_prior, dt_mean, min_diffusivity, operators, weights):
+    """
+    Similar to :func:`smooth_dd_neg_posterior` and :func:`dd_neg_posterior1`, evaluated
+    on all the cells at once from the packed translocations
+    (see :class:`~tramway.inference.base.PackedTranslocations`), with
+    the smoothing prior expressed with the compiled spatial operators
+    (see :meth:`~tramway.inference.base.Distributed.gradient_operator`).
+
+    Returns:
+
+        tuple: negative log posterior and its gradient with respect to `x`.
+
+    """
+    # extract `D` and `drift`
+    dd.update(x)
+    D, drift = dd['D'], dd['drift']
+    #
+    if min_diffusivity is not None:
+        observed_min = np.min(D)
+        if observed_min < min_diffusivity and not np.isclose(observed_min, min_diffusivity):
+            warn(DiffusivityWarning(observed_min, min_diffusivity))
+    noise_dt = sigma2
+    dt = translocations.dt
+    # various posterior terms, for all the translocations
+    denominator = 4. * (translocations.expand(D) * dt + noise_dt) # 4*(D+Dnoise)*dt
+    dr_minus_drift_dt = translocations.dr - dt[:,np.newaxis] * translocations.expand(drift)
+    # non-directional square displacement
+    ndsd = np.sum(dr_minus_drift_dt * dr_minus_drift_dt, axis=1)
+    result = dt.size * log(pi) + np.sum(np.log(denominator)) + np.sum(ndsd / denominator)
+    # derivatives
+    dD = 4. * translocations.sum(dt * (denominator - ndsd) / (denominator * denominator))
+    ddrift = -2. * translocations.sum((dt / denominator)[:,np.newaxis] * dr_minus_drift_dt)
+    # priors
+    if diffusivity_prior:
+        result += smoothing_prior(D, operators, diffusivity_prior * weights, dD)
+    if drift_prior:
+        # the sum over all the cells is penalized at every cell (see `smooth_dd_neg_posterior`)
+        total_weight = drift_prior * np.sum(weights)
+        result += total_weight * np.sum(drift * drift)
+        ddrift += 2. * total_weight * drift
+    if jeffreys_prior:
+        result += 2. * np.sum(np.log(D * dt_mean + sigma2))
+        dD += 2. * dt_mean / (D * dt_mean + sigma2)
+    return result, ChainArray('D', dD, 'drift', ddrift).combined
+
+
 def infer_smooth_DD(cells, diffusivity_prior=None, drift_prior=None, jeffreys_prior=False,
-    min_diffusivity=None, max_iter=None, epsilon=None, rgrad=None, verbose=False, **kwargs):
+    min_diffusivity=None, max_iter=None, epsilon=None, rgrad=None, verbose=False,
+    jac='analytic', warm_start=None, diagnostics=False, **kwargs):
+    """
+    Argument `jac` is described in :func:`~tramway.inference.gradient.setup_with_jac_argument`.
+
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
+    """
 
     # initial values
     localization_error = cells.get_localization_error(kwargs, 0.03, True)
     index, reverse_index, n, dt_mean, D_initial, min_diffusivity, D_bounds, _ = \
         smooth_infer_init(cells, min_diffusivity=min_diffusivity, jeffreys_prior=jeffreys_prior,
-        sigma2=localization_error)
+        sigma2=localization_error, warm_start=warm_start)
     initial_drift = np.zeros((len(index), cells.dim), dtype=D_initial.dtype)
+    initial_drift = warm_start_values(cells, index, warm_start,
+            [ 'drift ' + col for col in cells.space_cols ], initial_drift)
     dd = ChainArray('D', D_initial, 'drift', initial_drift)
 
     # gradient options
@@ -145,15 +204,32 @@ def infer_smooth_DD(cells, diffusivity_prior=None, drift_prior=None, jeffreys_pr
     # posterior function
     if rgrad in ('delta','delta0','delta1'):
         fun = dd_neg_posterior1
+        operator = 'local_variation'
     else:
         if rgrad not in (None, 'grad', 'grad1', 'gradn'):
             warn('unsupported rgrad: {}'.format(rgrad), RuntimeWarning)
         fun = smooth_dd_neg_posterior
+        operator = 'grad'
 
     # run the optimization
     #cell.cache = None # no cache needed
-    args = (dd, cells, localization_error, diffusivity_prior, drift_prior, jeffreys_prior, \
-            dt_mean, min_diffusivity, index, reverse_index, grad_kwargs)
+    if jac in ('analytic', True):
+        if diffusivity_prior:
+            operators = cells.gradient_operator(index, reverse_index, operator, **grad_kwargs)
+        else:
+            operators = None
+        weights = local_operator_weights(cells, index, reverse_index)
+        fun, kwargs['jac'] = dd_neg_posterior_and_jac, True
+        args = (dd, cells.pack(index), localization_error, diffusivity_prior, drift_prior, \
+                jeffreys_prior, dt_mean, min_diffusivity, operators, weights)
+    else:
+        if jac is not None:
+            kwargs['jac'] = jac
+        args = (dd, cells, localization_error, diffusivity_prior, drift_prior, jeffreys_prior, \
+                dt_mean, min_diffusivity, index, reverse_index, grad_kwargs)
+    if diagnostics:
+        counter = ObjectiveCounter()
+        fun = counter.wrap(fun, kwargs)
     result = minimize(fun, dd.combined, args=args, **kwargs)
     if not (result.success or verbose):
         warn('{}'.format(result.message), OptimizationWarning)
@@ -165,5 +241,7 @@ def infer_smooth_DD(cells, diffusivity_prior=None, drift_prior=None, jeffreys_pr
         columns=[ 'diffusivity' ] + \
             [ 'drift ' + col for col in cells.space_cols ])
 
+    if diagnostics:
+        return DD, {'diagnostics': counter.diagnostics()}
     return DD
 
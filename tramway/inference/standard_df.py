@@ -15,6 +15,7 @@
 from tramway.core import ChainArray
 from .base import *
 from .gradient import *
+from .optimization import ObjectiveCounter
 from warnings import warn
 from math import pi, log
 import numpy as np
@@ -35,7 +36,10 @@ setup = {'name': ('standard.df', 'smooth.df'),
         ('max_iter',        dict(type=int, help='maximum number of iterations')),
         ('rgrad',       dict(help="alternative gradient for the regularization; can be 'delta'/'delta0' or 'delta1'")),
         ('tol',             dict(type=float, help='tolerance for scipy minimizer')))),
-    'cell_sampling': 'group'}
+    'cell_sampling': 'group',
+    'supports_warm_start': True,
+    'supports_diagnostics': True}
+setup_with_jac_argument(setup)
 setup_with_grad_arguments(setup)
 
 
@@ -113,19 +117,76 @@ def df_neg_posterior1(x, df, cells, sigma2, diffusivity_prior,
     return result
 
 
+def df_neg_posterior_and_jac(x, df, translocations, sigma2, diffusivity_prior,
+        force_prior, jeffreys_prior, dt_mean, min_diffusivity, operators, weights):
+    """
+    Similar to :func:`smooth_df_neg_posterior` and :func:`df_neg_posterior1`, evaluated
+    on all the cells at once from the packed translocations
+    (see :class:`~tramway.inference.base.PackedTranslocations`), with
+    the smoothing prior expressed with the compiled spatial operators
+    (see :meth:`~tramway.inference.base.Distributed.gradient_operator`).
+
+    Returns:
+
+        tuple: negative log posterior and its gradient with respect to `x`.
+
+    """
+    # extract `D` and `F`
+    df.update(x)
+    D, F = df['D'], df['F']
+    #
+    if min_diffusivity is not None:
+        observed_min = np.min(D)
+        if observed_min < min_diffusivity and not np.isclose(observed_min, min_diffusivity):
+            warn(DiffusivityWarning(observed_min, min_diffusivity))
+    noise_dt = sigma2
+    dt = translocations.dt
+    # various posterior terms, for all the translocations
+    D_dt = translocations.expand(D) * dt
+    _F = translocations.expand(F)
+    denominator = 4. * (D_dt + noise_dt) # 4*(D+Dnoise)*dt
+    dr_minus_drift_dt = translocations.dr - D_dt[:,np.newaxis] * _F
+    # non-directional squared displacement
+    ndsd = np.sum(dr_minus_drift_dt * dr_minus_drift_dt, axis=1)
+    result = dt.size * log(pi) + np.sum(np.log(denominator)) + np.sum(ndsd / denominator)
+    # derivatives
+    residual = dr_minus_drift_dt / denominator[:,np.newaxis]
+    dD = translocations.sum(dt * (4. * (1. - ndsd / denominator) / denominator \
+            - 2. * np.sum(residual * _F, axis=1)))
+    dF = -2. * translocations.sum(D_dt[:,np.newaxis] * residual)
+    # priors
+    if diffusivity_prior:
+        result += smoothing_prior(D, operators, diffusivity_prior * weights, dD)
+    if force_prior:
+        # the sum over all the cells is penalized at every cell (see `smooth_df_neg_posterior`)
+        total_weight = force_prior * np.sum(weights)
+        result += total_weight * np.sum(F * F)
+        dF += 2. * total_weight * F
+    if jeffreys_prior:
+        result += 2. * np.sum(np.log(D * dt_mean + sigma2) - np.log(D))
+        dD += 2. * (dt_mean / (D * dt_mean + sigma2) - 1. / D)
+    return result, ChainArray('D', dD, 'F', dF).combined
+
+
 def infer_smooth_DF(cells, diffusivity_prior=None, force_prior=None, potential_prior=None,
         jeffreys_prior=False, min_diffusivity=None, max_iter=None, epsilon=None, rgrad=None,
-        verbose=False, **kwargs):
+        verbose=False, jac='analytic', warm_start=None, diagnostics=False, **kwargs):
     """
     Argument `potential_prior` is an alias for `force_prior` which penalizes the large force amplitudes.
+
+    Argument `jac` is described in :func:`~tramway.inference.gradient.setup_with_jac_argument`.
+
+    Argument `diagnostics` is described in :class:`~tramway.inference.optimization.ObjectiveCounter`.
     """
 
     # initial values
     localization_error = cells.get_localization_error(kwargs, 0.03, True)
     index, reverse_index, n, dt_mean, D_initial, min_diffusivity, D_bounds, _ = \
         smooth_infer_init(cells, min_diffusivity=min_diffusivity, jeffreys_prior=jeffreys_prior,
-        sigma2=localization_error)
+        sigma2=localization_error, warm_start=warm_start)
     F_initial = np.zeros((len(index), cells.dim), dtype=D_initial.dtype)
+    F_initial = warm_start_values(cells, index, warm_start,
+            [ 'force ' + col for col in cells.space_cols ], F_initial)
     df = ChainArray('D', D_initial, 'F', F_initial)
 
     # gradient options
@@ -154,10 +215,12 @@ def infer_smooth_DF(cells, diffusivity_prior=None, force_prior=None, potential_p
     # posterior function
     if rgrad in ('delta','delta0','delta1'):
         fun = df_neg_posterior1
+        operator = 'local_variation'
     else:
         if rgrad not in (None, 'grad', 'grad1', 'gradn'):
             warn('unsupported rgrad: {}'.format(rgrad), RuntimeWarning)
         fun = smooth_df_neg_posterior
+        operator = 'grad'
 
     if force_prior is None:
         if potential_prior is not None:
@@ -167,7 +230,21 @@ def infer_smooth_DF(cells, diffusivity_prior=None, force_prior=None, potential_p
 
     # run the optimization
     #cell.cache = None # no cache needed
-    args = (df, cells, localization_error, diffusivity_prior, force_prior, jeffreys_prior, dt_mean, min_diffusivity, index, reverse_index, grad_kwargs)
+    if jac in ('analytic', True):
+        if diffusivity_prior:
+            operators = cells.gradient_operator(index, reverse_index, operator, **grad_kwargs)
+        else:
+            operators = None
+        weights = local_operator_weights(cells, index, reverse_index)
+        fun, kwargs['jac'] = df_neg_posterior_and_jac, True
+        args = (df, cells.pack(index), localization_error, diffusivity_prior, force_prior, jeffreys_prior, dt_mean, min_diffusivity, operators, weights)
+    else:
+        if jac is not None:
+            kwargs['jac'] = jac
+        args = (df, cells, localization_error, diffusivity_prior, force_prior, jeffreys_prior, dt_mean, min_diffusivity, index, reverse_index, grad_kwargs)
+    if diagnostics:
+        counter = ObjectiveCounter()
+        fun = counter.wrap(fun, kwargs)
     result = minimize(fun, df.combined, args=args, **kwargs)
     if not (result.success or verbose):
         warn('{}'.format(result.message), OptimizationWarning)
@@ -179,5 +256,7 @@ def infer_smooth_DF(cells, diffusivity_prior=None, force_prior=None, potential_p
         columns=[ 'diffusivity' ] + \
             [ 'force ' + col for col in cells.space_cols ])
 
+    if diagnostics:
+        return DF, {'diagnostics': counter.diagnostics()}
     return DF
 
@@ -48,9 +48,14 @@ setup = {'name': ('stochastic.dv', 'stochastic.dv1'),
         ('grad_selection_angle',('-a', dict(type=float, help='top angle of the selection hypercone for neighbours in the spatial gradient calculation (1= pi radians; if not -c, default is: {})'.format(default_selection_angle)))),
         ('rgrad',               dict(help="local spatial variation; any of 'delta0' (highly recommended), 'delta1'")),
         ('export_centers',      dict(action='store_true')),
+        ('checkpoint',          dict(help='file to periodically save the state of the optimizer to (*.npz)')),
+        ('checkpoint_interval', dict(type=int, help='number of iterations between consecutive checkpoints (default is 100)')),
+        ('resume_from',         dict(help='checkpoint file to resume the optimization from')),
         ('verbose',             ()))),
         #('region_size',         ('-s', dict(type=int, help='radius of the regions, in number of adjacency steps'))))),
-    'cell_sampling': 'group'}
+    'cell_sampling': 'group',
+    'supports_warm_start': True,
+    'supports_diagnostics': True}
 
 
 module_logger = logging.getLogger(__name__)
@@ -351,7 +356,7 @@ def infer_stochastic_DV(cells,
     diffusion_prior=None, diffusion_spatial_prior=None, diffusion_time_prior=None,
     prior_delay=None, return_struct=False, posterior_max_count=None,# deprecated
     diffusivity_prior=None, potential_prior=None, time_prior=None,
-    allow_negative_potential=False,
+    allow_negative_potential=False, warm_start=None, diagnostics=False,
     **kwargs):
     """
     Arguments:
@@ -401,6 +406,23 @@ def infer_stochastic_DV(cells,
         allow_negative_potential (bool): do not offset the whole potential map towards
             all-positive values.
 
+        warm_start (pandas.DataFrame): maps of a previous inference, as returned by
+            :func:`~tramway.inference.base.map_onto_cells`, to initialize the diffusivity
+            and potential energy with; `D0`, `V0` and `x0` take precedence.
+
+        diagnostics (bool): count the evaluations of the local cost function,
+            measure the time spent in this function and record the convergence trace
+            in item *diagnostics* of the second output argument;
+            see also :func:`~tramway.inference.optimization.sparse_bfgs_diagnostics`.
+
+        checkpoint (str): path to a *.npz* file the state of the optimizer is periodically
+            written to.
+
+        checkpoint_interval (int): number of iterations between consecutive checkpoints.
+
+        resume_from (str): path to a checkpoint file to resume the optimization from;
+            the other arguments should be the same as for the interrupted inference.
+
         ...
 
     See also :func:`~tramway.inference.optimization.minimize_sparse_bfgs`.
@@ -412,7 +434,7 @@ def infer_stochastic_DV(cells,
     localization_error = cells.get_localization_error(kwargs, 0.03, True)
     index, reverse_index, n, dt_mean, D_initial, _min_diffusivity, D_bounds, border = \
         smooth_infer_init(cells, min_diffusivity=min_diffusivity, jeffreys_prior=jeffreys_prior,
-        sigma2=localization_error)
+        sigma2=localization_error, warm_start=warm_start)
     # V initial values
     if x0 is None:
         if V0 is None:
@@ -429,6 +451,7 @@ def infer_stochastic_DV(cells,
                 except ValueError:
                     raise ValueError('no data in bounded domains; null density everywhere')
                 V_initial = np.log(np.max(density)) - np.log(density)
+            V_initial = warm_start_values(cells, index, warm_start, 'potential', V_initial)
     else:
         #warn('`x0` is deprecated; please use `D0` and `V0` instead', DeprecationWarning)
         if x0.size != 2 * D_initial.size:
@@ -596,6 +619,8 @@ def infer_stochastic_DV(cells,
             sbfgs_kwargs['returns'] = { debug_all[attr] for attr in debug }
     else:
         sbfgs_kwargs['returns'] = set()
+    if diagnostics and sbfgs_kwargs['returns'] != 'all':
+        sbfgs_kwargs['returns'] |= {'f', 'ncalls', 'evaltime'}
 
     assert not np.any(np.isnan(dv.combined))
     assert not np.any(np.isinf(dv.combined))
@@ -648,6 +673,9 @@ def infer_stochastic_DV(cells,
         posterior_info = pd.DataFrame(np.array(posterior_info), columns=cols)
         info['posterior_info'] = posterior_info
 
+    if diagnostics:
+        info['diagnostics'] = sparse_bfgs_diagnostics(result)
+
     if return_struct:
         # cannot be rwa-stored
         info['result'] = result
@@ -168,6 +168,27 @@ class DynamicCells(Distributed):
 
         return deriv
 
+    def time_derivative_operator(self, index=None, reverse_index=None, **kwargs):
+        """
+        Compiled :meth:`time_derivative`.
+
+        Similar to :meth:`~tramway.inference.base.Distributed.gradient_operator`;
+        the time derivative of `X` at all the cells is ``T.dot(X)``.
+
+        Returns:
+
+            scipy.sparse.csr_matrix: operator `T`.
+
+        """
+        T = self._compiled_operators('time_derivative', index, reverse_index, kwargs,
+                neighbours='time_neighbours')
+        if T:
+            T, = T
+        else:
+            n = len(self.cells) if index is None else len(index)
+            T = sparse.csr_matrix((n, n))
+        return T
+
     def time_variation(self, i, X, index_map=None, na=0., **kwargs):
         cell = self.cells[i]
         t0 = cell.center_t
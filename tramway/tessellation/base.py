@@ -848,6 +848,33 @@ class Tessellation(Lazy):
 
 
 
+class CellTree(object):
+    """
+    Spatial index of cell centers, for :class:`Delaunay`.
+
+    Cells with undefined center (deleted cells) are not indexed.
+
+    Not serializable.
+
+    Attributes:
+        tree (scipy.spatial.cKDTree): KD-tree of the defined centers.
+        index (numpy.ndarray): cell indices of the indexed centers;
+            ``None`` if all the centers are defined.
+        centers (numpy.ndarray): (scaled) coordinates of the cell centers.
+    """
+    __slots__ = ('tree', 'index', 'centers')
+
+    def __init__(self, centers):
+        defined, = np.all(np.isfinite(centers), axis=1).nonzero()
+        if defined.size == centers.shape[0]:
+            self.index = None
+            self.tree = spatial.cKDTree(centers)
+        else:
+            self.index = defined
+            self.tree = spatial.cKDTree(centers[defined])
+        self.centers = centers
+
+
 class Delaunay(Tessellation):
     """
     Delaunay graph.
@@ -859,19 +886,54 @@ class Delaunay(Tessellation):
 
     Attributes:
         cell_centers (numpy.ndarray): coordinates of the cell centers.
+        cell_tree (scipy.spatial.cKDTree): spatial index of the cell centers.
     """
-    __slots__ = ('_cell_centers',)
+    __slots__ = ('_cell_centers', '_cell_tree')
 
     def __init__(self, scaler=None):
         Tessellation.__init__(self, scaler)
         self._cell_centers = None
+        self._cell_tree = None
 
     def tessellate(self, points):
         self._cell_centers = np.asarray(self._preprocess(points))
 
+    @property
+    def cell_tree(self):
+        """
+        :class:`scipy.spatial.cKDTree` of the (scaled) cell centers, ro property.
+
+        The tree is built on demand and rebuilt whenever :attr:`_cell_centers` is replaced.
+        Cells with undefined center (deleted cells) are not indexed.
+        """
+        return self._get_cell_tree()[0]
+
+    def _get_cell_tree(self):
+        # the tree is not serialized and may be missing
+        tree = getattr(self, '_cell_tree', None)
+        if tree is None or tree.centers is not self._cell_centers:
+            tree = self._cell_tree = CellTree(self._cell_centers)
+        return tree.tree, tree.index, tree.centers
+
+    def _nearest_cell(self, X):
+        """
+        Nearest cell center of each point, using :attr:`cell_tree`.
+
+        Arguments:
+            X (numpy.ndarray): scaled point coordinates.
+
+        Returns:
+            tuple: distances to and indices of the nearest cell centers.
+        """
+        tree, defined, _ = self._get_cell_tree()
+        d, K = tree.query(X)
+        if defined is not None:
+            K = defined[K]
+        return d, K
+
     def cell_index(self, points, format=None, select=None, knn=None, radius=None,
         min_location_count=None, metric='euclidean', filter=None,
-        filter_descriptors_only=False, **kwargs):
+        filter_descriptors_only=False, index=None, **kwargs):
         """
         See :meth:`Tessellation.cell_index`.
 
@@ -915,11 +977,22 @@ class Delaunay(Tessellation):
                 included in the labeling.
             filter_descriptors_only (bool): whether `filter` should get points as
                 descriptors only.
+            index (str): either *'kdtree'* or *'dense'*;
+                *'kdtree'* queries :attr:`cell_tree` (and a similar tree of the points
+                if needed) whereas *'dense'* computes all the point-center distances;
+                default is *'kdtree'* for the euclidean metric, *'dense'* otherwise.
 
         Returns:
             see :meth:`Tessellation.cell_index`.
 
         """
+        if index is None:
+            index = 'kdtree' if metric == 'euclidean' and not kwargs else 'dense'
+        elif index == 'kdtree':
+            if metric != 'euclidean':
+                raise ValueError("index='kdtree' requires metric='euclidean'")
+        elif index != 'dense':
+            raise ValueError("index is neither 'kdtree' nor 'dense': '{}'".format(index))
         if self._cell_centers.size == 0:
             return format_cell_index(np.full(len(points), -1, dtype=int), format=format)
         if callable(knn):
@@ -940,42 +1013,79 @@ class Delaunay(Tessellation):
             min_r = max_r = radius
             if radius and not(min_nn or max_nn or min_location_count or filter):
                 return cell_index_by_radius(self, points, radius,
-                        format=format, select=select, metric=metric, **kwargs)
+                        format=format, select=select, metric=metric, index=index, **kwargs)
         points = self.scaler.scale_point(points, inplace=False)
         X = self.descriptors(points, asarray=True)
         Y = self._cell_centers
-        try:
-            D = cdist(X, Y, metric, **kwargs)
-        except MemoryError as e:
-            memory_error = e # make it available outside the except block
-            # slice X to process less rows at a time
-            if metric != 'euclidean':
-                raise #NotImplementedError
-            K = np.zeros(X.shape[0], dtype=int)
-            X2 = np.sum(X * X, axis=1, keepdims=True).astype(np.float32)
-            Y2 = np.sum(Y * Y, axis=1, keepdims=True).astype(np.float32)
-            X, Y = X.astype(np.float32), Y.astype(np.float32)
-            n = 0
-            while True:
-                n += 1
-                block = int(ceil(X.shape[0] * 2**(-n)))
-                try:
-                    np.empty((block, Y.shape[0]), dtype=X.dtype)
-                except MemoryError:
-                    pass # continue
-                else:
-                    break
-            n += 2 # safer
-            block = int(ceil(X.shape[0] * 2**(-n)))
-            for i in range(0, X.shape[0], block):
-                j = min(i+block, X2.size)
-                Di = np.dot(np.float32(-2.)* X[i:j], Y.T)
-                Di += X2[i:j]
-                Di += Y2.T
-                K[i:j] = np.argmin(Di, axis=1)
+        if index == 'kdtree':
+            # the full distance matrix `D` is not available,
+            # only the distances `d` to the nearest centers are
             D = None
+            d, K = self._nearest_cell(X)
+            memory_error = None
         else:
-            K = None
+            d = None
+            try:
+                D = cdist(X, Y, metric, **kwargs)
+            except MemoryError as e:
+                memory_error = e # make it available outside the except block
+                # slice X to process less rows at a time
+                if metric != 'euclidean':
+                    raise #NotImplementedError
+                K = np.zeros(X.shape[0], dtype=int)
+                X2 = np.sum(X * X, axis=1, keepdims=True).astype(np.float32)
+                Y2 = np.sum(Y * Y, axis=1, keepdims=True).astype(np.float32)
+                X, Y = X.astype(np.float32), Y.astype(np.float32)
+                n = 0
+                while True:
+                    n += 1
+                    block = int(ceil(X.shape[0] * 2**(-n)))
+                    try:
+                        np.empty((block, Y.shape[0]), dtype=X.dtype)
+                    except MemoryError:
+                        pass # continue
+                    else:
+                        break
+                n += 2 # safer
+                block = int(ceil(X.shape[0] * 2**(-n)))
+                for i in range(0, X.shape[0], block):
+                    j = min(i+block, X2.size)
+                    Di = np.dot(np.float32(-2.)* X[i:j], Y.T)
+                    Di += X2[i:j]
+                    Di += Y2.T
+                    K[i:j] = np.argmin(Di, axis=1)
+                D = None
+            else:
+                K = None
+        #
+        def nearest_center_distance(cell, c):
+            # distances between the points in cell `c` and its center
+            if D is not None:
+                return D[cell, c]
+            elif d is not None:
+                return d[cell]
+            else:
+                dc = X[cell] - Y[[c]]
+                return np.sqrt(np.sum(dc * dc, axis=1))
+        _point_tree = []
+        def nearest_points(c, k):
+            # indices of the `k` nearest points to each cell center in `c`;
+            # one column per center
+            if D is not None:
+                return np.argsort(D[:,c], axis=0)[:k]
+            elif d is None:
+                raise memory_error
+            if not _point_tree:
+                _point_tree.append(spatial.cKDTree(X))
+            # unlike argsort, query pads with index X.shape[0] if k exceeds the number of points
+            k = min(k, X.shape[0])
+            _, I = _point_tree[0].query(Y[c], k=k)
+            I = np.asarray(I)
+            if k == 1:
+                I = I[...,np.newaxis]
+            if I.ndim == 1:
+                I = I[I < X.shape[0]]
+            return I.T
         #
         ncells = self._cell_centers.shape[0]
         if format == 'force array':
@@ -1014,21 +1124,17 @@ class Delaunay(Tessellation):
                         _, _max = knn(c)
                         if _max is None or positive_count[i] <= _max:
                             continue
-                        if D is None:
-                            raise memory_error
                         cell = K == c
-                        I = np.argsort(D[cell, c])
+                        I = np.argsort(nearest_center_distance(cell, c))
                         cell, = cell.nonzero()
                         excess = cell[I[_max:]]
                         K[excess] = -1
                 else:
                     large, = (max_nn < positive_count).nonzero()
                     if large.size:
-                        if D is None:
-                            raise memory_error
                         for c in nonempty[large]:
                             cell = K == c
-                            I = np.argsort(D[cell, c])
+                            I = np.argsort(nearest_center_distance(cell, c))
                             cell, = cell.nonzero()
                             excess = cell[I[max_nn:]]
                             K[excess] = -1
@@ -1041,13 +1147,9 @@ class Delaunay(Tessellation):
                         if max_r is None:
                             continue
                     cell = K == c
-                    if D is None:
-                        d = X[cell] - Y[[c]]
-                        d = np.sqrt(np.sum(d * d, axis=1))
-                    else:
-                        d = D[cell, c]
+                    dc = nearest_center_distance(cell, c)
                     cell, = cell.nonzero()
-                    discard = max_r < d
+                    discard = max_r < dc
                     K[cell[discard]] = -1
                     if np.all(discard):
                         excluded_cells.append(i)
@@ -1068,9 +1170,7 @@ class Delaunay(Tessellation):
                             Ic, = (K == c).nonzero()
                         else:
                             any_small = True
-                            if D is None:
-                                raise memory_error
-                            Ic = np.argsort(D[:,c])[:_min]
+                            Ic = nearest_points(c, _min)
                         I.append(Ic)
                         n.append(len(Ic))
                     if any_small:
@@ -1084,22 +1184,20 @@ class Delaunay(Tessellation):
                         small = np.ones(ncells, dtype=bool)
                     small[nonempty] = positive_count < min_nn
                     if np.any(small):
-                        if D is None:
-                            raise memory_error
                         # small and missing cells
-                        if D.shape[0] < min_nn:
+                        if X.shape[0] < min_nn:
                             # beware of the special case such that all the min_nn points are in a single bin
                             assert np.all(small[nonempty])
                             # the total number of points is lower than
                             # the desired minimum number of points per
                             # cell
-                            n = D.shape[0]
+                            n = X.shape[0]
                             I = np.repeat(np.arange(n), ncells)
                             J = np.tile(np.arange(ncells), n)
                             K = (I, J)
                         else:
-                            I = np.argsort(D[:,small], axis=0)[:min_nn].flatten()
                             small, = small.nonzero()
+                            I = nearest_points(small, min_nn).flatten()
                             J = np.tile(small, min_nn) # cell indices
                             assert I.size == J.size
                             # large-enough cells
@@ -1142,11 +1240,11 @@ class Delaunay(Tessellation):
                             else:
                                 cell = K == _c
                             if D is None:
-                                d = X[cell] - Y[[c]]
-                                d = np.sqrt(np.sum(d * d, axis=1))
+                                dc = X[cell] - Y[[c]]
+                                dc = np.sqrt(np.sum(dc * dc, axis=1))
                             else:
-                                d = D[cell, c]
-                            _in = d <= min_r
+                                dc = D[cell, c]
+                            _in = dc <= min_r
                             if np.any(_in):
                                 if np.all(_in):
                                     included_points[cell] = True
@@ -1186,6 +1284,42 @@ class Delaunay(Tessellation):
         self._cell_centers = self.scaler.scale_point(centers)
 
 
+def _cell_vertex_csr(cell_vertices, ncells):
+    """
+    Compressed (*indptr*, *indices*) representation of the vertex indices of the cells,
+    from :attr:`Voronoi.cell_vertices` as a `dict` or a sequence.
+    """
+    if isinstance(cell_vertices, dict):
+        empty = np.zeros(0, dtype=int)
+        vertices = [ np.asarray(cell_vertices.get(i, empty), dtype=int).ravel()
+                for i in range(ncells) ]
+    else:
+        vertices = [ np.asarray(vs, dtype=int).ravel() for vs in cell_vertices ]
+    indptr = np.zeros(ncells + 1, dtype=int)
+    indptr[1:len(vertices)+1] = np.cumsum([ vs.size for vs in vertices ])
+    indptr[len(vertices)+1:] = indptr[len(vertices)]
+    indices = np.concatenate(vertices) if vertices else np.zeros(0, dtype=int)
+    return indptr, indices
+
+def _convex_hull_volumes(points):
+    """
+    Volumes of the convex hulls of sets of points; ``NaN`` if Qhull fails or if
+    there are not enough points.
+    """
+    volumes = []
+    for pts in points:
+        volume = np.NaN
+        if pts.shape[1] < pts.shape[0]: # if enough points
+            try:
+                volume = spatial.ConvexHull(pts).volume
+            except (SystemExit, KeyboardInterrupt):
+                raise
+            except:
+                pass
+        volumes.append(volume)
+    return np.array(volumes, dtype=float)
+
+
 class Voronoi(Delaunay):
     """
     Voronoi graph.
@@ -1331,68 +1465,98 @@ class Voronoi(Delaunay):
     @property
     def cell_volume(self):
         if self._cell_volume is None:
-            adjacency = self.vertex_adjacency.tocsr()
-            cell_volume = np.full(len(self._cell_centers), np.NaN)
-            for i, u in enumerate(self._cell_centers):
-                js = _js = self.cell_vertices[i] # vertex indices
-
-                if u.size != 2:
-                    # use Qhull to estimate the volume
-                    pts = self._vertices[js]
-                    if pts.shape[1] < pts.shape[0]: # if enough points
-                        try:
-                            hull = spatial.ConvexHull(pts)
-                            cell_volume[i] = hull.volume
-                        except (SystemExit, KeyboardInterrupt):
-                            raise
-                        except:
-                            pass
-                    continue
-
-                if isinstance(js, np.ndarray):
-                    js = set(js.tolist())
-                else:
-                    js = set(js)
-                simplices = []
-                while js:
-                    j = js.pop()
-                    # j's neighbours
-                    ks = adjacency.indices[adjacency.indptr[j]:adjacency.indptr[j+1]].tolist()
-                    for k in ks:
-                        if k in js:
-                            simplices.append((j, k))
-
-                if len(simplices) != len(_js):
-                    # missing vertices are at infinite distance;
-                    # take instead the convex hull of the local vertices plus
-                    # the center of the cell (ideally all the points in the cell)
-                    pts = np.r_[self._vertices[_js], u[np.newaxis,:]]
-                    if pts.shape[1] < pts.shape[0]: # if enough points
-                        try:
-                            hull = spatial.ConvexHull(pts)
-                            cell_volume[i] = hull.volume
-                        except (SystemExit, KeyboardInterrupt):
-                            raise
-                        except:
-                            pass
-                    continue
-
-                if simplices: # `simplices` is not empty
-                    cell_volume[i] = 0.
-                    for j, k in simplices:
-                        v = self._vertices[j] if isinstance(j, int) else j
-                        w = self._vertices[k] if isinstance(k, int) else k
-                        cell_volume[i] += .5 * abs(\
-                                (v[0] - u[0]) * (w[1] - u[1]) - \
-                                (w[0] - u[0]) * (v[1] - u[1]) \
-                            )
-                elif ~np.isinf(self._cell_centers[i,0]):
-                    # cells with no vertices and which center coordinates are infinite
-                    # are deleted cells
-                    raise RuntimeError('cell {} has no boundaries'.format(i))
-            self._cell_volume = self.scaler.unscale_surface_area(cell_volume)
+            self.compute_cell_volume()
         return self.__returnlazy__('cell_volume', self._cell_volume)
 
+    def compute_cell_volume(self, worker_count=None):
+        """
+        Compute the volume of every cell and cache it as :attr:`cell_volume`.
+
+        In 2D, the vertices of the closed cells are sorted by angle about the cell centers,
+        and the surface areas are given by the shoelace formula, for all the cells at once.
+        The open cells, with missing vertices at infinite distance, are given the volume
+        of the convex hull of their vertices and center instead.
+
+        In higher dimensions, the volumes are those of the convex hulls of the cell vertices.
+
+        Arguments:
+
+            worker_count (int): number of processes the convex hulls are computed in;
+                default is a single process.
+
+        Returns:
+
+            numpy.ndarray: cell volumes (or surface areas in 2D).
+        """
+        centers = self._cell_centers
+        ncells, dim = centers.shape
+        indptr, indices = _cell_vertex_csr(self.cell_vertices, ncells)
+        if self._vertices is None:
+            self.vertices # some subclasses compute the vertices on demand
+        nvertices = np.diff(indptr)
+        cell_volume = np.full(ncells, np.NaN)
+        if dim == 2:
+            # count the edges between the vertices of each cell
+            A = self.vertex_adjacency.tocsr()
+            A = sparse.csr_matrix((np.ones(A.nnz, dtype=int), A.indices, A.indptr), A.shape)
+            A = A + A.T
+            A = (sparse.triu(A, 1) + sparse.tril(A, -1)).tocsr()
+            A.data[...] = 1
+            M = sparse.csr_matrix((np.ones(indices.size, dtype=int), indices, indptr),
+                    (ncells, A.shape[0]))
+            M.sum_duplicates()
+            M.data[...] = 1
+            nedges = np.asarray((M.dot(A)).multiply(M).sum(axis=1)).ravel() // 2
+            closed = (nedges == nvertices) & (0 < nvertices)
+            if np.any((nvertices == 0) & ~np.isinf(centers[:,0])):
+                # cells with no vertices and which center coordinates are infinite
+                # are deleted cells
+                i = np.flatnonzero((nvertices == 0) & ~np.isinf(centers[:,0]))[0]
+                raise RuntimeError('cell {} has no boundaries'.format(i))
+            if np.any(closed):
+                # shoelace formula on the vertices sorted by angle, in the frame of the cell center
+                cell = np.repeat(np.arange(ncells), nvertices)
+                in_closed = closed[cell]
+                cell, v = cell[in_closed], indices[in_closed]
+                xy = self._vertices[v] - centers[cell]
+                order = np.lexsort((np.arctan2(xy[:,1], xy[:,0]), cell))
+                cell, xy = cell[order], xy[order]
+                start = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+                stop = np.r_[start[1:], cell.size]
+                successor = np.arange(1, cell.size + 1)
+                successor[stop - 1] = start
+                cross = xy[:,0] * xy[successor,1] - xy[successor,0] * xy[:,1]
+                area = .5 * np.abs(np.bincount(cell, weights=cross, minlength=ncells))
+                cell_volume[closed] = area[closed]
+            # convex hulls of the open cells
+            hull_cells = np.flatnonzero(~closed & (0 < nvertices))
+            include_centers = True
+        else:
+            hull_cells = np.flatnonzero(0 < nvertices)
+            include_centers = False
+        if hull_cells.size:
+            def chunk_points(cells):
+                for i in cells:
+                    pts = self._vertices[indices[indptr[i]:indptr[i+1]]]
+                    if include_centers:
+                        pts = np.r_[pts, centers[[i]]]
+                    yield pts
+            if worker_count and 1 < worker_count and 1 < hull_cells.size:
+                import multiprocessing
+                chunks = np.array_split(hull_cells, min(hull_cells.size, 4 * worker_count))
+                pool = multiprocessing.Pool(worker_count)
+                try:
+                    volumes = pool.map(_convex_hull_volumes,
+                            [ list(chunk_points(chunk)) for chunk in chunks ])
+                finally:
+                    pool.close()
+                    pool.join()
+                cell_volume[hull_cells] = np.concatenate(volumes)
+            else:
+                cell_volume[hull_cells] = _convex_hull_volumes(chunk_points(hull_cells))
+        self._cell_volume = self.scaler.unscale_surface_area(cell_volume)
+        return self._cell_volume
+
     @cell_volume.setter
     def cell_volume(self, area):
         self.__setlazy__('cell_volume', area)
@@ -1546,6 +1710,7 @@ class Voronoi(Delaunay):
 
         ## cell centers
         self._cell_centers[cell_indices] = not_a_coordinate
+        self._cell_tree = None
 
         ## cell vertices; let _preprocess recompute
         self.cell_vertices = None
@@ -1819,6 +1984,7 @@ class Voronoi(Delaunay):
 
             ## cell_centers
             self._cell_centers[i] = not_a_coordinate
+            self._cell_tree = None
             self._vertices[_discarded_vertices] = not_a_coordinate
 
             if pack_indices:
@@ -1916,20 +2082,34 @@ def sparse_to_dict(cell_vertex):
 
 
 def cell_index_by_radius(tessellation, points, radius, format=None, select=None, metric='euclidean',
-        **kwargs):
+        index=None, **kwargs):
     """
     See :meth:`Delaunay.cell_index`.
 
     Specialized routine to assign locations to cells which center is no further than `radius`.
+
+    With ``index='kdtree'`` (default for the euclidean metric), the points are indexed in
+    a :class:`scipy.spatial.cKDTree` and the points in the ball around each cell center are
+    queried.
     """
     #if metric != 'euclidean':
     #    raise NotImplementedError('%s metric not supported', metric)
+    if index is None:
+        index = 'kdtree' if metric == 'euclidean' and not kwargs else 'dense'
     r2 = radius * radius
     points = tessellation.scaler.scale_point(points, inplace=False)
     X = tessellation.descriptors(points, asarray=True)
     Y = tessellation._cell_centers
     ncells = Y.shape[0]
     shape = (X.shape[0], ncells)
+    if index == 'kdtree':
+        defined, = np.all(np.isfinite(Y), axis=1).nonzero()
+        P = spatial.cKDTree(X).query_ball_point(Y[defined], radius)
+        C = np.repeat(defined, [ len(p) for p in P ])
+        P = np.fromiter(itertools.chain(*P), dtype=int, count=C.size)
+        order = np.lexsort((C, P))
+        associations = (P[order], C[order])
+        return format_cell_index(associations, format=format, select=select, shape=shape)
     try:
         D = cdist(X, Y, metric, **kwargs)
     except MemoryError:
@@ -1962,11 +2142,11 @@ def cell_index_by_radius(tessellation, points, radius, format=None, select=None,
             C.append(Ci)
         associations = (np.concatenate(P), np.concatenate(C))
     else:
-        associations = (D <= r2).nonzero()
+        associations = (D <= radius).nonzero()
     return format_cell_index(associations, format=format, select=select, shape=shape)
 
 
-__all__ = ['Partition', 'CellStats', 'point_adjacency_matrix', 'Tessellation', 'Delaunay', 'Voronoi', \
+__all__ = ['Partition', 'CellStats', 'point_adjacency_matrix', 'Tessellation', 'CellTree', 'Delaunay', 'Voronoi', \
     'format_cell_index', 'nearest_cell', 'dict_to_sparse', 'sparse_to_dict', \
     'cell_index_by_radius']
 
@@ -22,6 +22,25 @@ import itertools
 from collections import Counter, OrderedDict
 
 
+def _grid_adjacency(shape):
+    """
+    Adjacency matrix of the nodes of a regular grid, in C order, with the nodes connected
+    along the axes only.
+    """
+    shape = tuple(shape)
+    index = np.arange(int(np.prod(shape))).reshape(shape)
+    i, j = [], []
+    for d in range(len(shape)):
+        lower = [slice(None)] * len(shape)
+        upper = [slice(None)] * len(shape)
+        lower[d], upper[d] = slice(None, -1), slice(1, None)
+        i.append(index[tuple(lower)].ravel())
+        j.append(index[tuple(upper)].ravel())
+    i, j = np.concatenate(i), np.concatenate(j)
+    return sparse.csr_matrix((np.ones(2 * i.size, dtype=bool), (np.r_[i, j], np.r_[j, i])),
+        shape=(index.size, index.size))
+
+
 class RegularMesh(Voronoi):
     """Regular k-D grid.
 
@@ -129,12 +148,7 @@ class RegularMesh(Voronoi):
     @property
     def cell_adjacency(self):
         if self._cell_adjacency is None:
-            cix = np.meshgrid(*[ np.arange(0, len(g) - 1) for g in self.grid ], \
-                indexing='ij')
-            cix = np.column_stack([ g.flatten() for g in cix ])
-            c2  = np.atleast_2d(np.sum(cix * cix, axis=1))
-            self._cell_adjacency = sparse.csr_matrix(\
-                np.abs(c2 + c2.T - 2 * np.dot(cix, cix.T) - 1.0) < 1e-6)
+            self._cell_adjacency = _grid_adjacency([ len(g) - 1 for g in self.grid ])
         return self.__returnlazy__('cell_adjacency', self._cell_adjacency)
 
     @cell_adjacency.setter # copy/paste
@@ -145,12 +159,7 @@ class RegularMesh(Voronoi):
     @property
     def vertex_adjacency(self):
         if self._vertex_adjacency is None:
-            vix = np.meshgrid(*[ np.arange(0, len(g)) for g in self.grid ], \
-                indexing='ij')
-            vix = np.column_stack([ g.flatten() for g in vix ])
-            v2  = np.atleast_2d(np.sum(vix * vix, axis=1))
-            self._vertex_adjacency = sparse.csr_matrix(\
-                np.abs(v2 + v2.T - 2 * np.dot(vix, vix.T) - 1.0) < 1e-6)
+            self._vertex_adjacency = _grid_adjacency([ len(g) for g in self.grid ])
         return self.__returnlazy__('vertex_adjacency', self._vertex_adjacency)
 
     @vertex_adjacency.setter # copy/paste
@@ -56,7 +56,8 @@ class GasMesh(Voronoi):
         self.min_probability = min_probability
         #self.avg_probability = avg_probability
 
-    def _preprocess(self, points, batch_size=10000, tau=333.0, trust=1.0, lifetime=50, **kwargs):
+    def _preprocess(self, points, batch_size=10000, tau=333.0, trust=1.0, lifetime=50, \
+        nearest_node_search='auto', query_batch_size=20, **kwargs):
         if isinstance(points, tuple):
             points, displacements = points
         else:
@@ -99,6 +100,8 @@ class GasMesh(Voronoi):
                 tau = (tau, tau)
             self.gas.habituation_tau = tau
             self.gas.edge_lifetime = lifetime
+            self.gas.nearest_node_search = nearest_node_search
+            self.gas.query_batch_size = query_batch_size
             if self._min_distance:
                 self.gas.collapse_below = self._min_distance# * 0.9
         return points, displacements
@@ -130,6 +133,9 @@ class GasMesh(Voronoi):
             tau (float): (see :class:`~tramway.tessellation.gwr.gas.Gas`)
             trust (float): (see :class:`~tramway.tessellation.gwr.gas.Gas`)
             lifetime (int): (see :class:`~tramway.tessellation.gwr.gas.Gas`)
+            nearest_node_search (str): any of '*auto*' (default), '*dense*', '*kdtree*'
+                (see :meth:`~tramway.tessellation.gwr.gas.Gas.nearest_node_index`)
+            query_batch_size (int): (see :class:`~tramway.tessellation.gwr.gas.Gas`)
             alpha_risk (float): location distributions of potential neighbor cells
                 are compared with a t-test
             complete_delaunay (bool): complete the Delaunay graph
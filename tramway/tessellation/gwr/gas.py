@@ -21,10 +21,115 @@ from .graph import *
 #from .graph.array import ArrayGraph
 import time
 from scipy.spatial.distance import cdist
+from scipy.spatial import cKDTree
 from scipy.special import gamma
 from .dichotomy import Dichotomy
 
 
+class NearestNodeIndex(object):
+    """
+    Exact search for the two nearest nodes of a gas, backed by a KD-tree of the node weights.
+
+    The tree indexes a snapshot of the weights. Nodes that are added, moved or deleted
+    afterwards are marked as stale and ignored in the tree results; the nodes that were added
+    or moved are instead compared directly with the sample points.
+    The tree is rebuilt by :meth:`refresh` once the stale nodes are too many.
+
+    Queries are prepared for a batch of sample points at once with :meth:`prefetch`,
+    and resolved one at a time with :meth:`nearest`, in between weight updates.
+    The nodes are still updated after each sample point, as with the dense search.
+
+    Only :class:`~tramway.tessellation.gwr.graph.array.ArrayGraph` graphs are supported.
+
+    Attributes:
+        graph (ArrayGraph): graph which nodes have a '*weight*' attribute.
+        k (int): number of nearest neighbours queried in the tree per sample point.
+        rebuild_ratio (float): maximum proportion of stale nodes before the tree is rebuilt.
+    """
+    __slots__ = ('graph', 'k', 'rebuild_ratio', 'tree', 'nodes', 'stale', 'moved', \
+        '_candidates')
+
+    def __init__(self, graph, k=8, rebuild_ratio=.05):
+        self.graph = graph
+        self.k = k
+        self.rebuild_ratio = rebuild_ratio
+        self.refresh(True)
+
+    def refresh(self, force=False):
+        """Rebuild the tree if the stale nodes are too many, or if `force` is ``True``."""
+        if not force and \
+            len(self.stale) <= max(self.k, self.rebuild_ratio * float(self.nodes.size)):
+            return
+        graph = self.graph
+        alive = np.ones(graph._node_counter, dtype=bool)
+        alive[list(graph._free_nodes)] = False
+        self.nodes, = np.nonzero(alive)
+        self.tree = cKDTree(graph.nodes['weight'][self.nodes])
+        self.stale = set()
+        self.moved = set()
+        self._candidates = None
+
+    def move(self, node):
+        """Mark a new or moved node."""
+        self.stale.add(node)
+        self.moved.add(node)
+
+    def delete(self, node):
+        """Mark a deleted node."""
+        self.stale.add(node)
+        self.moved.discard(node)
+
+    def prefetch(self, sample):
+        """Query the tree for a batch of sample points."""
+        k = min(self.k, self.nodes.size)
+        _, j = self.tree.query(sample, k)
+        if k == 1:
+            j = j[:,np.newaxis]
+        self._candidates = self.nodes[j]
+
+    def nearest(self, i, eta, eta2=None):
+        """
+        Arguments:
+            i (int): index of the sample point in the batch passed to :meth:`prefetch`.
+            eta (numpy.ndarray): sample point.
+            eta2 (float): square norm of `eta`.
+
+        Returns:
+            tuple: (square distance to the nearest node, nearest node, second nearest node).
+
+        The square distances are calculated the same way as
+        :meth:`~tramway.tessellation.gwr.graph.array.ArrayGraph.square_distance` does.
+        """
+        node = self._candidates[i]
+        stale = self.stale
+        ok = [ n not in stale for n in node.tolist() ]
+        if sum(ok) < 2 and node.size < self.nodes.size:
+            # not enough unchanged nodes in the prefetched neighbours; query again
+            _, j = self.tree.query(eta, self.nodes.size)
+            node = self.nodes[j]
+            ok = [ n not in stale for n in node.tolist() ]
+        # keep a third candidate in the case of near ties
+        node = node[ok][:3]
+        if self.moved:
+            moved = np.fromiter(self.moved, dtype=node.dtype, count=len(self.moved))
+            node = np.concatenate((node, moved))
+        dist2, index_to_node = self.graph.square_distance('weight', eta, eta2=eta2, nodes=node)
+        if 2 < dist2.size:
+            i = np.argpartition(dist2, 1)[:2]
+        else:
+            i = np.argsort(dist2)
+        nearest, second_nearest = index_to_node(i)
+        return dist2[i[0]], nearest, second_nearest
+
+
+KDTREE_MIN_NODE_COUNT = 5000
+"""Minimum number of nodes for :meth:`Gas.nearest_node_index` to make a KD-tree by default.
+
+On 2D points, the KD-tree search was measured (``python -m benchmarks.gwr --crossover``) to train
+a gas about 10% slower than the dense search below 5000 nodes, as fast at 5000-6000 nodes,
+10% faster at 7000 nodes and 2.5 times faster at 90000 nodes."""
+
+
 class Gas(Graph):
     """Implementation of the *Grow(ing) When Required* clustering algorithm, first inspired from
     [Marsland02]_ and then extensively modified.
@@ -47,7 +152,7 @@ class Gas(Graph):
     __slots__ = ['graph', 'insertion_threshold', 'trust', 'learning_rate', \
         'habituation_threshold', 'habituation_initial', 'habituation_alpha', \
         'habituation_tau', 'edge_lifetime', 'batch_size', 'collapse_below', 'knn', \
-        'topology']
+        'topology', 'nearest_node_search', 'query_batch_size', '_nearest_node_index']
 
     def connect(self, n1, n2, **kwargs):
         self.graph.connect(n1, n2, **kwargs)
@@ -75,9 +180,14 @@ class Gas(Graph):
     def has_node(self, n):
         return self.graph.has_node(n)
     def add_node(self, **kwargs):
-        return self.graph.add_node(**kwargs)
+        n = self.graph.add_node(**kwargs)
+        if self._nearest_node_index is not None:
+            self._nearest_node_index.move(n)
+        return n
     def del_node(self, n):
         self.graph.del_node(n)
+        if self._nearest_node_index is not None:
+            self._nearest_node_index.delete(n)
     def stands_alone(self, n):
         return self.graph.stands_alone(n)
     def find_edge(self, n1, n2):
@@ -90,6 +200,7 @@ class Gas(Graph):
         return self.graph.square_distance(attr, eta, **kwargs)
 
     def __init__(self, sample, graph=None):
+        self._nearest_node_index = None
         if 1 < sample.shape[0]:
             w1 = sample[0]
             w2 = sample[-1]
@@ -128,6 +239,9 @@ class Gas(Graph):
         self.collapse_below = None
         self.knn = None
         self.topology = 'approximate density'
+        self.nearest_node_search = 'auto' # 'dense', 'kdtree' or 'auto'
+        self.query_batch_size = 20 # number of sample points the nearest nodes are queried for
+        # at once in the KD-tree, if any; does not affect the result
 
     def local_insertion_threshold(self, eta, node, *vargs):
         """
@@ -196,6 +310,31 @@ class Gas(Graph):
 
     def set_weight(self, node, weight):
         self.set_node_attr(node, weight=weight)
+        if self._nearest_node_index is not None:
+            self._nearest_node_index.move(node)
+
+    def nearest_node_index(self):
+        """
+        Make a :class:`NearestNodeIndex` for the current nodes if :attr:`nearest_node_search`
+        is '*kdtree*', or if it is '*auto*' and the gas counts at least
+        :const:`KDTREE_MIN_NODE_COUNT` nodes.
+
+        Returns:
+            NearestNodeIndex: index or ``None`` if the nearest nodes should be searched for
+                by computing the distances to all the nodes.
+        """
+        from .graph.array import ArrayGraph
+        if self.nearest_node_search == 'kdtree':
+            if not isinstance(self.graph, ArrayGraph):
+                raise TypeError("nearest_node_search='kdtree' requires an ArrayGraph")
+        elif self.nearest_node_search == 'auto':
+            if not (isinstance(self.graph, ArrayGraph) and KDTREE_MIN_NODE_COUNT <= self.size):
+                return None
+        elif self.nearest_node_search == 'dense':
+            return None
+        else:
+            raise ValueError("nearest_node_search is neither 'dense', 'kdtree' nor 'auto': '{}'".format(self.nearest_node_search))
+        return NearestNodeIndex(self.graph)
 
     def increment_habituation(self, node):
         count = self.get_node_attr(node, 'habituation_counter') + 1
@@ -235,14 +374,24 @@ class Gas(Graph):
         if radius is None:
             r = []
         errors = []
+        index = self._nearest_node_index = self.nearest_node_index()
+        query_batch_size = max(1, self.query_batch_size)
         for k in np.arange(0, sample.shape[0]):
             eta = sample[k]
             if radius is not None:
                 r = [radius[k]]
             # find nearest and second nearest nodes
-            dist2, index_to_node = self.square_distance('weight', eta, eta2=eta_square[k])
-            i = np.argsort(dist2)
-            dist2_min = dist2[i[0]]
+            if index is None:
+                dist2, index_to_node = self.square_distance('weight', eta, eta2=eta_square[k])
+                i = np.argpartition(dist2, 1)[:2]
+                dist2_min = dist2[i[0]]
+                nearest, second_nearest = index_to_node(i)
+            else:
+                b = k % query_batch_size
+                if b == 0:
+                    index.refresh()
+                    index.prefetch(sample[k:k+query_batch_size])
+                dist2_min, nearest, second_nearest = index.nearest(b, eta, eta_square[k])
             try:
                 dist_min = sqrt(dist2_min)
             except ValueError:
@@ -254,7 +403,6 @@ class Gas(Graph):
                 else:
                     print('square distance=', dist2_min, '   num. type=', dist2_min.dtype)
                     raise ValueError('Negative distance') from None
-            nearest, second_nearest = index_to_node(i[:2])
             errors.append(dist_min)
             # test activity and habituation against thresholds
             activity = dist_min
@@ -288,6 +436,7 @@ class Gas(Graph):
             if grab is not None:
                 if max_frames is None or k < max_frames:
                     self.grab_frame(grab, **grab_kwargs)
+        self._nearest_node_index = None
         return errors
 
     def grab_frame(self, grab, axes=None, color='r', **kwargs):
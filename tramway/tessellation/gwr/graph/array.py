@@ -295,7 +295,7 @@ class ArrayGraph(Graph):
         #print((A.data.min(), A.data.max()))
         return (A, V, E)
 
-    def square_distance(self, attr, eta, eta2=None):
+    def square_distance(self, attr, eta, eta2=None, nodes=None):
         if eta2 is None:
             eta2 = np.dot(eta, eta)
         if attr not in self._fast_node:
@@ -303,6 +303,10 @@ class ArrayGraph(Graph):
                 dtype=self.nodes[attr].dtype)
             w = self.nodes[attr][:self._node_counter]
             self._fast_node[attr][:self._node_counter] = np.sum(w * w, axis=1)
+        if nodes is not None:
+            # distances to the specified existing nodes only
+            return (self._fast_node[attr][nodes] + eta2 - 2.0 * \
+                np.dot(self.nodes[attr][nodes], eta), lambda i: nodes[i])
         d = self._fast_node[attr][:self._node_counter] + eta2 - 2.0 * \
             np.dot(self.nodes[attr][:self._node_counter], eta)
         d[self._free_nodes] = np.nan#float('nan')
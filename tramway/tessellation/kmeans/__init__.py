@@ -21,6 +21,7 @@ import pandas as pd
 import scipy.sparse as sparse
 from scipy.cluster.vq import kmeans, kmeans2
 from scipy.spatial.distance import cdist
+import scipy.spatial as spatial
 from collections import OrderedDict
 
 
@@ -47,7 +48,7 @@ class KMeansMesh(Voronoi):
         self._min_distance = min_distance
         self.initial = initial
 
-    def _preprocess(self, points, **kwargs):
+    def _preprocess(self, points, random=np.random, **kwargs):
         init = self.scaler.init
         points = Voronoi._preprocess(self, points)
         if init and self._min_distance is not None:
@@ -72,7 +73,7 @@ class KMeansMesh(Voronoi):
                 n_cells = int(round(1. / self.avg_probability))
             else:
                 raise ValueError('avg_probability (or avg_location_count) not defined')
-            self._cell_centers = np.random.rand(n_cells, points.shape[1])
+            self._cell_centers = random.rand(n_cells, points.shape[1])
             self._cell_centers = self._cell_centers * (upper_bound - lower_bound) + lower_bound
         elif self.initial == 'center':
             initial_spread = kwargs.pop('initial_spread', 1e-2)
@@ -84,50 +85,145 @@ class KMeansMesh(Voronoi):
                 n_cells = int(round(1. / self.avg_probability))
             else:
                 raise ValueError('avg_probability (or avg_location_count) not defined')
-            self._cell_centers = np.random.randn(n_cells, points.shape[1])
+            self._cell_centers = random.randn(n_cells, points.shape[1])
             self._cell_centers = self._cell_centers * (initial_spread * (upper_bound - lower_bound)) + center
         self.roi_subset_size = 10000
         self.roi_subset_count = 10
         return points
 
-    def tessellate(self, points, tol=1e-6, prune=2.5, plot=False, **kwargs):
+    def tessellate(self, points, tol=1e-6, prune=2.5, plot=False, minibatch=False,
+        batch_size=None, pass_count=None, decay=.8, seed=None, **kwargs):
         """Grow the tessellation.
 
         Attributes:
-            points: see :meth:`~tramway.tessellation.base.Tessellation.tessellate`.
+            points: see :meth:`~tramway.tessellation.base.Tessellation.tessellate`;
+                in mini-batch mode, can also be an iterable of chunks (data frames or arrays
+                with the same columns), that is consumed once; the first chunk initializes
+                the scaler and the cell centers.
             tol (float): error tolerance.
                 Passed as `thresh` to :func:`scipy.cluster.vq.kmeans`.
+                In mini-batch mode, the passes over the points stop when the mean square
+                displacement of the cell centers over a pass is less than `tol` times the
+                mean square distance between the points and their nearest centers.
             prune (bool or float): prunes the Voronoi and removes the edges which length
                 is greater than `prune` times the median edge length;
                 ``True`` is translated to the default value.
+            minibatch (bool): run the mini-batch k-means algorithm (Sculley 2010) instead of
+                the full-batch :func:`scipy.cluster.vq.kmeans`.
+                Each center moves towards the mean of its points in the mini-batch with
+                a learning rate that decreases with the number of points assigned so far.
+            batch_size (int): number of points per mini-batch; default is 10000.
+            pass_count (float): maximum number of passes over the points in mini-batch mode;
+                can be fractional; default is 10; not used with chunks.
+            decay (float): factor applied to the numbers of points assigned so far at each
+                mini-batch, so that the early assignments are progressively forgotten;
+                ``1`` gives the original algorithm, whose centers freeze early.
+            seed (int): seed for the random initial cell centers and the mini-batches.
         """
-        points = self._preprocess(points, **kwargs)
-        self._cell_centers, _ = kmeans(np.asarray(points), self._cell_centers, \
-            thresh=tol)
+        random = np.random if seed is None else np.random.RandomState(seed)
+        if minibatch:
+            self._cell_centers = self._minibatch_kmeans(points, tol, batch_size, pass_count,
+                decay, random, **kwargs)
+        else:
+            points = self._preprocess(points, random=random, **kwargs)
+            self._cell_centers, _ = kmeans(np.asarray(points), self._cell_centers, \
+                thresh=tol)
 
         if prune: # inter-center-distance-based pruning
             if prune is True: # backward compatibility
                 prune = 2.5 # 2.5 is empirical
-            self._postprocess(adjacency_label=True)
-            A = sparse.tril(self.cell_adjacency, format='coo')
-            i, j, k = A.row, A.col, A.data
-            if self._adjacency_label is None:
-                if np.max(k) == 1:
-                    k = np.arange(k.size)
-                    self._cell_adjacency = sparse.csr_matrix((np.tile(k, 2),
-                        (np.r_[i, j], np.r_[j, i])), shape=A.shape)
-                self._adjacency_label = np.ones(k.size, dtype=bool)
-            else:
-                l = 0 < self._adjacency_label[k]
-                i, j, k = i[l], j[l], k[l]
-            x = self._cell_centers
-            d = x[i] - x[j]
-            d = np.sum(d * d, axis=1) # square distance
-            d0 = np.median(d)
-            edge = k[d0 * prune < d] # edges to be discarded
-            if edge.size:
-                self._adjacency_label[edge] = False
-
+            self._prune(prune)
+
+    def _minibatch_kmeans(self, points, tol, batch_size, pass_count, decay, random, **kwargs):
+        if not batch_size:
+            batch_size = 10000
+        if isinstance(points, (pd.DataFrame, np.ndarray)):
+            points = np.asarray(self._preprocess(points, random=random, **kwargs))
+            if pass_count is None:
+                pass_count = 10
+            batch_count = int(ceil(pass_count * points.shape[0] / float(batch_size)))
+            def passes():
+                while True:
+                    order = random.permutation(points.shape[0])
+                    yield ( points[order[start:start+batch_size]] \
+                        for start in range(0, order.size, batch_size) )
+        else:
+            chunks = iter(points)
+            chunk = next(chunks)
+            columns = list(chunk.columns) if isinstance(chunk, pd.DataFrame) else None
+            # the chunks are not scaled in place
+            first_chunk = np.asarray(self._preprocess(chunk.copy(), random=random, **kwargs))
+            batch_count = None
+            def batches():
+                chunk = first_chunk
+                while True:
+                    order = random.permutation(chunk.shape[0])
+                    for start in range(0, order.size, batch_size):
+                        yield chunk[order[start:start+batch_size]]
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        return
+                    if columns is not None:
+                        chunk = chunk[columns]
+                    chunk = np.asarray(self.scaler.scale_point(chunk, inplace=False))
+            def passes():
+                yield batches()
+        centers = np.array(self._cell_centers, dtype=float)
+        ncenters = centers.shape[0]
+        counts = np.zeros(ncenters)
+        assigned = np.zeros(ncenters, dtype=bool)
+        k = 0
+        for batches in passes():
+            previous_centers = centers.copy()
+            square_dist = point_count = 0.
+            for batch in batches:
+                if batch_count is not None and batch_count <= k:
+                    break
+                k += 1
+                dist, cell = spatial.cKDTree(centers).query(batch)
+                square_dist += np.dot(dist, dist)
+                point_count += dist.size
+                n = np.bincount(cell, minlength=ncenters)
+                counts *= decay
+                moved = 0 < n
+                n = n[moved]
+                sums = np.stack([ np.bincount(cell, weights=batch[:,d], minlength=ncenters)[moved] \
+                    for d in range(batch.shape[1]) ], axis=1)
+                counts[moved] += n
+                # the learning rate is the number of points in the mini-batch over the (decayed)
+                # number of points assigned to the center so far
+                centers[moved] += (n / counts[moved])[:,np.newaxis] * \
+                    (sums / n[:,np.newaxis] - centers[moved])
+                assigned |= moved
+            if batch_count is not None and batch_count <= k:
+                break
+            shift = centers - previous_centers
+            if tol and np.sum(shift * shift) < tol * ncenters * square_dist / point_count:
+                break
+        # like :func:`scipy.cluster.vq.kmeans`, discard the centers with no points
+        return centers[assigned]
+
+    def _prune(self, prune):
+        self._postprocess(adjacency_label=True)
+        A = sparse.tril(self.cell_adjacency, format='coo')
+        i, j, k = A.row, A.col, A.data
+        if self._adjacency_label is None:
+            if np.max(k) == 1:
+                k = np.arange(k.size)
+                self._cell_adjacency = sparse.csr_matrix((np.tile(k, 2),
+                    (np.r_[i, j], np.r_[j, i])), shape=A.shape)
+            self._adjacency_label = np.ones(k.size, dtype=bool)
+        else:
+            l = 0 < self._adjacency_label[k]
+            i, j, k = i[l], j[l], k[l]
+        x = self._cell_centers
+        d = x[i] - x[j]
+        d = np.sum(d * d, axis=1) # square distance
+        d0 = np.median(d)
+        edge = k[d0 * prune < d] # edges to be discarded
+        if edge.size:
+            self._adjacency_label[edge] = False
 
 
 def _metric(knn=None, **kwargs):
@@ -146,6 +242,8 @@ setup = {
         ('avg_probability', ()),
         ('avg_location_count', dict(args=('-c', '--location-count'), kwargs=dict(type=int, default=80, help='average number of locations per cell'), translate=True)),
         ('metric', dict(parse=_metric)),
+        ('minibatch', dict(action='store_true', help='mini-batch k-means')),
+        ('batch_size', dict(type=int, help='number of points per mini-batch (with --minibatch)')),
         )),
     }
 
@@ -20,6 +20,16 @@ import copy
 import scipy.sparse as sparse
 
 
+def _tessellate_child(task):
+    factory, factory_kwargs, scaler, points, seed, args, kwargs = task
+    np.random.seed(seed)
+    child = factory(scaler=scaler, **factory_kwargs)
+    child.tessellate(points, *args, **kwargs)
+    # the growth-only state, e.g. the gas of the gwr method, may not be picklable
+    child.freeze()
+    return child
+
+
 class NestedTessellations(Tessellation):
     """Tessellation of tessellations.
 
@@ -89,27 +99,75 @@ class NestedTessellations(Tessellation):
                 return pts[ids]
         return (pt_ids, cell_ids, rows)
 
-    def tessellate(self, points, *args, **kwargs):
+    def _group_by_parent_cell(self, points):
+        """
+        Sorts the points by parent cell.
+
+        Returns the parent cell indices `cells`, the point indices `pt_ids`, the offsets
+        `bounds` and the row selection function `rows`, such that the points in parent cell
+        ``cells[k]`` are ``rows(points, pt_ids[bounds[k]:bounds[k+1]])``.
+        """
+        pt_ids, cell_ids, rows = self._parent_index(points)
+        order = np.argsort(cell_ids, kind='stable') # keep the order of the points in each cell
+        pt_ids, cell_ids = pt_ids[order], cell_ids[order]
+        start = np.flatnonzero(np.r_[True, cell_ids[1:] != cell_ids[:-1]]) \
+                if cell_ids.size else np.zeros(0, dtype=int)
+        return cell_ids[start], pt_ids, np.r_[start, cell_ids.size], rows
+
+    def tessellate(self, points, *args, worker_count=None, **kwargs):
+        """
+        Grows the nested tessellations.
+
+        Arguments:
+
+            points (pandas.DataFrame or numpy.ndarray): points to be partitioned.
+
+            worker_count (int): number of processes the nested tessellations are grown in;
+                default is a single process.
+                In multiple processes, each nested tessellation is grown with its own
+                random seed, drawn from :mod:`numpy.random`, and is returned frozen
+                (see :meth:`~tramway.tessellation.base.Tessellation.freeze`).
+
+        The other arguments are passed to the :meth:`tessellate` method of the nested
+        tessellations.
+        """
         # initialize `self.scaler`;
         # if we didn't, we should pass copies of `self.scaler` instead, to `self.child_factory`
         any_child = self.child_factory(scaler=self.scaler, **self.child_factory_arguments)
         any_child._preprocess(points)
         #
-        pt_ids, cell_ids, rows = self._parent_index(points)
-        self.children = {}
-        for u in np.unique(cell_ids):
-            child = self.child_factory(scaler=self.scaler, **self.child_factory_arguments)
-            child_pts = rows(points, pt_ids[cell_ids==u])
-            if child_pts.size:
-                child.tessellate(child_pts, *args, **kwargs)
-                self.children[u] = child
+        cells, pt_ids, bounds, rows = self._group_by_parent_cell(points)
+        child_points = ( rows(points, pt_ids[start:stop])
+                for start, stop in zip(bounds[:-1], bounds[1:]) )
+        if worker_count and 1 < worker_count and 1 < cells.size:
+            import multiprocessing
+            seeds = np.random.randint(2**31, size=cells.size)
+            tasks = [ (self.child_factory, self.child_factory_arguments, self.scaler, pts, seed,
+                    args, kwargs) for pts, seed in zip(child_points, seeds) ]
+            pool = multiprocessing.Pool(worker_count)
+            try:
+                children = pool.map(_tessellate_child, tasks)
+            finally:
+                pool.close()
+                pool.join()
+            for child in children:
+                # share the scaler again
+                child.scaler = self.scaler
+        else:
+            children = []
+            for pts in child_points:
+                child = self.child_factory(scaler=self.scaler, **self.child_factory_arguments)
+                child.tessellate(pts, *args, **kwargs)
+                children.append(child)
+        self.children = dict(zip(cells, children))
 
     def cell_index(self, points, *args, **kwargs):
         point_count = points.shape[0]
         #if isinstance(points, pd.DataFrame):
         #       point_count = max(point_count, points.index.max()+1) # NO!
         # point indices are row indices and NOT rows labels
-        parent_pt_ids, parent_cell_ids, rows = self._parent_index(points)
+        parent_cells, parent_pt_ids, bounds, rows = self._group_by_parent_cell(points)
+        bounds = dict(zip(parent_cells, zip(bounds[:-1], bounds[1:])))
         _is_array_ = _is_pair_ = _is_sparse_ = False # (exclusive) type flags
         _first_ = True # initialization flag
         _type_error_ = TypeError('multiple nested partition types; `format` should be enforced')
@@ -117,7 +175,8 @@ class NestedTessellations(Tessellation):
         cell_count = 0
         for u in self.children:
             child_cell_count = self.children[u].cell_adjacency.shape[0]
-            child_pt_ids = parent_pt_ids[parent_cell_ids==u]
+            start, stop = bounds.get(u, (0, 0))
+            child_pt_ids = parent_pt_ids[start:stop]
             if child_pt_ids.size: # if cell is empty
                 child_partition = self.children[u].cell_index(
                     rows(points, child_pt_ids), *args, **kwargs)
@@ -225,7 +284,9 @@ class NestedTessellations(Tessellation):
                     if labels:
                         A.data = np.zeros_like(A.data, dtype=int)
                 else:
-                    A.data = np.array([ labels[e] for e in A.data ])
+                    # the edge indices index the child's adjacency labels
+                    child_labels = self.children[u].adjacency_label
+                    A.data = np.array([ labels[l] for l in child_labels ], dtype=int)[A.data]
                 row.append(A.row)
                 col.append(A.col)
                 data.append(A.data)
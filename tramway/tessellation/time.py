@@ -164,27 +164,47 @@ class TimeLattice(Tessellation):
             location_count = np.zeros(count_shape, dtype=int)
         ps, cs = [], []
         if time_knn is None:
+            # locate the segment bounds in the sorted timestamps
+            order = np.argsort(ts, kind='stable')
+            presorted = np.all(order[1:] == order[:-1] + 1)
+            sorted_ts = ts[order]
+            first = np.searchsorted(sorted_ts, time[:,0], side='left')
+            last = np.searchsorted(sorted_ts, time[:,1], side='left')
+            # without extra arguments, the spatial assignment of a point does not depend on
+            # the other points in the segment; compute it once for all the segments
+            spatial_index = None
+            if self.spatial_mesh is not None and not args and \
+                    all(arg in ('metric', 'index') for arg in kwargs):
+                spatial_index = self.spatial_mesh.cell_index(points, **kwargs)
+                if not isinstance(spatial_index, np.ndarray):
+                    spatial_index = None
+            # count the locations in a single pass once all the segments are processed
+            count_at_once = exclude and spatial_index is not None and \
+                    np.all(0 <= spatial_index)
             for t in range(nsegments):
-                t0, t1 = time[t]
-                segment = np.logical_and(t0 <= ts, ts < t1)
-                pts, = np.nonzero(segment)
+                pts = order[first[t]:last[t]]
+                if not presorted:
+                    pts = np.sort(pts)
                 if pts.size:
                     if self.spatial_mesh is None:
                         ids = np.full_like(pts, t)
                     else:
-                        if isinstance(points, pd.DataFrame):
-                            points_t = points.iloc[segment]
+                        if spatial_index is not None:
+                            ids = spatial_index[pts]
                         else:
-                            points_t = points[segment]
-                        ids = self.spatial_mesh.cell_index(points_t, *args, **kwargs)
-                        if isinstance(ids, np.ndarray):
-                            pass
-                        elif isinstance(ids, tuple):
-                            _pts, ids = ids
-                            pts = pts[_pts]
-                        else:
-                            raise NotImplementedError
-                        if exclude:
+                            if isinstance(points, pd.DataFrame):
+                                points_t = points.iloc[pts]
+                            else:
+                                points_t = points[pts]
+                            ids = self.spatial_mesh.cell_index(points_t, *args, **kwargs)
+                            if isinstance(ids, np.ndarray):
+                                pass
+                            elif isinstance(ids, tuple):
+                                _pts, ids = ids
+                                pts = pts[_pts]
+                            else:
+                                raise NotImplementedError
+                        if exclude and not count_at_once:
                             vs, count = np.unique(ids, return_counts=True)
                             location_count[vs, t] = count
                         ids += t * ncells
@@ -276,10 +296,11 @@ class TimeLattice(Tessellation):
             ps = np.concatenate(ps)
             cs = np.concatenate(cs)
             if exclude and count_shape[1:]:
+                if time_knn is None and count_at_once:
+                    location_count = np.bincount(cs, minlength=ncells * nsegments)
+                    location_count = location_count.reshape((nsegments, ncells)).T
                 i, t = exclude(location_count).nonzero()
-                ok = np.ones(cs.size, dtype=bool)
-                for c in t * ncells + i:
-                    ok[cs == c] = False
+                ok = np.isin(cs, t * ncells + i, invert=True)
                 ps = ps[ok]
                 cs = cs[ok]
         return (ps, cs)
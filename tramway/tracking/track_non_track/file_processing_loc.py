@@ -8,6 +8,8 @@ import gc
 import os
 import matplotlib.pyplot as plt
 from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
 
 ####################################################################
 ####################################################################
@@ -30,13 +32,12 @@ def load_xyt(path_xyt):
 ####################################################################
 def convert_to_list(xyt):
 
-	t_unique        = np.unique(xyt[:,2])
+	# sort by time once (stable, to preserve the order within frames) and split at the frame bounds
+	order           = np.argsort(xyt[:,2], kind='stable')
+	xyt             = xyt[order,:]
+	t_unique, first = np.unique(xyt[:,2], return_index=True)
 	n_unique        = t_unique.shape[0]
-	movie_per_frame = []
-	for i in range(n_unique):
-
-		II = xyt[:,2]==t_unique[i]
-		movie_per_frame.append(xyt[II,:])
+	movie_per_frame = np.split(xyt, first[1:])
 
 	return movie_per_frame, n_unique	
 
@@ -89,6 +90,74 @@ def get_cost_function(number_movie, movie_per_frame):
 	return C
 
 
+####################################################################
+####################################################################
+####################################################################
+def get_sparse_cost_function(number_movie, movie_per_frame, length_high):
+	## sparse counterpart of get_cost_function followed by the cut in correct_cost_function:
+	## only the pairs no further apart than length_high are considered, found with a KD-tree
+
+	xy1 = movie_per_frame[number_movie][:,:2]
+	xy2 = movie_per_frame[number_movie+1][:,:2]
+	M   = xy1.shape[0]
+	N   = xy2.shape[0]
+
+	if (M==0)|(N==0):
+		row = col = np.zeros(0, dtype=int)
+		return row, col, np.zeros(0), M, N
+
+	# slightly larger gate; the cut is made below on the same square distances as get_cost_function
+	pairs = cKDTree(xy1).sparse_distance_matrix(cKDTree(xy2), length_high*(1.+1e-6), output_type='ndarray')
+	row   = pairs['i'].astype(int)
+	col   = pairs['j'].astype(int)
+
+	dx    = xy2[col,0] - xy1[row,0]
+	dy    = xy2[col,1] - xy1[row,1]
+	C     = dx**2 + dy**2
+
+	l2    = length_high**2
+	link  = C <= l2
+	row, col, C = row[link], col[link], C[link]
+	order = np.lexsort((col, row))
+
+	return row[order], col[order], C[order], M, N
+
+####################################################################
+####################################################################
+####################################################################
+def get_sparse_assigment(row, col, C, M, N):
+	## sparse counterpart of correct_cost_function followed by get_assigment_matrix_from_reduced_cost:
+	## the padding of the cost matrix in correct_cost_function aims at assigning as many rows as possible,
+	## at the lowest cost; here each row is given a private dummy column instead, that costs more than
+	## any set of links, and the resulting full matching is solved on the sparse graph
+
+	if row.size == 0:
+		global_row = global_col = np.zeros(0, dtype=int)
+		return global_row, global_col
+
+	# all the weights must be non-zero
+	unassigned = (np.minimum(M,N)+1) * (np.max(C)+1)
+	row_       = np.r_[row, np.arange(M)]
+	col_       = np.r_[col, N+np.arange(M)]
+	C_         = np.r_[C+1, np.full(M, unassigned)]
+	try:
+		from scipy.sparse.csgraph import min_weight_full_bipartite_matching # scipy>=1.6
+	except ImportError:
+		# dense fallback on the same padded cost matrix; the missing links cost infinitely
+		dense                 = np.full((M, N+M), np.inf)
+		dense[row_, col_]     = C_
+		row_ind, col_ind      = linear_sum_assignment(dense)
+		assigned_col          = np.empty(M, dtype=int)
+		assigned_col[row_ind] = col_ind
+	else:
+		graph           = csr_matrix((C_, (row_, col_)), shape=(M, N+M))
+		_, assigned_col = min_weight_full_bipartite_matching(graph)
+
+	global_row = np.flatnonzero(assigned_col < N)
+	global_col = assigned_col[global_row]
+
+	return global_row, global_col
+
 ####################################################################
 ####################################################################
 ####################################################################